@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 
-from app.api.api_v1.endpoints import auth, course, student, verify, recommendation, notice
+from app.api.api_v1.endpoints import auth, course, student, verify, recommendation, notice, health
 from app.api.deps import require_wx
 
 api_router = APIRouter()
@@ -8,6 +8,7 @@ api_router = APIRouter()
 # 无需鉴权
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(notice.router, prefix="/notice", tags=["notice"])
+api_router.include_router(health.router, prefix="/health", tags=["health"])
 
 # 需要微信鉴权（通过 X-Wx-Token 请求头）
 _wx = [Depends(require_wx)]
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, Query, Body, Request
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.session import get_session
+from app.core.config import settings
+from app.core.concurrency import run_db
+from app.api.http_cache import data_cache
 from app.services.student_service import StudentService
 from app.services.course_score_service import CourseScoreService
+from app.services import course_columns, course_name_index
 from app.schemas.schemas import ScoreQueryDTO, CourseScoreBase
 from app.schemas.dtos import CourseInfoFilterDTO, FailRateStatisDTO, VerifiedQueryDTO
 from app.schemas.result import Result
@@ -12,16 +16,19 @@ from app.api.deps import verify_request
 
 router = APIRouter()
 
+_name_cache = [Depends(data_cache(settings.HTTP_CACHE_DATA_MAX_AGE, course_name_index.data_version))]
+_filter_cache = [Depends(data_cache(settings.HTTP_CACHE_DATA_MAX_AGE, course_columns.data_version))]
+
 
 @router.post("/query/id")
-def get_score_by_id(body: VerifiedQueryDTO, request: Request, db: Session = Depends(get_db)):
-    session_token = verify_request(body, request)
+async def get_score_by_id(body: VerifiedQueryDTO, request: Request, db: Session = Depends(get_session)):
+    session_token = await verify_request(body, request)
 
-    student = StudentService.get_student_by_id(db, body.sid)
+    student = await run_db(db, StudentService.get_student_by_id, body.sid)
     if not student:
         return Result.error(message="查无此人")
     
-    course_scores = CourseScoreService.get_scores_by_student_id(db, student.studentId)
+    course_scores = await run_db(db, CourseScoreService.get_scores_by_student_id, student.studentId)
     scores_data = [CourseScoreBase.model_validate(cs) for cs in course_scores]
     
     query_dto = ScoreQueryDTO(
@@ -31,27 +38,27 @@ def get_score_by_id(body: VerifiedQueryDTO, request: Request, db: Session = Depe
     )
     return Result.success(data={"sessionToken": session_token, "queryData": query_dto.model_dump()})
 
-@router.get("/name", response_model=Result[List[str]])
-def get_course_name(cname: str = Query(..., alias="cname", max_length=50), db: Session = Depends(get_db)):
-    names = CourseScoreService.get_course_names(db, cname)
+@router.get("/name", response_model=Result[List[str]], dependencies=_name_cache)
+async def get_course_name(cname: str = Query(..., alias="cname", max_length=50), db: Session = Depends(get_session)):
+    names = await run_db(db, CourseScoreService.get_course_names, cname)
     if not names:
         return Result.error(message="没有匹配课程")
     return Result.success(data=names)
 
-@router.get("/filter", response_model=Result[CourseInfoFilterDTO])
-def get_course_info_filter_by_name(courseName: str = Query(..., max_length=50), db: Session = Depends(get_db)):
+@router.get("/filter", response_model=Result[CourseInfoFilterDTO], dependencies=_filter_cache)
+async def get_course_info_filter_by_name(courseName: str = Query(..., max_length=50), db: Session = Depends(get_session)):
     current_filter = CourseInfoFilterDTO(courseName=courseName)
-    options = CourseScoreService.get_dynamic_filter_options(db, current_filter)
+    options = await run_db(db, CourseScoreService.get_dynamic_filter_options, current_filter)
     if not options.terms:
         return Result.error(message="没有匹配课程")
     return Result.success(data=options)
 
 @router.post("/filter/dynamic", response_model=Result[CourseInfoFilterDTO])
-def get_dynamic_filter_options(currentFilter: CourseInfoFilterDTO = Body(...), db: Session = Depends(get_db)):
-    options = CourseScoreService.get_dynamic_filter_options(db, currentFilter)
+async def get_dynamic_filter_options(currentFilter: CourseInfoFilterDTO = Body(...), db: Session = Depends(get_session)):
+    options = await run_db(db, CourseScoreService.get_dynamic_filter_options, currentFilter)
     return Result.success(data=options)
 
 @router.post("/fail-rate", response_model=Result[FailRateStatisDTO])
-def get_fail_rate_statis(filter: CourseInfoFilterDTO = Body(...), db: Session = Depends(get_db)):
-    stats = CourseScoreService.get_fail_rate_statistics(db, filter)
-    return Result.success(data=stats)
+async def get_fail_rate_statis(filter: CourseInfoFilterDTO = Body(...), db: Session = Depends(get_session)):
+    stats = await run_db(db, CourseScoreService.get_fail_rate_statistics_json, filter)
+    return Result.success_raw(stats)
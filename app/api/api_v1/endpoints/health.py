@@ -0,0 +1,22 @@
+import os
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+from app.schemas.result import Result
+from app.services.warmup_service import WarmupService
+
+router = APIRouter()
+
+
+@router.get("/warmup")
+async def get_warmup_status():
+    return Result.success(data=WarmupService.status())
+
+
+@router.get("/ready")
+async def get_ready(request: Request):
+    """就绪探针：启动阶段（内存索引加载完成前）返回 503，供负载均衡与滚动重启判断。"""
+    state = request.app.state
+    data = {"pid": os.getpid(), "preloaded": getattr(state, "preloaded", False)}
+    if not getattr(state, "ready", False):
+        return ORJSONResponse(status_code=503, content={"code": 503, "message": "服务启动中", "data": data})
+    return Result.success(data=data)
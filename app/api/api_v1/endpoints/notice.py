@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, Path
+from datetime import datetime
+from fastapi import APIRouter, Depends, Path, Request, Response
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_session
+from app.core.config import settings
+from app.core.concurrency import run_db
+from app.api import http_cache
 from app.schemas.result import Result
 from app.services.notice_service import NoticeService
 
@@ -8,6 +12,11 @@ router = APIRouter()
 
 
 @router.get("/{key}")
-def get_notice(key: str = Path(..., max_length=20), db: Session = Depends(get_db)):
-    content = NoticeService.get(db, key)
-    return Result.success(data=content)
+async def get_notice(request: Request, response: Response,
+                     key: str = Path(..., max_length=20), db: Session = Depends(get_session)):
+    # L1 有副本时直接据此判断条件请求并应答，不进入线程池、不访问 Redis 与数据库
+    entry = NoticeService.peek_entry(key) or await run_db(db, NoticeService.get_entry, key)
+    updated_at = datetime.fromisoformat(entry["updatedAt"]) if entry["updatedAt"] else None
+    http_cache.check(request, response, http_cache.content_etag(entry["content"]),
+                     settings.HTTP_CACHE_NOTICE_MAX_AGE, private=False, last_modified=updated_at)
+    return Result.success(data=entry["content"])
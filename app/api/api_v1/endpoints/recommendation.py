@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_session
+from app.core.config import settings
+from app.core.concurrency import run_db
+from app.api.http_cache import data_cache
 from app.schemas.result import Result
 from app.schemas.dtos import RecFilterDTO, RecOptionsDTO, RecListResponseDTO
 from app.services.recommendation_service import RecommendationService
@@ -9,24 +12,28 @@ from typing import Optional
 router = APIRouter()
 
 
-@router.get("/options", response_model=Result[RecOptionsDTO])
-def get_options(
+@router.get("/options", response_model=Result[RecOptionsDTO],
+            dependencies=[Depends(data_cache(settings.HTTP_CACHE_DATA_MAX_AGE))])
+async def get_options(
     year: Optional[int] = None,
     college: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
 ):
-    options = RecommendationService.get_options(db, year, college)
+    options = await run_db(db, RecommendationService.get_options, year, college)
     return Result.success(data=options)
 
 
 @router.post("/list", response_model=Result[RecListResponseDTO])
-def get_rec_list(
+async def get_rec_list(
     f: RecFilterDTO,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
 ):
     if not f.year:
         return Result.error(message="请选择年份", code=400)
     f.page = max(1, f.page)
     f.pageSize = max(1, f.pageSize)
-    data = RecommendationService.query_list(db, f)
-    return Result.success(data=data)
+    try:
+        data = await run_db(db, RecommendationService.query_list_json, f)
+    except ValueError:
+        return Result.error(message="分页游标无效", code=400)
+    return Result.success_raw(data)
@@ -1,48 +1,85 @@
-from fastapi import APIRouter, Depends, Query, Request
+import time
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.db.session import get_session
+from app.core.concurrency import run_db
 from app.services.student_service import StudentService
-from app.schemas.dtos import RankDTO, SameNameDTO, VerifiedQueryDTO
+from app.schemas.dtos import RankDTO, SameNameDTO, VerifiedQueryDTO, DashboardQueryDTO
 from app.schemas.result import Result
 from app.api.deps import verify_request
 
 
 router = APIRouter()
 
+
+def _server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
 @router.post("/rank/id")
-def get_rank_by_id(body: VerifiedQueryDTO, request: Request, db: Session = Depends(get_db)):
-    session_token = verify_request(body, request)
+async def get_rank_by_id(body: VerifiedQueryDTO, request: Request, db: Session = Depends(get_session)):
+    session_token = await verify_request(body, request)
 
-    student = StudentService.get_student_by_id(db, body.sid)
+    student = await run_db(db, StudentService.get_student_by_id, body.sid)
     if not student:
         return Result.error(message="查无此人")
     
-    rank_dto = StudentService.get_student_rank(db, body.sid)
+    rank_dto = await run_db(db, StudentService.get_student_rank, body.sid, student)
     return Result.success(data={"sessionToken": session_token, "rankData": rank_dto.model_dump()})
 
 @router.get("/query/py", response_model=Result[List[SameNameDTO]])
-def get_students_by_pinyin(spy: str = Query(..., max_length=20), db: Session = Depends(get_db)):
-    students = StudentService.get_students_by_pinyin(db, spy)
+async def get_students_by_pinyin(spy: str = Query(..., max_length=20), db: Session = Depends(get_session)):
+    students = await run_db(db, StudentService.get_students_by_pinyin, spy)
     return Result.success(data=students)
 
 @router.get("/query/name", response_model=Result[List[SameNameDTO]])
-def get_students_by_name(sname: str = Query(..., max_length=20), db: Session = Depends(get_db)):
-    students = StudentService.get_students_by_name(db, sname)
+async def get_students_by_name(sname: str = Query(..., max_length=20), db: Session = Depends(get_session)):
+    students = await run_db(db, StudentService.get_students_by_name, sname)
+    return Result.success(data=students)
+
+@router.get("/query/suggest", response_model=Result[List[SameNameDTO]])
+async def suggest_students(
+    q: str = Query(..., min_length=1, max_length=20, description="姓名、全拼或拼音首字母的前缀"),
+    limit: Optional[int] = Query(None, ge=1, le=50, description="最多返回条数"),
+    db: Session = Depends(get_session)
+):
+    students = await run_db(db, StudentService.suggest_students, q, limit or settings.STUDENT_SUGGEST_TOP_K)
     return Result.success(data=students)
 
 @router.get("/rank/major")
-def get_major_ranking(
+async def get_major_ranking(
     sid: str = Query(..., max_length=20, description="学号，用于获取专业信息"),
     sortBy: str = Query("gpa", pattern="^(gpa|avg)$", description="排序字段: gpa 或 avg"),
     order: str = Query("desc", pattern="^(desc|asc)$", description="排序方式: desc 或 asc"),
     page: int = Query(1, ge=1, description="页码"),
     pageSize: int = Query(35, ge=1, le=10000, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    student = StudentService.get_student_by_id(db, sid)
+    student = await run_db(db, StudentService.get_student_by_id, sid)
     if not student:
         return Result.error(message="查无此人")
     
-    ranking = StudentService.get_major_ranking_list(db, student, sortBy, order, page, pageSize)
+    ranking = await run_db(db, StudentService.get_major_ranking_list, student, sortBy, order, page, pageSize)
     return Result.success(data=ranking)
+
+@router.post("/dashboard")
+async def get_dashboard(body: DashboardQueryDTO, request: Request, response: Response,
+                        db: Session = Depends(get_session)):
+    """成绩、排名与专业排名第 1 页合并为一次请求；各部分耗时见 Server-Timing 响应头。"""
+    start = time.perf_counter()
+    session_token = await verify_request(body, request)
+    timings = {"verify": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    student = await run_db(db, StudentService.get_student_by_id, body.sid)
+    timings["student"] = time.perf_counter() - start
+    if not student:
+        return Result.error(message="查无此人")
+
+    data, section_timings = await run_db(db, StudentService.get_dashboard, student,
+                                         body.sortBy, body.order, body.pageSize)
+    timings.update(section_timings)
+    response.headers["Server-Timing"] = _server_timing(timings)
+    return Result.success(data={"sessionToken": session_token, **data})
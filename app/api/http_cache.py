@@ -0,0 +1,86 @@
+"""
+HTTP 条件请求（ETag / Last-Modified）与 Cache-Control
+
+- 由导入数据派生的接口（/rec/options、/cs/name、/cs/filter）：内容只在缓存代际变更或定向失效
+  （导入、重算后 invalidate）时改变，ETag 取 "缓存结构版本.数据版本"（数据版本随代际递增一起递增），
+  无需读取数据即可判断，命中 If-None-Match 时在执行查询前返回 304。
+  由进程内结构应答的接口（/cs/name 的课程名索引、/cs/filter 的列式数据集）取该结构构建时记下的
+  数据版本，失效后到后台重建完成之前仍返回旧 ETag，不会给旧内容配上新 ETag
+- 公告（/notice/{key}）：ETag 取自内容摘要，Last-Modified 取自 notice.updated_at；
+  进程内 L1 有副本时先按副本判断，命中时不访问 Redis 与数据库
+
+ETag 均为强校验器：同一数据版本（或同一内容）的响应体逐字节相同。
+
+304 通过抛出 NotModified 由 main 中的异常处理器返回（不带响应体）。
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from fastapi import Request, Response
+from app.db.redis import CACHE_SCHEMA_VERSION, get_data_version
+
+
+class NotModified(Exception):
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+
+def data_etag(version: Optional[int] = None) -> str:
+    """version 为应答所用数据的数据版本，缺省取当前数据版本。"""
+    if version is None:
+        version = get_data_version()
+    return f'"v{CACHE_SCHEMA_VERSION}.{version}"'
+
+
+def content_etag(content: str) -> str:
+    return f'"{hashlib.md5(content.encode()).hexdigest()[:16]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 按弱比较（RFC 9110）：忽略 W/ 前缀，支持逗号分隔的多个值与 *。"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP 日期精确到秒
+    return last_modified.replace(microsecond=0) <= since
+
+
+def check(request: Request, response: Response, etag: str, max_age: int,
+          private: bool = True, last_modified: Optional[datetime] = None):
+    """为响应设置缓存头；客户端缓存仍有效时抛出 NotModified。
+    同时带 If-None-Match 与 If-Modified-Since 时仅按前者判断。"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}",
+    }
+    if last_modified is not None:
+        # 数据库 DATETIME 不带时区，按服务器本地时间解释
+        last_modified = last_modified.astimezone(timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            raise NotModified(headers)
+    elif last_modified is not None:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and _not_modified_since(if_modified_since, last_modified):
+            raise NotModified(headers)
+
+
+def data_cache(max_age: int, version: Optional[Callable[[], Optional[int]]] = None):
+    """路由依赖：数据派生接口的条件请求检查，在端点执行任何查询之前完成。
+    version 返回应答该接口的进程内结构的数据版本（结构未加载、回退到缓存查询时返回 None）。"""
+    async def dependency(request: Request, response: Response):
+        check(request, response, data_etag(version() if version else None), max_age)
+    return dependency
@@ -0,0 +1,32 @@
+"""
+缓存管理命令
+
+    python -m app.cli.cache generation   查看当前缓存代际
+    python -m app.cli.cache bump         递增代际，使全部缓存失效（数据导入或重算后执行）
+    python -m app.cli.cache invalidate <标签>...
+                                         只失效依赖这些标签的缓存（如 notice:index、major:20210510，见 app/services/cache_tags.py）
+"""
+import sys
+import logging
+from app.db.redis import get_cache_generation, bump_cache_generation, invalidate
+
+logging.basicConfig(format="%(asctime)s %(levelname)s [%(name)s] %(message)s", level=logging.INFO)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "generation"
+    if command == "bump":
+        print(bump_cache_generation())
+    elif command == "generation":
+        print(get_cache_generation())
+    elif command == "invalidate" and len(argv) > 1:
+        print(invalidate(*argv[1:]))
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+批量导入成绩 / 学生数据，完成后按受影响的学生、专业、课程定向失效缓存
+
+    python -m app.cli.ingest scores.csv
+    python -m app.cli.ingest students.xlsx --table students --sheet Sheet1
+    python -m app.cli.ingest scores.csv --encoding gbk --chunk-rows 10000 --touched-out touched.json
+    python -m app.cli.ingest scores.csv --recompute
+
+--recompute 在导入后重算受影响专业的均分 / 绩点与排名（见 app.cli.recompute），再统一失效缓存。
+
+输出 JSON 报告（读取 / 写入 / 拒绝行数、每秒行数、受影响集合计数、失效 key 数），
+--touched-out 另将受影响的学号、班级、专业代码、课程写入文件。
+"""
+import sys
+import json
+import argparse
+import logging
+from app.services import recompute
+from app.services.ingest_service import IngestError, IngestService, TARGETS, Touched
+
+logging.basicConfig(format="%(asctime)s %(levelname)s [%(name)s] %(message)s", level=logging.INFO)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV 或 XLSX 文件")
+    parser.add_argument("--table", choices=sorted(TARGETS), default="scores")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="每批行数（默认 INGEST_CHUNK_ROWS）")
+    parser.add_argument("--encoding", default="utf-8-sig", help="CSV 编码")
+    parser.add_argument("--sheet", default=None, help="XLSX 工作表名（默认第一个）")
+    parser.add_argument("--no-invalidate", action="store_true", help="不失效缓存（之后自行执行 app.cli.cache bump）")
+    parser.add_argument("--touched-out", default=None, help="受影响集合输出文件（JSON）")
+    parser.add_argument("--recompute", action="store_true", help="导入后增量重算受影响专业的均分 / 绩点与排名")
+    args = parser.parse_args(argv)
+
+    touched = Touched()
+    invalidate = not args.no_invalidate
+    try:
+        report = IngestService.ingest(args.path, args.table, args.chunk_rows, args.encoding, args.sheet,
+                                      invalidate=invalidate and not args.recompute, touched=touched)
+    except IngestError as e:
+        print(f"导入失败: {e}", file=sys.stderr)
+        return 1
+    if args.recompute:
+        if touched.majors:
+            report["recompute"] = recompute.recompute(touched.majors, invalidate=False)
+            touched.sids.update(report["recompute"].pop("changed_sids"))
+            touched.aggregates_changed = True
+        if invalidate and report["upserted"]:
+            report["invalidation"] = IngestService.invalidate(touched)
+    if args.touched_out:
+        with open(args.touched_out, "w", encoding="utf-8") as f:
+            json.dump(touched.to_dict(), f, ensure_ascii=False)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["upserted"] or not report["read"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
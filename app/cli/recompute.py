@@ -0,0 +1,44 @@
+"""
+重算学生均分 / 绩点与班级、专业排名并写回 student 表
+
+    python -m app.cli.recompute                                  全量重算，完成后递增缓存代际
+    python -m app.cli.recompute --majors 20210510 20210511       只重算给定专业（专业代码为班级号前 8 位）
+    python -m app.cli.recompute --classes 2021051002             只重算给定班级所属的专业
+    python -m app.cli.recompute --touched touched.json           只重算一次导入影响的专业（app.cli.ingest --touched-out 的输出）
+
+增量模式完成后按专业定向失效缓存。输出 JSON 报告（学生数、成绩行数、有变化的学生数、耗时）。
+"""
+import sys
+import json
+import argparse
+import logging
+from app.services import recompute
+from app.services.ingest_service import Touched
+from app.utils.class_utils import get_major_code
+
+logging.basicConfig(format="%(asctime)s %(levelname)s [%(name)s] %(message)s", level=logging.INFO)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--majors", nargs="+", default=None)
+    parser.add_argument("--classes", nargs="+", default=None)
+    parser.add_argument("--touched", default=None, help="受影响集合文件（JSON）")
+    parser.add_argument("--no-invalidate", action="store_true", help="不失效缓存")
+    args = parser.parse_args(argv)
+
+    majors = None
+    if args.majors or args.classes or args.touched:
+        majors = set(args.majors or ())
+        majors.update(get_major_code(c) for c in args.classes or () if get_major_code(c))
+        if args.touched:
+            with open(args.touched, encoding="utf-8") as f:
+                majors |= Touched.from_dict(json.load(f)).majors
+    report = recompute.recompute(majors, invalidate=not args.no_invalidate)
+    report.pop("changed_sids")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
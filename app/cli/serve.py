@@ -0,0 +1,444 @@
+"""
+多进程启动（生产环境）
+
+    python -m app.cli.serve
+    python -m app.cli.serve --workers 8 --port 3099
+    kill -HUP <主进程 pid>     滚动重启（数据导入后重新加载内存结构）
+
+- 主进程在 fork 前加载内存索引并预热缓存（app.main.preload）后绑定监听端口，各工作进程（uvicorn）
+  以写时复制共享这些只读结构，启动时无需各自重复加载；--no-preload 时由各工作进程自行加载，
+  加载完成后才开始接受连接
+- 工作进程数：--workers / WEB_WORKERS，为 0 时取可用 CPU 数 × WEB_WORKERS_PER_CPU（至少 1）
+- 工作进程启动完成（lifespan 执行完毕）后经管道通知主进程就绪；异常退出时重新拉起，
+  启动即失败的进程按指数退避重试。首批工作进程未能全部就绪时主进程退出
+- SIGHUP：滚动重启。主进程重新加载数据后逐个替换工作进程，新进程就绪后才停止对应的旧进程；
+  新进程在 --ready-timeout 秒内未就绪时放弃本次重启，其余旧进程继续服务
+- SIGTERM / SIGINT：工作进程处理完当前请求后退出，超过 --graceful-timeout 秒强制结束
+- 指标（METRICS_ENABLED）：主端口不提供 /metrics。主进程在 METRICS_HOST:METRICS_PORT（默认 127.0.0.1）上监听，
+  每次采集时经 socketpair 向各工作进程取 snapshot 并累加输出；已退出工作进程的计数保留最后一次取得的值
+  （两次采集之间的增量随进程丢失），计数器不会回退
+
+滚动重启只重新加载数据，代码变更需要完整重启（代码在主进程启动时已导入）。
+"""
+import os
+import sys
+import time
+import select
+import signal
+import socket
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional
+import orjson
+from app.core import metrics
+from app.core.config import settings
+import app.main as app_main
+
+logger = logging.getLogger("app.cli.serve")
+
+MAX_BACKOFF = 30.0
+METRICS_TIMEOUT = 2.0  # 采集时等待单个工作进程返回 snapshot 的最长时间（秒）
+
+
+def worker_count(workers: int = 0, per_cpu: float = 1.0) -> int:
+    if workers > 0:
+        return workers
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, int(cpus * per_cpu))
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        data += chunk
+    return data
+
+
+def _serve_snapshots(sock: socket.socket):
+    """工作进程：每收到一个请求字节，返回一帧（4 字节长度 + JSON）当前进程的指标 snapshot。"""
+    try:
+        while sock.recv(1):
+            payload = orjson.dumps(metrics.snapshot())
+            sock.sendall(len(payload).to_bytes(4, "big") + payload)
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+class MetricsExporter:
+    """主进程：在内网端口上输出各工作进程指标之和。采集串行进行（同一时间只向工作进程发出一轮请求）。"""
+
+    def __init__(self, host: str, port: int):
+        self._lock = threading.Lock()
+        self._socks: Dict[int, socket.socket] = {}
+        self._last: Dict[int, dict] = {}
+        self._retired: dict = {}
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render(exporter.collect()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", metrics.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add(self, pid: int, sock: socket.socket):
+        with self._lock:
+            self._socks[pid] = sock
+
+    def retire(self, pid: int):
+        """工作进程已退出：最后一次取得的计数并入累计值（仪表值丢弃）。"""
+        with self._lock:
+            sock = self._socks.pop(pid, None)
+            if sock is not None:
+                sock.close()
+            last = self._last.pop(pid, None)
+            if last is not None:
+                self._retired = metrics.merge([self._retired, last], gauges=False)
+
+    def collect(self) -> dict:
+        with self._lock:
+            failed = []
+            for pid, sock in self._socks.items():
+                try:
+                    sock.settimeout(METRICS_TIMEOUT)
+                    sock.sendall(b"?")
+                    size = int.from_bytes(_recv_exact(sock, 4), "big")
+                    self._last[pid] = orjson.loads(_recv_exact(sock, size))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"读取工作进程 {pid} 的指标失败: {e}")
+                    failed.append(pid)
+            for pid in failed:
+                # 连接上可能残留半帧，关闭后不再采集此进程（保留其最后一次取得的计数）
+                self._socks.pop(pid).close()
+            return metrics.merge([self._retired, *self._last.values()])
+
+    def close_in_child(self):
+        """fork 后的工作进程中关闭继承来的监听与其他工作进程的连接（不取锁：子进程只有当前线程）。"""
+        self.server.socket.close()
+        for sock in self._socks.values():
+            sock.close()
+
+
+def _run_worker(sock: socket.socket, ready_fd: int, args, metrics_sock: Optional[socket.socket] = None) -> int:
+    import uvicorn
+    from app.db.session import dispose_after_fork
+
+    dispose_after_fork()
+    config = uvicorn.Config(app_main.app, access_log=not args.no_access_log,
+                            timeout_graceful_shutdown=args.graceful_timeout)
+    server = uvicorn.Server(config)
+    master = os.getppid()
+
+    def watch():
+        # 启动完成后通知主进程；主进程意外退出后自行退出
+        while not server.started and not server.should_exit:
+            time.sleep(0.05)
+        if server.started:
+            os.write(ready_fd, b"1")
+        os.close(ready_fd)
+        while not server.should_exit:
+            if os.getppid() != master:
+                logger.warning("主进程已退出，工作进程随之退出")
+                server.should_exit = True
+            time.sleep(1)
+
+    threading.Thread(target=watch, name="worker-watch", daemon=True).start()
+    if metrics_sock is not None:
+        threading.Thread(target=_serve_snapshots, args=(metrics_sock,), name="metrics-snapshot", daemon=True).start()
+    server.run(sockets=[sock])
+    return 0 if server.started else 3
+
+
+class _Worker:
+    def __init__(self, pid: int, ready_fd: int):
+        self.pid = pid
+        self.ready_fd: Optional[int] = ready_fd
+        self.ready = False
+        self.retiring = False
+
+
+class Master:
+    def __init__(self, sock: socket.socket, size: int, args, exporter: Optional[MetricsExporter] = None):
+        self.sock = sock
+        self.size = size
+        self.args = args
+        self.exporter = exporter
+        self.workers: Dict[int, _Worker] = {}
+        self._stopping = False
+        self._reload = False
+        self._backoff = 0.0
+        self._next_spawn = 0.0
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+    # ---------- 信号 ----------
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def _install_signals(self):
+        signal.set_wakeup_fd(self._wakeup_w, warn_on_full_buffer=False)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        # 仅用于唤醒 select 及时回收退出的工作进程
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    # ---------- 工作进程 ----------
+
+    def spawn(self) -> _Worker:
+        r, w = os.pipe()
+        parent_sock, child_sock = socket.socketpair() if self.exporter is not None else (None, None)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(r)
+                if parent_sock is not None:
+                    parent_sock.close()
+                self._after_fork()
+                code = _run_worker(self.sock, w, self.args, child_sock)
+            except BaseException:
+                logger.exception("工作进程异常退出")
+            finally:
+                os._exit(code)
+        os.close(w)
+        if self.exporter is not None:
+            child_sock.close()
+            self.exporter.add(pid, parent_sock)
+        worker = _Worker(pid, r)
+        self.workers[pid] = worker
+        logger.info(f"已启动工作进程 {pid}")
+        return worker
+
+    def _after_fork(self):
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+        for worker in self.workers.values():
+            if worker.ready_fd is not None:
+                os.close(worker.ready_fd)
+        if self.exporter is not None:
+            self.exporter.close_in_child()
+            metrics.reset_after_fork()
+
+    def _active(self) -> List[_Worker]:
+        return [w for w in self.workers.values() if not w.retiring]
+
+    def _retire(self, worker: _Worker, signum: int = signal.SIGTERM):
+        worker.retiring = True
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _step(self, timeout: float):
+        """等待就绪通知 / 信号 / 超时，然后回收已退出的工作进程。"""
+        fds = {w.ready_fd: w for w in self.workers.values() if w.ready_fd is not None}
+        try:
+            readable, _, _ = select.select([self._wakeup_r, *fds], [], [], timeout)
+        except InterruptedError:
+            readable = []
+        for fd in readable:
+            if fd == self._wakeup_r:
+                try:
+                    while os.read(fd, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            worker = fds[fd]
+            if os.read(fd, 1):
+                worker.ready = True
+                self._backoff = 0.0
+                logger.info(f"工作进程 {worker.pid} 已就绪")
+            else:
+                os.close(fd)
+                worker.ready_fd = None
+        self._reap()
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            if self.exporter is not None:
+                self.exporter.retire(pid)
+            if worker.ready_fd is not None:
+                os.close(worker.ready_fd)
+            if worker.retiring or self._stopping:
+                logger.info(f"工作进程 {pid} 已退出")
+                continue
+            logger.error(f"工作进程 {pid} 意外退出（{self._describe(status)}）")
+            if not worker.ready:
+                self._backoff = min(MAX_BACKOFF, max(1.0, self._backoff * 2))
+            self._next_spawn = time.monotonic() + self._backoff
+
+    @staticmethod
+    def _describe(status: int) -> str:
+        if os.WIFSIGNALED(status):
+            return f"信号 {os.WTERMSIG(status)}"
+        return f"退出码 {os.waitstatus_to_exitcode(status)}"
+
+    def _wait_ready(self, worker: _Worker, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not worker.ready and worker.pid in self.workers and not self._stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._step(min(remaining, 1.0))
+        return worker.ready
+
+    # ---------- 启动 / 滚动重启 / 停止 ----------
+
+    def _start(self) -> bool:
+        workers = [self.spawn() for _ in range(self.size)]
+        for worker in workers:
+            if not self._wait_ready(worker, self.args.ready_timeout):
+                if not self._stopping:
+                    logger.error(f"工作进程 {worker.pid} 未能在 {self.args.ready_timeout} 秒内就绪")
+                return False
+        logger.info(f"{self.size} 个工作进程已就绪，监听 {self.args.host}:{self.args.port}")
+        return True
+
+    def _rolling_restart(self):
+        self._reload = False
+        logger.info("滚动重启：重新加载数据")
+        if self.args.preload:
+            try:
+                app_main.preload()
+            except Exception as e:
+                logger.error(f"重新加载失败，保留现有工作进程: {e}", exc_info=True)
+                return
+        for old in list(self._active()):
+            if self._stopping:
+                return
+            new = self.spawn()
+            if not self._wait_ready(new, self.args.ready_timeout):
+                if not self._stopping:
+                    logger.error(f"新工作进程 {new.pid} 未能就绪，放弃本次滚动重启")
+                    self._retire(new, signal.SIGKILL)
+                return
+            if old.pid in self.workers:
+                self._retire(old)
+        logger.info("滚动重启完成")
+
+    def _maintain(self):
+        """补足意外退出的工作进程（按退避时间）。"""
+        while len(self._active()) < self.size and time.monotonic() >= self._next_spawn:
+            self.spawn()
+            self._next_spawn = time.monotonic() + self._backoff
+
+    def _shutdown(self):
+        logger.info("正在停止工作进程")
+        for worker in list(self.workers.values()):
+            self._retire(worker)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self._step(0.2)
+        for worker in list(self.workers.values()):
+            logger.warning(f"工作进程 {worker.pid} 未在限时内退出，强制结束")
+            self._retire(worker, signal.SIGKILL)
+        while self.workers:
+            self._step(0.2)
+
+    def run(self) -> int:
+        self._install_signals()
+        if self.exporter is not None:
+            self.exporter.start()
+        code = 0
+        if self._start():
+            while not self._stopping:
+                if self._reload:
+                    self._rolling_restart()
+                self._maintain()
+                self._step(1.0)
+        elif not self._stopping:
+            code = 1
+        self._shutdown()
+        if self.exporter is not None:
+            self.exporter.close()
+        return code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS, help="工作进程数（0 为按 CPU 数）")
+    parser.add_argument("--workers-per-cpu", type=float, default=settings.WEB_WORKERS_PER_CPU)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--ready-timeout", type=float, default=settings.STARTUP_READY_TIMEOUT,
+                        help="工作进程启动的最长等待时间（秒）")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="停止时等待当前请求处理完的最长时间（秒）")
+    parser.add_argument("--no-preload", dest="preload", action="store_false", help="不在主进程中预加载，由各工作进程自行加载")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args(argv)
+
+    size = worker_count(args.workers, args.workers_per_cpu)
+    logger.info(f"主进程 {os.getpid()}，工作进程数 {size}")
+    if args.preload:
+        start = time.perf_counter()
+        app_main.preload()
+        logger.info(f"预加载完成，耗时 {time.perf_counter() - start:.1f} 秒")
+    # 预加载完成后才监听，加载期间的连接直接被拒绝而不是在队列中等待
+    sock = bind(args.host, args.port, args.backlog)
+    app_main.wait_ready = True
+    exporter = None
+    if metrics.enabled():
+        app_main.metrics_route = False
+        exporter = MetricsExporter(settings.METRICS_HOST, settings.METRICS_PORT)
+        logger.info(f"指标汇总输出于 http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics")
+    return Master(sock, size, args, exporter).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
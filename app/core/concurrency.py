@@ -0,0 +1,63 @@
+"""
+同步 / 异步两种运行模式的桥接（由 settings.ASYNC_MODE 选择）
+
+- 同步模式：服务层代码在 Starlette 线程池中执行，使用 SessionLocal、redis.Redis、httpx 同步客户端
+- 异步模式：同一份服务层代码在 greenlet 中执行（AsyncSession.run_sync / greenlet_spawn），
+  其中的 DB、Redis、HTTP 调用通过 await_only 交还事件循环，不占用线程
+
+服务层只需用 wait() 包裹可能为协程的返回值，即可两种模式通用。
+"""
+from typing import Any, Callable, TypeVar
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.util import await_only, greenlet_spawn
+from sqlalchemy.util.concurrency import in_greenlet
+from app.core.config import settings
+from app.core import metrics
+
+T = TypeVar("T")
+
+
+def in_async_context() -> bool:
+    """当前是否处于异步模式的 greenlet 中（此时 IO 客户端应使用异步版本）。"""
+    return settings.ASYNC_MODE and in_greenlet()
+
+
+def wait(result: Any) -> Any:
+    """异步上下文中等待协程完成；同步上下文中原样返回。"""
+    if in_async_context():
+        return await_only(result)
+    return result
+
+
+async def run_sync(fn: Callable[..., T], *args) -> T:
+    """执行不依赖数据库的服务函数。"""
+    if settings.ASYNC_MODE:
+        return await greenlet_spawn(fn, *args)
+    return await run_in_threadpool(fn, *args)
+
+
+async def run_db(db, fn: Callable[..., T], *args) -> T:
+    """执行以 Session 为第一个参数的服务函数。
+    异步模式下 db 为 AsyncSession，通过 run_sync 传入与之绑定的同步 Session。"""
+    if settings.ASYNC_MODE:
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
+THREADPOOL = metrics.Gauge("threadpool_threads", "请求线程池（state: limit / busy / waiting）", ("state",))
+
+
+def collect_threadpool_metrics():
+    """读取 anyio 默认线程池限额的占用与排队数；需在事件循环中调用（/metrics 接口内）。"""
+    try:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        return
+    stats = limiter.statistics()
+    THREADPOOL.set(limiter.total_tokens, "limit")
+    THREADPOOL.set(stats.borrowed_tokens, "busy")
+    THREADPOOL.set(stats.tasks_waiting, "waiting")
+
+
+metrics.on_collect(collect_threadpool_metrics)
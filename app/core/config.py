@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -5,12 +6,30 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/kldj"
     PORT: int = 3099
     
-    # 数据库
-    DB_USER: str
-    DB_PASSWORD: str
-    DB_HOST: str
-    DB_PORT: str
-    DB_NAME: str
+    # 数据库（DB_URL / ASYNC_DB_URL 为完整连接串，设置后覆盖由 DB_* 拼接的地址，如基准测试使用 SQLite）
+    DB_USER: str = ""
+    DB_PASSWORD: str = ""
+    DB_HOST: str = ""
+    DB_PORT: str = ""
+    DB_NAME: str = ""
+    DB_URL: str = ""
+    ASYNC_DB_URL: str = ""
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    # 只读副本（见 app.db.replicas）：设置后接口与后台索引加载默认从副本读取，导入、重算等写入使用主库。
+    # 值为 JSON 列表，如 DB_REPLICA_URLS='["mysql+mysqlconnector://u:p@r1/db", "mysql+mysqlconnector://u:p@r2/db"]'；
+    # 异步模式另需一一对应的 ASYNC_DB_REPLICA_URLS。DB_REPLICA_WEIGHTS 缺省均为 1
+    DB_REPLICA_URLS: List[str] = []
+    ASYNC_DB_REPLICA_URLS: List[str] = []
+    DB_REPLICA_WEIGHTS: List[int] = []
+    DB_REPLICA_POLICY: str = "weighted"  # weighted / least_connections
+    DB_REPLICA_HEALTH_INTERVAL: int = 5
+    # 缓存失效后在此秒数内从主库读取，应不小于副本的正常复制延迟
+    DB_REPLICA_PRIMARY_GRACE: float = 10.0
+
+    # 运行模式：False 为同步（线程池）模式，True 为全异步模式（aiomysql + redis.asyncio）
+    ASYNC_MODE: bool = False
 
     # Redis 缓存
     REDIS_HOST: str = "localhost"
@@ -18,6 +37,59 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = ""
     REDIS_DB: int = 0
 
+    # 进程内 L1 缓存（仅对下列前缀的近静态数据生效）
+    L1_CACHE_ENABLED: bool = True
+    L1_CACHE_MAX_ENTRIES: int = 10000
+    L1_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    L1_CACHE_PREFIXES: List[str] = ["notice", "rec_opts", "course_names"]
+
+    # 缓存值压缩（见 app.db.codecs）：编码后不小于 CACHE_COMPRESS_MIN_BYTES 字节的值压缩后写入 Redis。
+    # CACHE_COMPRESSION 为 zlib / zstd（需安装 zstandard，未安装时用 zlib）/ none
+    CACHE_COMPRESSION: str = "zlib"
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    CACHE_COMPRESS_LEVEL: int = 1
+
+    # 挂科率列式内存数据集（启动时后台加载，按间隔刷新，单位秒）
+    FAIL_RATE_ENGINE_ENABLED: bool = True
+    FAIL_RATE_ENGINE_REFRESH: int = 3600
+
+    # 课程名 n-gram 索引（/cs/name），非空查询最多返回 COURSE_NAME_TOP_K 条
+    COURSE_NAME_INDEX_ENABLED: bool = True
+    COURSE_NAME_INDEX_REFRESH: int = 3600
+    COURSE_NAME_TOP_K: int = 50
+
+    # 学生姓名索引（姓名 / 全拼 / 拼音首字母，/stu/query/*），自动补全最多返回 STUDENT_SUGGEST_TOP_K 条
+    STUDENT_NAME_INDEX_ENABLED: bool = True
+    STUDENT_NAME_INDEX_REFRESH: int = 3600
+    STUDENT_SUGGEST_TOP_K: int = 20
+
+    # 缓存预热（启动及缓存代际变更后在后台执行）
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONCURRENCY: int = 2
+    WARMUP_TOP_COURSES: int = 50
+
+    # 多进程部署（python -m app.cli.serve）：WEB_WORKERS 为 0 时按可用 CPU 数 × WEB_WORKERS_PER_CPU 取整（至少 1）。
+    # 主进程在 fork 前加载内存索引并预热，工作进程共享；工作进程在 STARTUP_READY_TIMEOUT 秒内未就绪视为启动失败
+    WEB_WORKERS: int = 0
+    WEB_WORKERS_PER_CPU: float = 1.0
+    STARTUP_READY_TIMEOUT: int = 600
+
+    # HTTP 缓存（Cache-Control max-age，单位秒）：公告可在数据库中直接修改，取较短值；
+    # 其余由导入数据派生的接口仅在缓存代际变更后才会变化
+    HTTP_CACHE_NOTICE_MAX_AGE: int = 60
+    HTTP_CACHE_DATA_MAX_AGE: int = 600
+
+    # 批量导入（python -m app.cli.ingest）每批 upsert 的行数，决定导入时的内存占用
+    INGEST_CHUNK_ROWS: int = 5000
+    # 均分 / 绩点与排名重算（python -m app.cli.recompute）每批写回的学生数
+    RECOMPUTE_BATCH_ROWS: int = 2000
+
+    # 指标（Prometheus 文本格式），默认关闭。单进程时为主端口上的 GET /metrics；多进程（app.cli.serve）时
+    # 由主进程汇总各工作进程后在 METRICS_HOST:METRICS_PORT 上输出，主端口不提供。指标不做鉴权，只应绑定内网地址
+    METRICS_ENABLED: bool = False
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9099
+
     # 频率限制
     CHALLENGE_RATE_LIMIT: int = 10
 
@@ -33,8 +105,16 @@ class Settings(BaseSettings):
 
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_URL:
+            return self.DB_URL
         return f"mysql+mysqlconnector://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        if self.ASYNC_DB_URL:
+            return self.ASYNC_DB_URL
+        return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 settings = Settings()
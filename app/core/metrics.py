@@ -0,0 +1,271 @@
+"""
+进程内指标，以 Prometheus 文本格式从 GET /metrics 输出
+
+- 请求：按路由模板与方法统计耗时直方图，按状态码计数
+- 数据库：按路由统计 SQL 语句数与耗时（SQLAlchemy cursor 事件），连接池占用 / 溢出
+- Redis：按命令统计调用次数与耗时（pipeline 整体计一次，对应一次往返）
+- 缓存：L1 / Redis 两层按 key 前缀的命中与未命中
+- 线程池：占用与排队数
+
+路由模板取自 FastAPI 写入 scope 的 route，未匹配的请求归入 "unmatched"，请求之外的
+SQL（预热、后台刷新）归入 "background"，标签取值有限。
+每个进程独立统计。多进程部署（app.cli.serve）时主端口不提供 /metrics，由主进程向各工作进程取 snapshot，
+以 merge 累加后在内网监听 METRICS_HOST:METRICS_PORT 上输出；已退出工作进程的计数保留最后一次取得的值，
+汇总后的计数器不会回退。记录路径只有加锁累加，开销见 bench/metrics_overhead.py；
+METRICS_ENABLED（默认关闭）关闭时中间件与各钩子直接跳过。
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REDIS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+BACKGROUND = "background"
+UNMATCHED = "unmatched"
+
+
+def enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class _Value(_Metric):
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    @staticmethod
+    def add(total: dict, entries: list):
+        for labels, value in entries:
+            key = tuple(labels)
+            total[key] = total.get(key, 0.0) + value
+
+    def render(self, entries: list) -> List[str]:
+        lines = self._header()
+        lines += [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}"
+                  for k, v in sorted((tuple(k), v) for k, v in entries)]
+        return lines
+
+
+class Counter(_Value):
+    kind = "counter"
+
+
+class Gauge(_Value):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # 标签 -> [各桶计数（非累计，末位为 +Inf）, 总和]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(k), list(v[0]), v[1]] for k, v in self._values.items()]
+
+    @staticmethod
+    def add(total: dict, entries: list):
+        for labels, counts, value in entries:
+            key = tuple(labels)
+            entry = total.get(key)
+            if entry is None:
+                total[key] = [list(counts), value]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += value
+
+    def render(self, entries: list) -> List[str]:
+        lines = self._header()
+        for labels, counts, total in sorted((tuple(k), c, t) for k, c, t in entries):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{_fmt(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+_registry: List[_Metric] = []
+_collectors: List[Callable[[], None]] = []
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP 请求耗时", ("route", "method"))
+REQUESTS = Counter("http_requests_total", "HTTP 请求数", ("route", "method", "status"))
+DB_STATEMENTS = Counter("db_statements_total", "SQL 语句数", ("route",))
+DB_SECONDS = Counter("db_statement_seconds_total", "SQL 执行耗时合计", ("route",))
+REDIS_SECONDS = Histogram("redis_command_duration_seconds", "Redis 调用耗时（pipeline 计一次）",
+                          ("command",), REDIS_BUCKETS)
+REDIS_ERRORS = Counter("redis_command_errors_total", "Redis 调用失败数", ("command",))
+
+
+def on_collect(callback: Callable[[], None]):
+    """注册采集回调：每次输出前调用，用于更新连接池、缓存命中等由外部状态决定的指标。"""
+    _collectors.append(callback)
+
+
+def reset_after_fork():
+    """fork 出的工作进程从零开始计数，不重复计入主进程已有的取值；锁可能在 fork 时被其他线程持有，一并重建。"""
+    for metric in _registry:
+        metric._lock = threading.Lock()
+        metric._values.clear()
+
+
+def snapshot() -> Dict[str, list]:
+    """当前进程全部指标的取值（指标名 -> 条目列表，可 JSON 序列化），输出前先调用采集回调。"""
+    for callback in _collectors:
+        callback()
+    return {metric.name: metric.dump() for metric in _registry}
+
+
+def merge(snapshots: Iterable[Dict[str, list]], gauges: bool = True) -> Dict[str, list]:
+    """按指标与标签累加多个进程的 snapshot（仪表值同样取和）；gauges=False 时不含仪表值，
+    用于累计已退出进程的计数。"""
+    totals: Dict[str, dict] = {}
+    for snap in snapshots:
+        for metric in _registry:
+            if metric.name in snap and (gauges or not isinstance(metric, Gauge)):
+                metric.add(totals.setdefault(metric.name, {}), snap[metric.name])
+    return {name: [[list(k), *(v if isinstance(v, list) else [v])] for k, v in total.items()]
+            for name, total in totals.items()}
+
+
+def render(snap: Optional[Dict[str, list]] = None) -> str:
+    """输出 Prometheus 文本；snap 缺省为当前进程的 snapshot()。"""
+    snap = snapshot() if snap is None else snap
+    lines: List[str] = []
+    for metric in _registry:
+        lines += metric.render(snap.get(metric.name, []))
+    return "\n".join(lines) + "\n"
+
+
+# ---------- 请求上下文 ----------
+
+class _RequestStats:
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+# 线程池（run_in_threadpool 复制上下文）与异步模式的 greenlet（继承驱动方上下文）中均可见
+_request: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request", default=None)
+
+
+def record_sql(seconds: float):
+    stats = _request.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += seconds
+    else:
+        DB_STATEMENTS.inc(BACKGROUND)
+        DB_SECONDS.inc(BACKGROUND, amount=seconds)
+
+
+def record_redis(command: str, seconds: float, ok: bool = True):
+    REDIS_SECONDS.observe(seconds, command)
+    if not ok:
+        REDIS_ERRORS.inc(command)
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：记录请求耗时、状态码，以及请求期间的 SQL 语句数与耗时。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = _request.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED
+            method = scope.get("method", "")
+            REQUEST_SECONDS.observe(elapsed, path, method)
+            REQUESTS.inc(path, method, str(status[0]))
+            DB_STATEMENTS.inc(path, amount=stats.sql_count)
+            DB_SECONDS.inc(path, amount=stats.sql_seconds)
@@ -0,0 +1,92 @@
+"""
+后台定时任务：在守护线程中按固定间隔执行函数（用于内存索引的加载与刷新）
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _PeriodicTask(threading.Thread):
+    def __init__(self, name: str, interval: float, fn: Callable[[], None], run_now: bool = True):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.fn = fn
+        self.run_now = run_now
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        # 已至少执行完一次（run_now 为 False 时从启动起）且没有待执行的触发时置位
+        self.idle = threading.Event()
+        self._state_lock = threading.Lock()
+
+    def run(self):
+        if not self.run_now:
+            self._sleep()
+        while not self._stop_event.is_set():
+            try:
+                self.fn()
+            except Exception as e:
+                logger.error(f"后台任务 {self.name} 执行失败: {e}", exc_info=True)
+            self._sleep()
+
+    def _sleep(self):
+        with self._state_lock:
+            if not self._wake.is_set():
+                self.idle.set()
+        self._wake.wait(self.interval)
+        with self._state_lock:
+            self._wake.clear()
+            self.idle.clear()
+
+    def trigger(self):
+        """立即执行一次（不等待下一个周期）。"""
+        with self._state_lock:
+            self.idle.clear()
+            self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+
+_tasks: Dict[str, _PeriodicTask] = {}
+
+
+def run_periodically(name: str, interval: float, fn: Callable[[], None], run_now: bool = True):
+    """启动后台任务：立即执行一次（run_now 为 False 时先等待一个周期，如结果已在 fork 前加载），
+    之后每 interval 秒执行一次。同名任务只会启动一个。"""
+    task = _tasks.get(name)
+    if task is not None and task.is_alive():
+        return
+    task = _PeriodicTask(name, interval, fn, run_now)
+    _tasks[name] = task
+    task.start()
+
+
+def trigger(name: str):
+    task = _tasks.get(name)
+    if task is not None:
+        task.trigger()
+
+
+def trigger_all():
+    """立即执行全部任务（数据变更后重建内存结构）。"""
+    for task in _tasks.values():
+        task.trigger()
+
+
+def wait_idle(timeout: float) -> bool:
+    """等待全部任务执行完当前一轮（含已触发的执行）；超时返回 False。"""
+    deadline = time.monotonic() + timeout
+    for task in list(_tasks.values()):
+        if not task.idle.wait(max(0.0, deadline - time.monotonic())):
+            return False
+    return True
+
+
+def stop_all():
+    for task in _tasks.values():
+        task.stop()
+    _tasks.clear()
@@ -0,0 +1,167 @@
+"""
+缓存值编码（cache_set / cache_get 与 Redis 之间）
+
+- 默认编码为 JSON（orjson）；按 key 前缀可注册其他编码（register），如行列表的列式编码 Rows
+- 编码结果不小于 CACHE_COMPRESS_MIN_BYTES 时按 CACHE_COMPRESSION 压缩（zlib，或已安装 zstandard 时的 zstd）
+- 未压缩的 JSON 原样存储，其余加 3 字节帧头：0x00、编码 id、压缩 id。JSON 文本不以 0x00 开头，
+  读取时据此区分；帧头只描述值本身，读取端按帧头解码，与当前配置无关
+
+编码或压缩方式变化后无需递增缓存结构版本；注册编码的前缀改变了缓存值的 Python 类型时才需要。
+"""
+import zlib
+import logging
+from itertools import repeat
+from typing import Any, Dict, Tuple, Type
+import orjson
+from app.core.config import settings
+from app.db.local_cache import key_prefix
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FRAME = 0x00
+
+NONE, ZLIB, ZSTD = 0, 1, 2
+_COMPRESSION_IDS = {"none": NONE, "zlib": ZLIB, "zstd": ZSTD}
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+class Codec:
+    """值 <-> 字节。id 写入帧头，已存储的值依赖它解码，不可更改。"""
+    id = 0
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def to_json(self, value: Any) -> bytes:
+        """值的 JSON 表示（cache_get_raw 等直接输出 JSON 的路径使用）。"""
+        return _dumps(value)
+
+
+class Json(Codec):
+    id = 1
+
+    def encode(self, value: Any) -> bytes:
+        return _dumps(value)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class Rows(Codec):
+    """namedtuple 行列表的列式编码：[字段名, 行数, 各列]，整列取值相同时只存一个值（如课程类型、补考标记）。
+    省去每行重复的字段名；解码直接按列构造 namedtuple，不经过中间的 dict。"""
+    id = 2
+
+    def __init__(self, row_type: Type[tuple]):
+        self.row_type = row_type
+        self.fields = list(row_type._fields)
+
+    def encode(self, rows: Any) -> bytes:
+        columns = []
+        for column in zip(*rows):
+            first = column[0]
+            columns.append([first] if all(v == first for v in column) else column)
+        return _dumps([self.fields, len(rows), columns])
+
+    def decode(self, data: bytes) -> Any:
+        fields, n, columns = orjson.loads(data)
+        if fields != self.fields:
+            raise ValueError(f"列不匹配: {fields}")
+        columns = (repeat(c[0], n) if len(c) == 1 else c for c in columns)
+        return list(map(self.row_type._make, zip(*columns)))
+
+    def to_json(self, rows: Any) -> bytes:
+        return _dumps([row._asdict() for row in rows])
+
+
+JSON = Json()
+_codecs: Dict[str, Codec] = {}
+
+
+def register(prefix: str, codec: Codec):
+    """为 key 前缀（第一个冒号之前）注册编码。"""
+    _codecs[prefix] = codec
+
+
+def codec_for(key: str) -> Codec:
+    return _codecs.get(key_prefix(key), JSON)
+
+
+def _compression() -> int:
+    compression = _COMPRESSION_IDS.get(settings.CACHE_COMPRESSION)
+    if compression is None:
+        logger.warning(f"未知的 CACHE_COMPRESSION={settings.CACHE_COMPRESSION}，改用 zlib")
+        return ZLIB
+    if compression == ZSTD and zstandard is None:
+        return ZLIB
+    return compression
+
+
+def _compress(data: bytes, compression: int) -> bytes:
+    if compression == ZLIB:
+        return zlib.compress(data, settings.CACHE_COMPRESS_LEVEL)
+    if compression == ZSTD:
+        return zstandard.ZstdCompressor(level=settings.CACHE_COMPRESS_LEVEL).compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: int) -> bytes:
+    if compression == ZLIB:
+        return zlib.decompress(data)
+    if compression == ZSTD:
+        if zstandard is None:
+            raise ValueError("值以 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == NONE:
+        return data
+    raise ValueError(f"未知的压缩 id: {compression}")
+
+
+def encode(key: str, value: Any) -> Tuple[bytes, int]:
+    """返回 (存储的字节, 压缩前的字节数)。"""
+    codec = codec_for(key)
+    data = codec.encode(value)
+    size = len(data)
+    compression = _compression() if size >= settings.CACHE_COMPRESS_MIN_BYTES else NONE
+    if codec is JSON and compression == NONE:
+        return data, size
+    return bytes((FRAME, codec.id, compression)) + _compress(data, compression), size
+
+
+def _unframe(key: str, raw: bytes) -> Tuple[Codec, bytes]:
+    if not raw or raw[0] != FRAME:
+        return JSON, raw
+    codec = codec_for(key)
+    if raw[1] != codec.id:
+        if raw[1] != JSON.id:
+            raise ValueError(f"编码 id {raw[1]} 与前缀注册的编码不符")
+        codec = JSON
+    return codec, _decompress(raw[3:], raw[2])
+
+
+def decode(key: str, raw: bytes) -> Tuple[Any, int]:
+    """返回 (值, 解压后的字节数)。"""
+    codec, data = _unframe(key, raw)
+    return codec.decode(data), len(data)
+
+
+def to_json(key: str, raw: bytes) -> bytes:
+    """存储的字节 -> JSON 原文；未压缩的 JSON 不经过反序列化。"""
+    codec, data = _unframe(key, raw)
+    return data if codec is JSON else codec.to_json(codec.decode(data))
+
+
+def value_to_json(key: str, value: Any) -> bytes:
+    return codec_for(key).to_json(value)
+
@@ -0,0 +1,94 @@
+"""
+进程内 L1 缓存（位于 Redis 之前）
+
+- 按条目数和字节数双重限制，超限时按 LRU 淘汰
+- 每个条目带过期时间，与写入 Redis 时的 TTL 一致
+- 按 key 前缀（第一个冒号之前）统计命中/未命中次数
+- 失效计数（epoch）：每次 delete / clear 递增。从 Redis 回填时先取 epoch，set 时传入，
+  期间发生过失效则不写入，避免读取与回填之间到达的失效被旧值覆盖
+
+缓存的值与 Redis 中的 JSON 解码结果共享，调用方应视为只读。
+"""
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+MISS = object()
+
+
+def key_prefix(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class LocalCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+
+    def get(self, key: str, count_miss: bool = True) -> Any:
+        """命中返回值，未命中或已过期返回 MISS。"""
+        prefix = key_prefix(key)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expire_at, size, value = entry
+                if expire_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits[prefix] += 1
+                    return value
+                del self._data[key]
+                self._bytes -= size
+            if count_miss:
+                self._misses[prefix] += 1
+            return MISS
+
+    def epoch(self) -> int:
+        return self._epoch
+
+    def set(self, key: str, value: Any, ttl: float, size: int, epoch: Optional[int] = None):
+        """epoch 为读取数据前取得的 epoch()；此后有过失效时不写入。"""
+        if ttl <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def delete(self, key: str):
+        with self._lock:
+            self._epoch += 1
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prefixes = sorted(set(self._hits) | set(self._misses))
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "prefixes": {
+                    p: {"hits": self._hits[p], "misses": self._misses[p]} for p in prefixes
+                },
+            }
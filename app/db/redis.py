@@ -1,9 +1,23 @@
-import json
+import os
+import time
+import uuid
+import asyncio
 import hashlib
 import logging
-from typing import Any, Optional
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+import orjson
 import redis
+import redis.asyncio
+import redis.client
+import redis.asyncio.client
+from redis.client import NEVER_DECODE
 from app.core.config import settings
+from app.core import metrics
+from app.core.concurrency import in_async_context, wait
+from app.db import codecs
+from app.db.local_cache import LocalCache, MISS, key_prefix
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +30,796 @@ _redis_pool = redis.ConnectionPool(
     max_connections=20
 )
 
+_async_redis_pool = redis.asyncio.ConnectionPool(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    password=settings.REDIS_PASSWORD or None,
+    db=settings.REDIS_DB,
+    decode_responses=True,
+    max_connections=20
+)
+
+# ---------- 调用计时（每条命令、每次 pipeline.execute 各计一次往返） ----------
+
+def _command_name(args) -> str:
+    return str(args[0]).upper() if args else ""
+
+
+class _Pipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        if not metrics.enabled():
+            return super().execute(raise_on_error)
+        start, ok = time.perf_counter(), False
+        try:
+            result = super().execute(raise_on_error)
+            ok = True
+            return result
+        finally:
+            metrics.record_redis("PIPELINE", time.perf_counter() - start, ok)
+
+
+class _Redis(redis.Redis):
+    def execute_command(self, *args, **options):
+        if not metrics.enabled():
+            return super().execute_command(*args, **options)
+        start, ok = time.perf_counter(), False
+        try:
+            result = super().execute_command(*args, **options)
+            ok = True
+            return result
+        finally:
+            metrics.record_redis(_command_name(args), time.perf_counter() - start, ok)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> _Pipeline:
+        return _Pipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class _AsyncPipeline(redis.asyncio.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        if not metrics.enabled():
+            return await super().execute(raise_on_error)
+        start, ok = time.perf_counter(), False
+        try:
+            result = await super().execute(raise_on_error)
+            ok = True
+            return result
+        finally:
+            metrics.record_redis("PIPELINE", time.perf_counter() - start, ok)
+
+
+class _AsyncRedis(redis.asyncio.Redis):
+    async def execute_command(self, *args, **options):
+        if not metrics.enabled():
+            return await super().execute_command(*args, **options)
+        start, ok = time.perf_counter(), False
+        try:
+            result = await super().execute_command(*args, **options)
+            ok = True
+            return result
+        finally:
+            metrics.record_redis(_command_name(args), time.perf_counter() - start, ok)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> _AsyncPipeline:
+        return _AsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
 def get_redis() -> redis.Redis:
-    return redis.Redis(connection_pool=_redis_pool)
+    return _Redis(connection_pool=_redis_pool)
+
+def get_async_redis() -> redis.asyncio.Redis:
+    return _AsyncRedis(connection_pool=_async_redis_pool)
+
+def current_redis():
+    """返回与当前运行上下文匹配的客户端：异步模式的 greenlet 中为 redis.asyncio，
+    其余情况为同步客户端。调用结果需经 wait() 取值。"""
+    return get_async_redis() if in_async_context() else get_redis()
+
+
+class Script:
+    """Lua 脚本：在模块加载时创建一次，执行时 EVALSHA，服务端尚未缓存时改用 EVAL（同时缓存）。
+    脚本访问的 key 须全部经 KEYS 传入。同步 / 异步客户端均可使用，返回值已经过 wait()。"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    def __call__(self, r, keys: List[str], args: list):
+        try:
+            return wait(r.evalsha(self.sha, len(keys), *keys, *args))
+        except redis.exceptions.NoScriptError:
+            return wait(r.eval(self.source, len(keys), *keys, *args))
 
 
 DEFAULT_TTL = 3600  # 1小时
 
+# 缓存标签：标签列表，或由缓存值计算标签的函数
+Tags = Union[Iterable[str], Callable[[Any], Iterable[str]]]
+
+# 失效广播频道：任一进程改写 L1 前缀的 key 时发布，其余进程收到后丢弃本地副本；
+# 批量 / 按标签定向失效、缓存代际变更也通过该频道通知
+INVALIDATE_CHANNEL = "cache:invalidate"
+
+_local = LocalCache(settings.L1_CACHE_MAX_ENTRIES, settings.L1_CACHE_MAX_BYTES)
+_l1_prefixes = frozenset(settings.L1_CACHE_PREFIXES) if settings.L1_CACHE_ENABLED else frozenset()
+_redis_hits = defaultdict(int)
+_redis_misses = defaultdict(int)
+_redis_stats_lock = threading.Lock()
+_node = None
+
+# ---------- 缓存命名空间（代际） ----------
+# 所有 cache_* 读写的 key 都带 "v<结构版本>.<代际>:" 前缀：
+# - CACHE_SCHEMA_VERSION：缓存值结构变化时在代码中递增
+# - 代际：存于 Redis，数据导入/重算后调用 bump_cache_generation() 递增
+# 旧命名空间的 key 不再被读取，按各自 TTL 自然过期；会话、频率限制等非缓存 key 不受影响。
+# 数据版本：每次定向失效（invalidate / cache_delete_many）及代际递增时递增，不随代际清零：
+# - 构成数据派生接口的 ETag（见 app.api.http_cache），各进程经失效广播更新本地副本；
+#   本地副本在删除缓存与 L1 之后才前进，新 ETag 不会与失效前的旧缓存值同时出现
+# - 进程内派生结构（课程名索引、列式数据集）构建前记下数据版本（snapshot_data_version），
+#   由其响应的 ETag 取该版本，后台重建完成前旧结构的响应仍带旧 ETag
+# - 加载前记下 Redis 中的数据版本，写回时若已变化则放弃写入（见 _GUARDED_WRITE_SCRIPT），
+#   避免失效之前读到的旧数据在失效之后写回缓存
+CACHE_SCHEMA_VERSION = 3
+GENERATION_KEY = "cache:generation"
+DATA_VERSION_KEY = "cache:data_version"
+
+_generation: Optional[int] = None
+_generation_callbacks: List[Callable[[], None]] = []
+_data_version: Optional[int] = None
+
+
+def get_cache_generation() -> int:
+    global _generation
+    if _generation is None:
+        try:
+            _generation = int(wait(current_redis().get(GENERATION_KEY)) or 0)
+        except Exception as e:
+            logger.warning(f"读取缓存代际失败，暂用 0: {e}")
+            return 0
+    return _generation
+
+
+def _set_generation(generation: int):
+    global _generation
+    changed = _generation is not None and generation != _generation
+    _generation = generation
+    if changed:
+        _local.clear()
+        for callback in _generation_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"缓存代际变更回调失败: {e}")
+
+
+def get_data_version() -> int:
+    global _data_version
+    if _data_version is None:
+        try:
+            _data_version = int(wait(current_redis().get(DATA_VERSION_KEY)) or 0)
+        except Exception as e:
+            logger.warning(f"读取数据版本失败，暂用 0: {e}")
+            return 0
+    return _data_version
+
+
+def _set_data_version(version: int):
+    """只前进不后退（广播可能乱序到达）。"""
+    global _data_version
+    if _data_version is None or version > _data_version:
+        _data_version = version
+
+
+def fetch_data_version() -> int:
+    """从 Redis 读取当前数据版本（加载数据前调用，写回时作为 cache_set / cache_set_many 的 version）。"""
+    return int(wait(current_redis().get(DATA_VERSION_KEY)) or 0)
+
+
+def snapshot_data_version() -> int:
+    """进程内派生结构读取数据库之前调用，记下其内容对应的数据版本；Redis 不可用时取本地副本。"""
+    try:
+        return fetch_data_version()
+    except Exception as e:
+        logger.warning(f"读取数据版本失败，取本地副本: {e}")
+        return get_data_version()
+
+
+def reload_cache_generation() -> int:
+    """从 Redis 重新读取代际与数据版本（未运行失效订阅的进程使用，如多进程部署的主进程在 fork 前）。"""
+    r = get_redis()
+    _set_generation(int(r.get(GENERATION_KEY) or 0))
+    _set_data_version(int(r.get(DATA_VERSION_KEY) or 0))
+    return _generation
+
+
+def clear_local_cache():
+    _local.clear()
+
+
+def on_generation_change(callback: Callable[[], None]):
+    """注册代际变更回调（用于重建进程内由数据派生的结构）。"""
+    _generation_callbacks.append(callback)
+
+
+def bump_cache_generation() -> int:
+    """使全部缓存失效：递增代际并通知所有进程。"""
+    r = get_redis()
+    version = int(r.incr(DATA_VERSION_KEY))
+    generation = int(r.incr(GENERATION_KEY))
+    _set_generation(generation)
+    _set_data_version(version)
+    r.publish(INVALIDATE_CHANNEL, _dumps({"src": _node_id(), "generation": generation, "version": version}))
+    logger.info(f"缓存代际已递增为 {generation}")
+    return generation
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _ns(key: str) -> str:
+    return f"v{CACHE_SCHEMA_VERSION}.{get_cache_generation()}:{key}"
+
+
+def _node_id() -> str:
+    """当前进程的唯一标识（fork 后自动重新生成），用于忽略自己发布的失效消息。"""
+    global _node
+    pid = os.getpid()
+    if _node is None or _node[0] != pid:
+        _node = (pid, uuid.uuid4().hex)
+    return _node[1]
+
+
+def _count_redis(prefix: str, hit: bool):
+    with _redis_stats_lock:
+        (_redis_hits if hit else _redis_misses)[prefix] += 1
+
+
+def _use_l1(key: str) -> bool:
+    return key_prefix(key) in _l1_prefixes
+
+
+def _get_bytes(client, key: str):
+    """GET 原始字节（连接池为 decode_responses=True，缓存值可能是压缩后的二进制）。"""
+    return client.execute_command("GET", key, **{NEVER_DECODE: True})
+
+
 def cache_get(key: str) -> Optional[Any]:
+    l1 = _use_l1(key)
+    if l1:
+        value = _local.get(key)
+        if value is not MISS:
+            return value
+    prefix = key_prefix(key)
+    # 在读取 Redis 之前取 epoch：读取与回填之间收到的失效会使回填作废
+    epoch = _local.epoch()
     try:
-        raw = get_redis().get(key)
+        r = current_redis()
+        if l1:
+            pipe = r.pipeline(transaction=False)
+            _get_bytes(pipe, _ns(key))
+            pipe.pttl(_ns(key))
+            raw, pttl = wait(pipe.execute())
+        else:
+            raw = wait(_get_bytes(r, _ns(key)))
         if raw is None:
+            _count_redis(prefix, False)
             return None
-        return json.loads(raw)
+        _count_redis(prefix, True)
+        value, size = codecs.decode(key, raw)
+        if l1 and pttl and pttl > 0:
+            _local.set(key, value, pttl / 1000, size, epoch)
+        return value
     except Exception as e:
         logger.warning(f"Redis cache_get 失败 {key}: {e}")
         return None
 
-def cache_set(key: str, value: Any, ttl: int = DEFAULT_TTL):
+def cache_set(key: str, value: Any, ttl: int = DEFAULT_TTL, tags: Tags = (), version: Optional[int] = None):
+    """写入缓存；tags 为标签列表，或由值计算标签的函数（见 invalidate）。
+    version 为加载数据前取得的数据版本（fetch_data_version），此后发生过失效时放弃写入。"""
     try:
-        get_redis().set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+        raw, size = codecs.encode(key, value)
+        r = current_redis()
+        epoch = _local.epoch()
+        tags = tags(value) if callable(tags) else tags
+        if version is not None:
+            if not _guarded_write(r, version, [(key, raw)], {tag: [key] for tag in tags}, ttl):
+                return
+        elif tags:
+            pipe = r.pipeline(transaction=False)
+            pipe.set(_ns(key), raw, ex=ttl)
+            _add_tags(pipe, key, tags, ttl)
+            wait(pipe.execute())
+        else:
+            wait(r.set(_ns(key), raw, ex=ttl))
+        if _use_l1(key):
+            _local.set(key, value, ttl, size, epoch)
+            _publish_invalidate(r, key)
     except Exception as e:
         logger.warning(f"Redis cache_set 失败 {key}: {e}")
 
 
+def cache_get_many(keys: List[str]) -> List[Optional[Any]]:
+    """批量读取，结果与 keys 一一对应（未命中为 None）。L1 未命中的 key 合并为一次 MGET；
+    从 Redis 取回的值不写入 L1（MGET 不带剩余 TTL）。"""
+    values: List[Optional[Any]] = [None] * len(keys)
+    pending = []
+    for i, key in enumerate(keys):
+        if _use_l1(key):
+            value = _local.get(key)
+            if value is not MISS:
+                values[i] = value
+                continue
+        pending.append(i)
+    if not pending:
+        return values
+    try:
+        raws = wait(current_redis().execute_command("MGET", *(_ns(keys[i]) for i in pending),
+                                                    **{NEVER_DECODE: True}))
+    except Exception as e:
+        logger.warning(f"Redis cache_get_many 失败 ({len(pending)} 个 key): {e}")
+        return values
+    for i, raw in zip(pending, raws):
+        key = keys[i]
+        if raw is None:
+            _count_redis(key_prefix(key), False)
+            continue
+        try:
+            values[i] = codecs.decode(key, raw)[0]
+            _count_redis(key_prefix(key), True)
+        except Exception as e:
+            logger.warning(f"缓存值解码失败 {key}: {e}")
+    return values
+
+
+def cache_set_many(values: Dict[str, Any], ttl: int = DEFAULT_TTL, tags: Tags = (), version: Optional[int] = None):
+    """批量写入，值与标签在同一个 pipeline 中提交；tags 为所有 key 共用的标签列表，或由每个值计算标签的函数。
+    不经过单飞加载，适合调用方已从数据库批量取得的值。version 同 cache_set。"""
+    if not values:
+        return
+    try:
+        r = current_redis()
+        epoch = _local.epoch()
+        items = []
+        tagged: Dict[str, List[str]] = defaultdict(list)
+        l1 = []
+        for key, value in values.items():
+            raw, size = codecs.encode(key, value)
+            items.append((key, raw))
+            for tag in (tags(value) if callable(tags) else tags):
+                tagged[tag].append(key)
+            if _use_l1(key):
+                l1.append((key, value, size))
+        if version is not None:
+            if not _guarded_write(r, version, items, tagged, ttl):
+                return
+        else:
+            pipe = r.pipeline(transaction=False)
+            for key, raw in items:
+                pipe.set(_ns(key), raw, ex=ttl)
+            for tag, keys in tagged.items():
+                pipe.sadd(_tag_key(tag), *keys)
+                pipe.expire(_tag_key(tag), max(ttl, TAG_TTL))
+            wait(pipe.execute())
+        for key, value, size in l1:
+            _local.set(key, value, ttl, size, epoch)
+            _publish_invalidate(r, key)
+    except Exception as e:
+        logger.warning(f"Redis cache_set_many 失败 ({len(values)} 个 key): {e}")
+
+
+def cache_peek_local(key: str) -> Optional[Any]:
+    """只读进程内 L1 副本，不访问 Redis；未启用 L1 或未命中时返回 None（不计入未命中）。"""
+    if not _use_l1(key):
+        return None
+    value = _local.get(key, count_miss=False)
+    return None if value is MISS else value
+
+
+def cache_get_raw(key: str) -> Optional[bytes]:
+    """读取缓存的 JSON 原文，供直接写入响应体。未压缩的 JSON 值不经过反序列化。"""
+    prefix = key_prefix(key)
+    try:
+        raw = wait(_get_bytes(current_redis(), _ns(key)))
+        if raw is None:
+            _count_redis(prefix, False)
+            return None
+        _count_redis(prefix, True)
+        return codecs.to_json(key, raw)
+    except Exception as e:
+        logger.warning(f"Redis cache_get 失败 {key}: {e}")
+        return None
+
+
+def cache_delete(key: str):
+    _local.delete(key)
+    try:
+        r = current_redis()
+        wait(r.delete(_ns(key)))
+        if _use_l1(key):
+            _publish_invalidate(r, key)
+    except Exception as e:
+        logger.warning(f"Redis cache_delete 失败 {key}: {e}")
+
+
+# ---------- 标签与定向失效 ----------
+# 写入缓存时可附带标签（如 sid:<学号>、major:<专业代码>、course:<课程名>、rec_year:<年份>），
+# 每个标签在 Redis 中对应一个集合，记录依赖它的逻辑 key。invalidate(标签...) 删除这些 key，
+# 包括 key 为筛选条件哈希、无法由实体反推的缓存（如 fail_rate、rec_opts）。
+# 标签集合同样位于代际命名空间内，递增代际后随旧缓存一起废弃。
+TAG_TTL = 7 * 86400  # 标签集合的过期时间，带标签的缓存 TTL 不应超过此值
+
+_DELETE_BATCH = 500
+_PUBLISH_BATCH = 1000
+_keys_callbacks: List[Callable[[List[str]], None]] = []
+_tags_callbacks: List[Callable[[List[str]], None]] = []
+
+
+def _tag_key(tag: str) -> str:
+    return _ns(f"tag:{tag}")
+
+
+def on_keys_invalidated(callback: Callable[[List[str]], None]):
+    """注册定向失效回调，参数为被删除的逻辑 key 列表；本进程与其他进程均会调用，
+    用于丢弃进程内由这些 key 派生的结构。"""
+    _keys_callbacks.append(callback)
+
+
+def on_tags_invalidated(callback: Callable[[List[str]], None]):
+    """注册标签失效回调，参数为被失效的标签列表（用于重建不经 Redis 缓存的内存索引）。"""
+    _tags_callbacks.append(callback)
+
+
+def _drop_local(keys: List[str], tags: List[str]):
+    for key in keys:
+        _local.delete(key)
+    for callbacks, values in ((_keys_callbacks, keys), (_tags_callbacks, tags)):
+        if not values:
+            continue
+        for callback in callbacks:
+            try:
+                callback(values)
+            except Exception as e:
+                logger.warning(f"定向失效回调失败: {e}")
+
+
+def _delete_and_publish(keys: List[str], tags: List[str]) -> int:
+    r = get_redis()
+    # 先递增版本使此前开始的加载放弃写回；本地版本在删除之后才前进（见上方“数据版本”）
+    version = int(r.incr(DATA_VERSION_KEY))
+    deleted = 0
+    for i in range(0, len(keys), _DELETE_BATCH):
+        deleted += r.delete(*(_ns(k) for k in keys[i:i + _DELETE_BATCH]))
+    for i in range(0, len(tags), _DELETE_BATCH):
+        r.delete(*(_tag_key(t) for t in tags[i:i + _DELETE_BATCH]))
+    _drop_local(keys, tags)
+    _set_data_version(version)
+    src = _node_id()
+    for i in range(0, max(len(keys), 1), _PUBLISH_BATCH):
+        r.publish(INVALIDATE_CHANNEL, _dumps({
+            "src": src, "keys": keys[i:i + _PUBLISH_BATCH], "tags": tags if i == 0 else [], "version": version,
+        }))
+    return deleted
+
+
+def cache_delete_many(keys: Iterable[str]) -> int:
+    """批量删除缓存 key，并通知所有进程丢弃 L1 副本与派生结构。返回 Redis 中实际删除的数量。"""
+    return _delete_and_publish(list(dict.fromkeys(keys)), [])
+
+
+def invalidate(*tags: str) -> int:
+    """删除依赖任一标签的全部缓存 key 及这些标签集合，并通知所有进程。返回删除的 key 数。"""
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return 0
+    r = get_redis()
+    keys = set()
+    for i in range(0, len(tags), _DELETE_BATCH):
+        keys.update(r.sunion([_tag_key(t) for t in tags[i:i + _DELETE_BATCH]]))
+    return _delete_and_publish(sorted(keys), tags)
+
+
+def _add_tags(pipe, key: str, tags: Iterable[str], ttl: int):
+    for tag in tags:
+        pipe.sadd(_tag_key(tag), key)
+        pipe.expire(_tag_key(tag), max(ttl, TAG_TTL))
+
+
+# 数据版本未变化时写入值与标签，否则不写（返回 0）
+# KEYS: 数据版本, 值 × n, 标签集合 × m
+# ARGV: 加载前的数据版本, TTL, 标签集合 TTL, n, 值 × n，之后每个标签集合依次为 成员数, 成员（逻辑 key）...
+_GUARDED_WRITE_SCRIPT = Script("""
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+local n = tonumber(ARGV[4])
+for i = 1, n do
+    redis.call('SET', KEYS[1 + i], ARGV[4 + i], 'EX', ARGV[2])
+end
+local a = 5 + n
+for k = 2 + n, #KEYS do
+    local count = tonumber(ARGV[a])
+    for j = 1, count do
+        redis.call('SADD', KEYS[k], ARGV[a + j])
+    end
+    redis.call('EXPIRE', KEYS[k], ARGV[3])
+    a = a + count + 1
+end
+return 1
+""")
+
+
+def _guarded_write(r, version: int, items: List[tuple], tagged: Dict[str, List[str]], ttl: int) -> bool:
+    keys = [DATA_VERSION_KEY] + [_ns(key) for key, _ in items] + [_tag_key(tag) for tag in tagged]
+    args = [str(version), ttl, max(ttl, TAG_TTL), len(items)] + [raw for _, raw in items]
+    for members in tagged.values():
+        args += [len(members), *members]
+    written = bool(_GUARDED_WRITE_SCRIPT(r, keys, args))
+    if not written:
+        logger.info(f"加载期间缓存已失效，放弃写回 {items[0][0]} 等 {len(items)} 个 key")
+    return written
+
+
+# ---------- 单飞加载（防缓存击穿） ----------
+
+LOCK_TTL_MS = 10000       # 跨进程加载锁的过期时间，防止持锁进程崩溃后死锁
+LOCK_WAIT_SECONDS = 5.0   # 等待其他进程加载的最长时间，超时后自行加载
+_POLL_INTERVALS = (0.01, 0.02, 0.05, 0.1)
+
+_UNLOCK_SCRIPT = Script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+
+def lock_key(name: str) -> str:
+    """跨进程锁的 key（随缓存代际变化，代际更新后旧代际的锁不再互斥）。"""
+    return _ns(f"lock:{name}")
+
+
+def acquire_lock(r, key: str, ttl: int) -> Optional[str]:
+    """获取跨进程锁（ttl 秒后自动过期），成功时返回释放所需的令牌。"""
+    token = uuid.uuid4().hex
+    return token if wait(r.set(key, token, nx=True, ex=ttl)) else None
+
+
+def release_lock(r, key: str, token: str) -> bool:
+    """释放 acquire_lock 获取的锁：仍由令牌持有时才删除，锁已过期并被其他进程取得时不受影响。"""
+    return bool(_UNLOCK_SCRIPT(r, [key], [token]))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _sleep(seconds: float):
+    if in_async_context():
+        wait(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
+def _wait_flight(flight: _Flight, timeout: float) -> bool:
+    if not in_async_context():
+        return flight.done.wait(timeout)
+    # 异步模式下各请求共用事件循环线程，不能阻塞等待，改为让出执行权轮询
+    deadline = time.monotonic() + timeout
+    while not flight.done.is_set() and time.monotonic() < deadline:
+        _sleep(0.005)
+    return flight.done.is_set()
+
+
+def _load_with_lock(key: str, loader: Callable[[], Any], ttl: int, tags: Tags) -> Any:
+    """跨进程单飞：抢到 Redis 锁的进程负责加载，其余进程轮询缓存等待结果。"""
+    lock = lock_key(key)
+    token = uuid.uuid4().hex
+    r = current_redis()
+    version = None
+    try:
+        # 取锁的同时记下数据版本（在 loader 读取数据库之前）
+        pipe = r.pipeline(transaction=False)
+        pipe.set(lock, token, nx=True, px=LOCK_TTL_MS)
+        pipe.get(DATA_VERSION_KEY)
+        acquired, version = wait(pipe.execute())
+        acquired = bool(acquired)
+        version = int(version or 0)
+        locked_by_other = not acquired
+    except Exception as e:
+        logger.warning(f"Redis 加载锁获取失败 {key}: {e}")
+        acquired = locked_by_other = False
+
+    if locked_by_other:
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        attempt = 0
+        while time.monotonic() < deadline:
+            _sleep(_POLL_INTERVALS[min(attempt, len(_POLL_INTERVALS) - 1)])
+            attempt += 1
+            value = cache_get(key)
+            if value is not None:
+                return value
+            try:
+                if not wait(r.exists(lock)):
+                    break  # 持锁进程已结束但未写入缓存（如结果为空），自行加载
+            except Exception:
+                break
+
+    try:
+        value = loader()
+        if value is not None:
+            cache_set(key, value, ttl, tags, version)
+        return value
+    finally:
+        if acquired:
+            try:
+                release_lock(r, lock, token)
+            except Exception as e:
+                logger.warning(f"Redis 加载锁释放失败 {key}: {e}")
+
+
+def cache_get_or_load(key: str, loader: Callable[[], Any], ttl: int = DEFAULT_TTL,
+                      tags: Tags = ()) -> Optional[Any]:
+    """读取缓存，未命中时由单个调用方执行 loader 并写入缓存（附带 tags），其余并发调用方等待其结果。
+    进程内以 key 为粒度合并，进程间通过短期 Redis 锁合并。loader 返回 None 表示不缓存。"""
+    value = cache_get(key)
+    if value is not None:
+        return value
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if _wait_flight(flight, LOCK_WAIT_SECONDS + LOCK_TTL_MS / 1000):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        return loader()
+
+    try:
+        flight.value = _load_with_lock(key, loader, ttl, tags)
+        return flight.value
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def cache_get_or_load_raw(key: str, loader: Callable[[], Any], ttl: int = DEFAULT_TTL,
+                          tags: Tags = ()) -> Optional[bytes]:
+    """同 cache_get_or_load，但返回 JSON 字节：命中时直接返回 Redis 中的原文，省去反序列化与再次序列化。"""
+    raw = cache_get_raw(key)
+    if raw is not None:
+        return raw
+    value = cache_get_or_load(key, loader, ttl, tags)
+    return None if value is None else codecs.value_to_json(key, value)
+
+
+def cache_stats() -> dict:
+    """L1 与 Redis 两层按前缀的命中/未命中计数。"""
+    l1 = _local.stats()
+    with _redis_stats_lock:
+        hits, misses = dict(_redis_hits), dict(_redis_misses)
+    prefixes = sorted(set(l1["prefixes"]) | set(hits) | set(misses))
+    return {
+        "l1_entries": l1["entries"],
+        "l1_bytes": l1["bytes"],
+        "prefixes": {
+            p: {
+                "l1_hits": l1["prefixes"].get(p, {}).get("hits", 0),
+                "l1_misses": l1["prefixes"].get(p, {}).get("misses", 0),
+                "redis_hits": hits.get(p, 0),
+                "redis_misses": misses.get(p, 0),
+            }
+            for p in prefixes
+        },
+    }
+
+
+CACHE_REQUESTS = metrics.Counter("cache_requests_total", "缓存读取次数（layer: l1 / redis，result: hit / miss）",
+                                 ("layer", "prefix", "result"))
+CACHE_L1 = metrics.Gauge("cache_l1", "L1 缓存占用（item: entries / bytes）", ("item",))
+
+
+def _collect_cache_metrics():
+    stats = cache_stats()
+    CACHE_L1.set(stats["l1_entries"], "entries")
+    CACHE_L1.set(stats["l1_bytes"], "bytes")
+    for prefix, s in stats["prefixes"].items():
+        for layer in ("l1", "redis"):
+            CACHE_REQUESTS.set(s[f"{layer}_hits"], layer, prefix, "hit")
+            CACHE_REQUESTS.set(s[f"{layer}_misses"], layer, prefix, "miss")
+
+
+metrics.on_collect(_collect_cache_metrics)
+
+
 def make_hash_key(prefix: str, **kwargs) -> str:
-    raw = json.dumps(kwargs, sort_keys=True, ensure_ascii=False)
-    h = hashlib.md5(raw.encode()).hexdigest()[:12]
+    raw = orjson.dumps(kwargs, option=orjson.OPT_SORT_KEYS)
+    h = hashlib.md5(raw).hexdigest()[:12]
     return f"{prefix}:{h}"
+
+
+# ---------- L1 失效广播 ----------
+
+def _publish_invalidate(r, key: str):
+    wait(r.publish(INVALIDATE_CHANNEL, _dumps({"src": _node_id(), "key": key})))
+
+
+class _InvalidationListener(threading.Thread):
+    def __init__(self):
+        super().__init__(name="cache-invalidation", daemon=True)
+        self._stop_event = threading.Event()
+        self._pubsub = None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(INVALIDATE_CHANNEL)
+                # 重新订阅期间可能漏掉消息，保守起见清空 L1 并重新读取代际与数据版本
+                _local.clear()
+                reload_cache_generation()
+                while not self._stop_event.is_set():
+                    msg = self._pubsub.get_message(timeout=1.0)
+                    if msg:
+                        self._handle(msg["data"])
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    logger.warning(f"缓存失效订阅中断，稍后重连: {e}")
+                    self._stop_event.wait(3)
+            finally:
+                try:
+                    self._pubsub.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _handle(data: str):
+        try:
+            msg = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return
+        if msg.get("src") == _node_id():
+            return
+        if "generation" in msg:
+            _set_generation(int(msg["generation"]))
+        elif "keys" in msg:
+            _drop_local(msg["keys"], msg.get("tags", []))
+        else:
+            _local.delete(msg.get("key", ""))
+        if "version" in msg:
+            _set_data_version(int(msg["version"]))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_listener: Optional[_InvalidationListener] = None
+
+
+def start_invalidation_listener():
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    _listener = _InvalidationListener()
+    _listener.start()
+
+
+def stop_invalidation_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
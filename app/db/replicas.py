@@ -0,0 +1,112 @@
+"""
+只读副本选择（引擎的创建与会话工厂见 app.db.session）
+
+- 选择策略：weighted 按权重随机；least_connections 取已借出连接数 / 权重最小者
+- 剔除：请求中出现连接类错误（断线、无法连接）时立即剔除；后台健康检查（SELECT 1）
+  每 DB_REPLICA_HEALTH_INTERVAL 秒探测全部副本，恢复后重新加入
+- 全部副本不可用时回退到主库
+- 缓存失效后的 DB_REPLICA_PRIMARY_GRACE 秒内从主库读取（pin_primary），避免把副本上
+  尚未同步的旧数据重新写入缓存
+"""
+import time
+import random
+import logging
+import threading
+from typing import List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("weighted", "least_connections")
+
+DB_REPLICA_HEALTHY = metrics.Gauge("db_replica_healthy", "只读副本是否可用（1 / 0）", ("replica",))
+DB_REPLICA_SESSIONS = metrics.Counter("db_replica_sessions_total",
+                                      "只读会话的分配次数（target: 副本名或 primary）", ("target",))
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine, weight: int = 1, async_engine=None):
+        """engine 为同步引擎（健康检查与同步模式的会话使用），async_engine 为异步模式的会话使用。"""
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.weight = max(1, weight)
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        event.listen(engine, "handle_error", self._on_error)
+        if async_engine is not None:
+            event.listen(async_engine.sync_engine, "handle_error", self._on_error)
+
+    def checked_out(self, use_async: bool) -> int:
+        pool = (self.async_engine.sync_engine if use_async else self.engine).pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def _on_error(self, context):
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(str(context.original_exception))
+
+    def mark_down(self, error: str):
+        if self.healthy:
+            logger.warning(f"只读副本 {self.name} 已剔除: {error}")
+        self.healthy = False
+        self.last_error = error
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark_down(str(getattr(e, "orig", None) or e))
+            return False
+        if not self.healthy:
+            logger.info(f"只读副本 {self.name} 已恢复")
+        self.healthy = True
+        self.last_error = None
+        return True
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], policy: str = "weighted", primary_grace: float = 0.0):
+        if policy not in POLICIES:
+            logger.warning(f"未知的副本选择策略 {policy}，改用 weighted")
+            policy = "weighted"
+        self.replicas = replicas
+        self.policy = policy
+        self.primary_grace = primary_grace
+        self._primary_until = 0.0
+        self._lock = threading.Lock()
+        metrics.on_collect(self._collect)
+
+    def pick(self, use_async: bool = False) -> Optional[Replica]:
+        """选择一个可用副本；没有可用副本或处于主库读取期时返回 None（由调用方使用主库）。"""
+        if time.monotonic() < self._primary_until:
+            return None
+        candidates = [r for r in self.replicas if r.healthy]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.policy == "least_connections":
+            return min(candidates, key=lambda r: (r.checked_out(use_async) / r.weight, random.random()))
+        return random.choices(candidates, weights=[r.weight for r in candidates])[0]
+
+    def pin_primary(self, seconds: Optional[float] = None):
+        """此后 seconds 秒（默认 primary_grace）内的只读会话使用主库。"""
+        seconds = self.primary_grace if seconds is None else seconds
+        with self._lock:
+            self._primary_until = max(self._primary_until, time.monotonic() + seconds)
+
+    def check(self):
+        """探测全部副本（后台定时执行）。"""
+        for replica in self.replicas:
+            replica.check()
+
+    def status(self) -> List[dict]:
+        return [{"name": r.name, "weight": r.weight, "healthy": r.healthy, "error": r.last_error}
+                for r in self.replicas]
+
+    def _collect(self):
+        for replica in self.replicas:
+            DB_REPLICA_HEALTHY.set(1 if replica.healthy else 0, replica.name)
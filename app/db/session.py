@@ -1,21 +1,152 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""
+数据库引擎与会话
+
+- 主库：SessionLocal / get_primary_db，供导入、重算等写入及需要读到最新写入的场合
+- 只读：read_session / get_db，配置了只读副本（DB_REPLICA_URLS）时绑定到选中的副本，
+  否则与主库相同。接口均为只读，路由依赖 get_session 默认使用只读会话
+"""
+import time
+import logging
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.core.config import settings
+from app.core import metrics
+from app.db.replicas import DB_REPLICA_SESSIONS, Replica, ReplicaSet
+
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
+_POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_timeout=60,
     pool_recycle=3600,
 )
+
+engine = create_engine(settings.DATABASE_URL, **_POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def _pick(use_async: bool):
+    replica = replicas.pick(use_async)
+    if metrics.enabled():
+        DB_REPLICA_SESSIONS.inc(replica.name if replica is not None else "primary")
+    return replica
+
+
+def read_session() -> Session:
+    """只读会话（副本不可用时为主库），用法同 SessionLocal()。"""
+    replica = _pick(False)
+    return SessionLocal(bind=replica.engine) if replica is not None else SessionLocal()
+
+
 def get_db():
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_primary_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# 异步模式：仅在 ASYNC_MODE 开启时创建异步引擎
+async_engine = None
+AsyncSessionLocal = None
+if settings.ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **_POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    replica = _pick(True)
+    async with (AsyncSessionLocal(bind=replica.async_engine) if replica is not None else AsyncSessionLocal()) as db:
+        yield db
+
+async def get_async_primary_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# ---------- 指标 ----------
+
+DB_POOL = metrics.Gauge("db_pool_connections", "数据库连接池连接数（state: size / checked_out / overflow）",
+                        ("engine", "state"))
+
+
+def _instrument(name: str, sync_engine: Engine):
+    """按请求统计 SQL 语句数与耗时，并在采集时读取连接池状态。"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("query_start", None)
+        if start is not None and metrics.enabled():
+            metrics.record_sql(time.perf_counter() - start)
+
+    def collect():
+        pool = sync_engine.pool
+        if hasattr(pool, "checkedout"):
+            DB_POOL.set(pool.size(), name, "size")
+            DB_POOL.set(pool.checkedout(), name, "checked_out")
+            # QueuePool.overflow() 在连接数未达到 pool_size 时为负
+            DB_POOL.set(max(0, pool.overflow()), name, "overflow")
+
+    metrics.on_collect(collect)
+
+
+_instrument("sync", engine)
+if async_engine is not None:
+    _instrument("async", async_engine.sync_engine)
+
+
+# ---------- 只读副本 ----------
+
+def _create_replicas():
+    urls, async_urls = settings.DB_REPLICA_URLS, settings.ASYNC_DB_REPLICA_URLS
+    if not urls:
+        return []
+    if settings.ASYNC_MODE and len(async_urls) != len(urls):
+        logger.error(f"异步模式需要与 DB_REPLICA_URLS 一一对应的 ASYNC_DB_REPLICA_URLS，"
+                     f"当前 {len(urls)} / {len(async_urls)} 个，不使用只读副本")
+        return []
+    weights = settings.DB_REPLICA_WEIGHTS
+    result = []
+    for i, url in enumerate(urls):
+        name = f"replica{i}"
+        replica_engine = create_engine(url, **_POOL_OPTIONS)
+        _instrument(name, replica_engine)
+        replica_async_engine = None
+        if settings.ASYNC_MODE:
+            replica_async_engine = create_async_engine(async_urls[i], **_POOL_OPTIONS)
+            _instrument(f"{name}-async", replica_async_engine.sync_engine)
+        result.append(Replica(name, replica_engine, weights[i] if i < len(weights) else 1, replica_async_engine))
+    logger.info(f"只读副本: {len(result)} 个，策略 {settings.DB_REPLICA_POLICY}")
+    return result
+
+
+replicas = ReplicaSet(_create_replicas(), settings.DB_REPLICA_POLICY, settings.DB_REPLICA_PRIMARY_GRACE)
+
+# 路由统一使用的依赖，按运行模式选择：get_session 为只读（优先副本），get_primary_session 为主库
+get_session = get_async_db if settings.ASYNC_MODE else get_db
+get_primary_session = get_async_primary_db if settings.ASYNC_MODE else get_primary_db
+
+
+def dispose_after_fork():
+    """fork 出的子进程中调用：丢弃从父进程继承的连接池（不关闭父进程仍在使用的连接），
+    子进程此后按需建立自己的连接。"""
+    engines = [engine] + [r.engine for r in replicas.replicas]
+    if async_engine is not None:
+        engines += [async_engine.sync_engine] + [r.async_engine.sync_engine for r in replicas.replicas]
+    for e in engines:
+        e.dispose(close=False)
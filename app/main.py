@@ -2,11 +2,24 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.api_v1.api import api_router
+from app.api.http_cache import NotModified
 from app.core.config import settings
-from app.db.redis import get_redis
+from app.core import metrics, scheduler
+from app.db.redis import (
+    clear_local_cache, get_cache_generation, on_generation_change, on_keys_invalidated, on_tags_invalidated,
+    reload_cache_generation, start_invalidation_listener, stop_invalidation_listener,
+)
+from app.db.local_cache import key_prefix
+from app.db.session import replicas
+from app.services import (
+    cache_tags, cohort_stats, course_columns, course_name_index, facet_index, major_ranking, rec_view, student_name_index,
+)
+from app.services.warmup_service import WarmupService
+import gc
+import anyio
 import logging
 
 logging.basicConfig(
@@ -17,16 +30,92 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# 失效的标签类别 -> 需要重建的内存索引（数据导入后只影响部分学生 / 课程时）
+_INDEX_TASKS = {
+    "course": ("course-columns",),
+    cache_tags.COURSE_CATALOG: ("course-name-index",),
+    cache_tags.ROSTER: ("course-columns", "student-name-index"),
+}
+
+
+def _refresh_indexes(tags):
+    kinds = {key_prefix(t) for t in tags}
+    for name in {task for kind in kinds for task in _INDEX_TASKS.get(kind, ())}:
+        scheduler.trigger(name)
+
+
+# 多进程部署（app.cli.serve）时由主进程设置：
+# _preloaded 表示内存索引与缓存已在 fork 前加载，工作进程启动时不再重复加载；
+# wait_ready 表示启动阶段等待内存索引加载完成后才开始接受连接（未预加载时生效）
+_preloaded = False
+wait_ready = False
+
+
+def preload():
+    """在主进程中同步加载内存索引并预热缓存（fork 前调用，不启动任何后台线程）。
+    工作进程以写时复制共享这些只读结构；滚动重启前再次调用以读取最新数据。"""
+    global _preloaded
+    # 上一次加载时冻结的对象此后可能成为垃圾，解冻后才能被回收
+    gc.unfreeze()
+    reload_cache_generation()
+    clear_local_cache()
+    for clear in (facet_index.clear, major_ranking.clear, rec_view.clear):
+        clear()
+    cohort_stats.discard([cohort_stats.COHORT_STATS_KEY])
+    if settings.FAIL_RATE_ENGINE_ENABLED:
+        course_columns.refresh()
+    if settings.COURSE_NAME_INDEX_ENABLED:
+        course_name_index.refresh()
+    if settings.STUDENT_NAME_INDEX_ENABLED:
+        student_name_index.refresh()
+    if settings.WARMUP_ENABLED:
+        WarmupService.run()
+    # 已加载的对象移出 GC 跟踪：工作进程的垃圾回收不再遍历并改写它们的 GC 头，共享页不会因此被复制
+    gc.collect()
+    gc.freeze()
+    _preloaded = True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # startup
-    try:
-        get_redis().flushdb()
-        logger.info("启动时已清空 Redis 缓存")
-    except Exception as e:
-        logger.warning(f"启动时清空 Redis 失败: {e}")
+    # startup：不再清空 Redis，缓存按代际命名空间隔离，会话与频率限制得以保留
+    logger.info(f"缓存代际: {get_cache_generation()}")
+    # 缓存失效后先从主库读取，再由重建的缓存 / 索引回填（须在其余回调之前注册）
+    on_generation_change(replicas.pin_primary)
+    on_tags_invalidated(lambda tags: replicas.pin_primary())
+    on_generation_change(facet_index.clear)
+    on_generation_change(major_ranking.clear)
+    on_generation_change(rec_view.clear)
+    on_generation_change(scheduler.trigger_all)
+    on_generation_change(WarmupService.start)
+    for discard in (facet_index.discard, major_ranking.discard, rec_view.discard, cohort_stats.discard):
+        on_keys_invalidated(discard)
+    on_tags_invalidated(_refresh_indexes)
+    start_invalidation_listener()
+    if replicas.replicas:
+        scheduler.run_periodically("db-replicas", settings.DB_REPLICA_HEALTH_INTERVAL, replicas.check)
+    # 已预加载时只按间隔刷新
+    run_now = not _preloaded
+    if settings.FAIL_RATE_ENGINE_ENABLED:
+        scheduler.run_periodically("course-columns", settings.FAIL_RATE_ENGINE_REFRESH, course_columns.refresh,
+                                   run_now)
+    if settings.COURSE_NAME_INDEX_ENABLED:
+        scheduler.run_periodically("course-name-index", settings.COURSE_NAME_INDEX_REFRESH, course_name_index.refresh,
+                                   run_now)
+    if settings.STUDENT_NAME_INDEX_ENABLED:
+        scheduler.run_periodically("student-name-index", settings.STUDENT_NAME_INDEX_REFRESH,
+                                   student_name_index.refresh, run_now)
+    if not _preloaded:
+        WarmupService.start()
+    if wait_ready and not await anyio.to_thread.run_sync(scheduler.wait_idle, settings.STARTUP_READY_TIMEOUT):
+        logger.warning(f"内存索引在 {settings.STARTUP_READY_TIMEOUT} 秒内未加载完成，先行接受请求")
+    app.state.preloaded = _preloaded
+    app.state.ready = True
     yield
-    # shutdown（如需清理可在此添加）
+    app.state.ready = False
+    # shutdown
+    scheduler.stop_all()
+    stop_invalidation_listener()
 
 
 app = FastAPI(
@@ -35,8 +124,13 @@ app = FastAPI(
     docs_url=None,
     redoc_url=None,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers=exc.headers)
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     messages = {
@@ -45,14 +139,14 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         422: "参数格式错误",
     }
     msg = messages.get(exc.status_code, exc.detail or "请求错误")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"code": exc.status_code, "message": msg, "data": None}
     )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"code": 422, "message": "请求参数格式错误", "data": None}
     )
@@ -60,7 +154,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"未处理异常: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"code": 500, "message": "服务器内部错误", "data": None}
     )
@@ -72,10 +166,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "Last-Modified"],
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+
+# 多进程部署时由 app.cli.serve 置为 False：各工作进程只有自己的计数，改由主进程汇总后在内网端口输出
+metrics_route = True
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not metrics.enabled() or not metrics_route:
+        return Response(status_code=404)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.PORT)
@@ -49,6 +49,7 @@ class RecFilterDTO(BaseModel):
     major: Optional[str] = None
     page: int = 1
     pageSize: int = 35
+    cursor: Optional[str] = None  # 上一页返回的 nextCursor；给出时忽略 page
 
 class RecOptionsDTO(BaseModel):
     years: List[int] = []
@@ -77,6 +78,7 @@ class RecListResponseDTO(BaseModel):
     total: int = 0
     page: int = 1
     pageSize: int = 35
+    nextCursor: Optional[str] = None
 
 
 class ChallengeResponseDTO(BaseModel):
@@ -92,3 +94,8 @@ class VerifiedQueryDTO(BaseModel):
     token: str = ''
     answers: List[VerifyAnswerItem] = []
     sessionToken: str = ''
+
+class DashboardQueryDTO(VerifiedQueryDTO):
+    sortBy: str = Field("gpa", pattern="^(gpa|avg)$")
+    order: str = Field("desc", pattern="^(desc|asc)$")
+    pageSize: int = Field(35, ge=1, le=10000)
@@ -1,8 +1,12 @@
 from typing import Generic, TypeVar, Optional, Any
+from fastapi.responses import Response
 from pydantic import BaseModel
 
 T = TypeVar("T")
 
+_SUCCESS_PREFIX = b'{"code":200,"message":"success","data":'
+
+
 class Result(BaseModel, Generic[T]):
     code: int
     message: str
@@ -15,3 +19,8 @@ class Result(BaseModel, Generic[T]):
     @classmethod
     def error(cls, message: str = "error", code: int = 500):
         return cls(code=code, message=message, data=None)
+
+    @classmethod
+    def success_raw(cls, data_json: bytes) -> Response:
+        """以已序列化的 data（JSON 字节）直接拼出成功响应，跳过模型校验与再次序列化。"""
+        return Response(content=_SUCCESS_PREFIX + data_json + b"}", media_type="application/json")
@@ -0,0 +1,65 @@
+"""
+缓存标签命名（见 app.db.redis.invalidate）
+
+- sid:<学号>          该学生的记录、成绩、排名
+- class:<班级号>       班级内排名相关的缓存
+- major:<专业代码>      专业排名、专业内学生的记录与排名、含该专业学生最新绩点的推免视图
+- course:<课程名>      课程级统计（挂科率、筛选项）；course: 表示不限课程的统计
+- rec_year:<年份>      推免名单与筛选项；rec_year: 表示不限年份
+- course_catalog      课程名搜索（出现新课程时失效）
+- cohort              群体统计
+- roster              学生名册（姓名、班级等基本信息）变更；无缓存 key 依赖，仅用于通知内存索引重建
+- notice:<key>        公告
+
+失效某门课程 / 某年份时，同时失效不限课程 / 年份的标签（见 courses、rec_years）。
+"""
+from typing import Iterable, List, Optional
+from app.utils.class_utils import get_major_code
+
+COURSE_CATALOG = "course_catalog"
+COHORT = "cohort"
+ROSTER = "roster"
+
+
+def sid(student_id: str) -> str:
+    return f"sid:{student_id}"
+
+
+def klass(s_class: str) -> str:
+    return f"class:{s_class}"
+
+
+def major(major_code: str) -> str:
+    return f"major:{major_code}"
+
+
+def course(course_name: Optional[str]) -> str:
+    return f"course:{course_name or ''}"
+
+
+def rec_year(year: Optional[int]) -> str:
+    return f"rec_year:{year or ''}"
+
+
+def notice(key: str) -> str:
+    return f"notice:{key}"
+
+
+def of_student(student_id: str, s_class: Optional[str]) -> List[str]:
+    """学生本人及其班级、专业。"""
+    tags = [sid(student_id)]
+    if s_class:
+        tags.append(klass(s_class))
+        if get_major_code(s_class):
+            tags.append(major(get_major_code(s_class)))
+    return tags
+
+
+def courses(names: Iterable[str]) -> List[str]:
+    tags = [course(n) for n in names]
+    return tags + [course(None)] if tags else tags
+
+
+def rec_years(years: Iterable[int]) -> List[str]:
+    tags = [rec_year(y) for y in years]
+    return tags + [rec_year(None)] if tags else tags
@@ -0,0 +1,104 @@
+"""
+群体统计（班级 / 专业 / 年级 / 年级+学院）
+
+一次扫描 student 表，按以下维度汇总人数以及绩点、均分的平均值与中位数：
+- class：完整班级号
+- major：专业代码（班级号前 8 位）；班级号不足 8 位的学生不归入任何专业
+- grade：年级；grade_college：年级 + 学院
+
+统计只随数据导入变化：结果存于 Redis（缓存代际命名空间下，导入后自动重算），
+进程内保留一份解析好的副本，代际变化后重新读取。排名总人数、推免专业总人数等均由此查表得到，
+不再逐请求执行 COUNT。
+"""
+from statistics import mean, median
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.db.redis import cache_get_or_load, get_cache_generation
+from app.models.models import Student
+from app.services import cache_tags
+from app.utils.class_utils import get_major_code
+
+COHORT_STATS_KEY = "cohort_stats"
+COHORT_STATS_TTL = 86400
+
+EMPTY = {"count": 0, "gpaMean": None, "gpaMedian": None, "avgMean": None, "avgMedian": None}
+
+
+def _summarize(members: List[Tuple[Optional[float], Optional[float]]]) -> Dict[str, Any]:
+    """空值不参与平均值与中位数的计算，但计入人数（与 COUNT(student_id) 一致）。"""
+    gpa = [g for g, _ in members if g is not None]
+    avg = [a for _, a in members if a is not None]
+    return {
+        "count": len(members),
+        "gpaMean": round(mean(gpa), 4) if gpa else None,
+        "gpaMedian": round(median(gpa), 4) if gpa else None,
+        "avgMean": round(mean(avg), 4) if avg else None,
+        "avgMedian": round(median(avg), 4) if avg else None,
+    }
+
+
+def compute(db: Session) -> Dict[str, Any]:
+    groups: Dict[str, Dict[str, list]] = {"class": {}, "major": {}, "grade": {}, "grade_college": {}}
+    everyone = []
+    rows = db.query(Student.sClass, Student.sGrade, Student.sCollege, Student.sGpa, Student.sAvg).all()
+    for s_class, grade, college, gpa, avg in rows:
+        member = (gpa, avg)
+        if s_class is not None:
+            # 与 s_class LIKE '%' 一致：班级号为空的学生不计入
+            everyone.append(member)
+            groups["class"].setdefault(s_class, []).append(member)
+            major_code = get_major_code(s_class)
+            if major_code:
+                groups["major"].setdefault(major_code, []).append(member)
+        if grade is not None:
+            groups["grade"].setdefault(grade, []).append(member)
+            if college is not None:
+                groups["grade_college"].setdefault(f"{grade}|{college}", []).append(member)
+
+    result = {name: {k: _summarize(v) for k, v in group.items()} for name, group in groups.items()}
+    result["all"] = _summarize(everyone)
+    return result
+
+
+class CohortStats:
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    def klass(self, s_class: Optional[str]) -> Dict[str, Any]:
+        if s_class is None:
+            return EMPTY
+        return self.data["class"].get(s_class, EMPTY)
+
+    def major(self, major_code: str) -> Dict[str, Any]:
+        # 专业代码为空时，原 LIKE '' || '%' 查询统计的是全部学生
+        if not major_code:
+            return self.data["all"]
+        return self.data["major"].get(major_code, EMPTY)
+
+    def grade(self, grade: str, college: Optional[str] = None) -> Dict[str, Any]:
+        if college:
+            return self.data["grade_college"].get(f"{grade}|{college}", EMPTY)
+        return self.data["grade"].get(grade, EMPTY)
+
+
+# (缓存代际, 统计)；代际变化后首次访问时重新读取
+_current: Optional[Tuple[int, CohortStats]] = None
+
+
+def get(db: Session) -> CohortStats:
+    global _current
+    generation = get_cache_generation()
+    current = _current
+    if current is not None and current[0] == generation:
+        return current[1]
+    data = cache_get_or_load(COHORT_STATS_KEY, lambda: compute(db), COHORT_STATS_TTL, [cache_tags.COHORT])
+    stats = CohortStats(data)
+    _current = (generation, stats)
+    return stats
+
+
+def discard(keys: Iterable[str]):
+    """定向失效涉及群体统计时，下次访问重新读取。"""
+    global _current
+    if COHORT_STATS_KEY in keys:
+        _current = None
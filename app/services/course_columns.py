@@ -0,0 +1,219 @@
+"""
+课程成绩列式内存数据集（挂科率统计）
+
+将 course_score ⋈ student 全量加载为 NumPy 列：
+- 课程、学期、学院、专业、班级、学号均做字典编码（整数码 + 取值表）
+- 成绩为 float32（与 MySQL FLOAT 精度一致，NULL 记为 NaN），c_pass 为 int8（NULL 记为 -1）
+- 行按 (课程, 学号) 排序，同一课程的行连续存放，同一 (学号, 课程) 的多次考试相邻
+
+/cs/fail-rate 用布尔掩码过滤后按 (学号, 课程) 分组取 max，结果与
+CourseScoreRepository 中的 SQL 统计完全一致（包括学期筛选先于取“最终成绩”的语义）。
+同一份数据也为分面筛选（facet_index）提供按课程去重的 (学期, 学院, 专业, 班级) 组合。
+数据集记下构建前的数据版本（data_version），/cs/filter 的 ETag 取该版本。
+"""
+import sys
+import time
+import itertools
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select
+from app.db.redis import snapshot_data_version
+from app.db.session import read_session
+from app.models.models import Student, CourseScore
+from app.schemas.dtos import CourseInfoFilterDTO
+from app.services import facet_index
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 100_000  # 分块读取的行数（recompute 共用）
+_build_ids = itertools.count(1)
+
+
+class Dictionary:
+    """字符串字典编码：值 -> 连续整数码。"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, values: List[str]) -> np.ndarray:
+        return np.array([self.codes[v] for v in values if v in self.codes], dtype=np.int32)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class CourseScoreColumns:
+    def __init__(self):
+        self.courses = Dictionary()
+        self.terms = Dictionary()
+        self.colleges = Dictionary()
+        self.majors = Dictionary()
+        self.classes = Dictionary()
+        self.sids = Dictionary()
+        self.build_seconds = 0.0
+        # 每次构建唯一，用作由本数据集派生的缓存 key 的一部分，数据集替换后旧结果自然失效
+        self.build_id = next(_build_ids)
+        self.data_version = 0
+
+    @classmethod
+    def build(cls) -> "CourseScoreColumns":
+        start = time.perf_counter()
+        cols = cls()
+        cols.data_version = snapshot_data_version()
+        course, term, college, major, klass, sid, cpass, score = ([] for _ in range(8))
+        stmt = (
+            select(
+                CourseScore.studentId, CourseScore.courseName, CourseScore.cTerm,
+                CourseScore.cPass, CourseScore.score,
+                Student.sCollege, Student.sMajor, Student.sClass,
+            )
+            .join(Student, CourseScore.studentId == Student.studentId)
+            .execution_options(yield_per=CHUNK_ROWS)
+        )
+        db = read_session()
+        try:
+            for chunk in db.execute(stmt).partitions():
+                course.append(np.fromiter((cols.courses.encode(r[1]) for r in chunk), np.int32, len(chunk)))
+                sid.append(np.fromiter((cols.sids.encode(r[0]) for r in chunk), np.int32, len(chunk)))
+                term.append(np.fromiter((cols.terms.encode(r[2]) for r in chunk), np.int32, len(chunk)))
+                cpass.append(np.fromiter((-1 if r[3] is None else r[3] for r in chunk), np.int8, len(chunk)))
+                score.append(np.fromiter((np.nan if r[4] is None else r[4] for r in chunk), np.float32, len(chunk)))
+                college.append(np.fromiter((cols.colleges.encode(r[5]) for r in chunk), np.int32, len(chunk)))
+                major.append(np.fromiter((cols.majors.encode(r[6]) for r in chunk), np.int32, len(chunk)))
+                klass.append(np.fromiter((cols.classes.encode(r[7]) for r in chunk), np.int32, len(chunk)))
+        finally:
+            db.close()
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+        course, sid = concat(course, np.int32), concat(sid, np.int32)
+        order = np.lexsort((sid, course))
+        cols.course = course[order]
+        cols.sid = sid[order]
+        cols.term = concat(term, np.int32)[order]
+        cols.college = concat(college, np.int32)[order]
+        cols.major = concat(major, np.int32)[order]
+        cols.klass = concat(klass, np.int32)[order]
+        cols.cpass = concat(cpass, np.int8)[order]
+        cols.score = concat(score, np.float32)[order]
+        # 每门课程在排序后数组中的起止位置：course_offsets[c] .. course_offsets[c + 1]
+        cols.course_offsets = np.searchsorted(cols.course, np.arange(len(cols.courses.values) + 1))
+        cols.build_seconds = time.perf_counter() - start
+        return cols
+
+    @property
+    def rows(self) -> int:
+        return int(self.course.size)
+
+    def nbytes(self) -> int:
+        arrays = (self.course, self.sid, self.term, self.college, self.major,
+                  self.klass, self.cpass, self.score, self.course_offsets)
+        dicts = (self.courses, self.terms, self.colleges, self.majors, self.classes, self.sids)
+        return sum(a.nbytes for a in arrays) + sum(d.nbytes() for d in dicts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "courses": len(self.courses.values),
+            "students": len(self.sids.values),
+            "build_seconds": round(self.build_seconds, 3),
+            "memory_bytes": self.nbytes(),
+        }
+
+    def _slice(self, course_name: Optional[str]) -> slice:
+        if not course_name:
+            return slice(0, self.rows)
+        code = self.courses.codes.get(course_name)
+        if code is None:
+            return slice(0, 0)
+        return slice(int(self.course_offsets[code]), int(self.course_offsets[code + 1]))
+
+    def facet_rows(self, course_name: Optional[str]) -> List[tuple]:
+        """某门课程（为空则全部课程）去重后的 (学期, 学院, 专业, 班级) 组合。"""
+        s = self._slice(course_name)
+        if s.stop == s.start:
+            return []
+        codes = np.unique(np.stack((self.term[s], self.college[s], self.major[s], self.klass[s]), axis=1), axis=0)
+        t, c, m, k = self.terms.values, self.colleges.values, self.majors.values, self.classes.values
+        return [(t[a], c[b], m[d], k[e]) for a, b, d, e in codes.tolist()]
+
+    def fail_rate(self, f: CourseInfoFilterDTO) -> Dict[str, int]:
+        s = self._slice(f.courseName)
+        mask = np.ones(s.stop - s.start, dtype=bool)
+        for values, dictionary, column in (
+            (f.terms, self.terms, self.term),
+            (f.colleges, self.colleges, self.college),
+            (f.majors, self.majors, self.major),
+            (f.classes, self.classes, self.klass),
+        ):
+            if values:
+                mask &= np.isin(column[s], dictionary.lookup(values))
+
+        idx = np.flatnonzero(mask) + s.start
+        if idx.size == 0:
+            return {
+                "totalStudents": 0, "failStudents": 0,
+                "0-59": 0, "60-69": 0, "70-79": 0, "80-89": 0, "90-100": 0
+            }
+
+        # 行已按 (课程, 学号) 排序，过滤后仍有序，相邻相同即同组
+        sid, course = self.sid[idx], self.course[idx]
+        boundary = np.empty(idx.size, dtype=bool)
+        boundary[0] = True
+        np.not_equal(sid[1:], sid[:-1], out=boundary[1:])
+        boundary[1:] |= course[1:] != course[:-1]
+        starts = np.flatnonzero(boundary)
+
+        final_pass = np.maximum.reduceat(self.cpass[idx], starts)
+        final_score = np.fmax.reduceat(self.score[idx], starts)  # fmax 忽略 NaN，与 SQL MAX 忽略 NULL 一致
+
+        with np.errstate(invalid="ignore"):
+            fail = (final_pass == 1) | (final_pass == 2) | (final_score < 60)
+            buckets = np.digitize(final_score, [0, 60, 70, 80, 90])
+        counts = np.bincount(buckets[~np.isnan(final_score)], minlength=6)
+        return {
+            "totalStudents": int(np.unique(sid[starts]).size),
+            "failStudents": int(np.count_nonzero(fail)),
+            "0-59": int(counts[1]),
+            "60-69": int(counts[2]),
+            "70-79": int(counts[3]),
+            "80-89": int(counts[4]),
+            "90-100": int(counts[5]),
+        }
+
+
+_current: Optional[CourseScoreColumns] = None
+_build_lock = threading.Lock()
+
+
+def get() -> Optional[CourseScoreColumns]:
+    """当前可用的数据集；尚未加载完成时返回 None，调用方应回退到 SQL。"""
+    return _current
+
+
+def data_version() -> Optional[int]:
+    """当前数据集构建所依据的数据版本；尚未加载时返回 None。"""
+    cols = _current
+    return None if cols is None else cols.data_version
+
+
+def refresh():
+    """重新构建数据集并原子替换。"""
+    global _current
+    with _build_lock:
+        cols = CourseScoreColumns.build()
+        _current = cols
+        facet_index.clear()
+    logger.info(f"课程成绩列式数据集已加载: {cols.stats()}")
@@ -0,0 +1,122 @@
+"""
+课程名 n-gram 倒排索引（/cs/name 自动补全）
+
+对全部去重课程名建立单字、二元、三元倒排表，查询时：
+- 1 个字符：直接取单字倒排表（单个汉字也无需扫描）
+- 2 个字符：直接取二元倒排表
+- 3 个及以上：取各三元组倒排表求交集，再校验子串，排除位置不连续的误匹配
+
+匹配不区分大小写（与 MySQL LIKE 的默认排序规则一致）。结果排序：前缀匹配优先，
+其次名称更短，最后按名称；非空查询最多返回 top_k 条。倒排表预先按 (长度, 名称) 排序，
+短查询只需顺序取前 top_k 个。
+
+索引记下构建前的数据版本（data_version），/cs/name 的 ETag 取该版本：失效后到后台重建完成之前，
+旧索引的响应仍带旧 ETag。
+"""
+import time
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from app.db.redis import snapshot_data_version
+from app.db.session import read_session
+from app.models.models import CourseScore
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _rank_key(name: str, query: str):
+    return (not name.lower().startswith(query), len(name), name)
+
+
+def rank_names(names: Iterable[str], query: str, top_k: int) -> List[str]:
+    """对已匹配的课程名按索引相同的规则排序并截断（供 SQL 回退路径复用）。"""
+    query = query.lower()
+    return sorted(names, key=lambda n: _rank_key(n, query))[:top_k]
+
+
+class CourseNameIndex:
+    def __init__(self, names: List[str], data_version: int = 0):
+        start = time.perf_counter()
+        self.data_version = data_version
+        self.names = sorted(set(names))
+        # 名称 id 按 (长度, 名称) 分配，倒排表天然有序
+        self._by_rank = sorted(self.names, key=lambda n: (len(n), n))
+        self._lower = [n.lower() for n in self._by_rank]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        prefixes: Dict[str, List[int]] = defaultdict(list)
+        for i, name in enumerate(self._lower):
+            grams = set()
+            for n in (1, 2, 3):
+                grams.update(name[j:j + n] for j in range(len(name) - n + 1))
+            for g in grams:
+                postings[g].append(i)
+            for n in (1, 2):
+                if len(name) >= n:
+                    prefixes[name[:n]].append(i)
+        self._postings = dict(postings)
+        self._prefixes = dict(prefixes)
+        self.build_seconds = time.perf_counter() - start
+
+    def search(self, query: str, top_k: int) -> List[str]:
+        if not query:
+            return list(self.names)
+        q = query.lower()
+        if len(q) <= 2:
+            # 倒排表已按 (长度, 名称) 排序：先取前缀匹配，再补充其余匹配
+            prefix_ids = self._prefixes.get(q, [])[:top_k]
+            result = [self._by_rank[i] for i in prefix_ids]
+            if len(result) < top_k:
+                seen = set(prefix_ids)
+                for i in self._postings.get(q, []):
+                    if i not in seen:
+                        result.append(self._by_rank[i])
+                        if len(result) >= top_k:
+                            break
+            return result
+
+        lists = sorted((self._postings.get(q[j:j + 3], []) for j in range(len(q) - 2)), key=len)
+        if not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for p in lists[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return []
+        matched = [self._by_rank[i] for i in candidates if q in self._lower[i]]
+        return rank_names(matched, q, top_k)
+
+
+_current: Optional[CourseNameIndex] = None
+
+
+def get() -> Optional[CourseNameIndex]:
+    return _current
+
+
+def data_version() -> Optional[int]:
+    """当前索引构建所依据的数据版本；尚未加载时返回 None。"""
+    index = _current
+    return None if index is None else index.data_version
+
+
+def refresh():
+    global _current
+    version = snapshot_data_version()
+    db = read_session()
+    try:
+        names = db.execute(select(CourseScore.courseName).distinct()).scalars().all()
+    finally:
+        db.close()
+    index = CourseNameIndex(names, version)
+    _current = index
+    logger.info(f"课程名索引已加载: {len(index.names)} 门课程, 耗时 {index.build_seconds:.3f}s")
+
+
+def search(query: str) -> Optional[List[str]]:
+    """索引可用时返回匹配结果，否则返回 None。"""
+    index = _current
+    if index is None:
+        return None
+    return index.search(query, settings.COURSE_NAME_TOP_K)
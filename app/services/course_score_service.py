@@ -1,9 +1,16 @@
+import orjson
 from sqlalchemy.orm import Session
-from app.services.repositories import CourseScoreRepository
+from app.db.local_cache import LocalCache, MISS
+from app.db.redis import make_hash_key
+from app.services import course_columns
+from app.services.repositories import CourseScoreRepository, FAIL_RATE_TTL
 from app.models.models import CourseScore
 from app.schemas.dtos import CourseInfoFilterDTO, FailRateStatisDTO
 from typing import List
 
+# 挂科率响应（JSON 字节），key 含列式数据集的 build_id
+_fail_rate_json = LocalCache(max_entries=4096, max_bytes=16 * 1024 * 1024)
+
 class CourseScoreService:
     @staticmethod
     def get_scores_by_student_id(db: Session, student_id: str) -> List[CourseScore]:
@@ -33,21 +40,34 @@ class CourseScoreService:
             scoreDistribution=distribution
         )
 
+    @staticmethod
+    def get_fail_rate_statistics_json(db: Session, filter_dto: CourseInfoFilterDTO) -> bytes:
+        """同 get_fail_rate_statistics，返回序列化好的 JSON 字节；列式数据集可用时在进程内缓存结果。"""
+        columns = course_columns.get()
+        if columns is None:
+            return orjson.dumps(CourseScoreService.get_fail_rate_statistics(db, filter_dto).model_dump())
+
+        key = make_hash_key("fail_rate", build=columns.build_id,
+            courseName=filter_dto.courseName, terms=filter_dto.terms,
+            colleges=filter_dto.colleges, majors=filter_dto.majors, classes=filter_dto.classes)
+        raw = _fail_rate_json.get(key)
+        if raw is MISS:
+            raw = orjson.dumps(CourseScoreService.get_fail_rate_statistics(db, filter_dto).model_dump())
+            _fail_rate_json.set(key, raw, FAIL_RATE_TTL, len(raw))
+        return raw
+
     @staticmethod
     def get_course_names(db: Session, course_name: str) -> List[str]:
         return CourseScoreRepository.get_course_names(db, course_name)
 
     @staticmethod
     def get_dynamic_filter_options(db: Session, current_filter: CourseInfoFilterDTO) -> CourseInfoFilterDTO:
-        terms = CourseScoreRepository.get_available_options(db, current_filter, 'c_term')
-        colleges = CourseScoreRepository.get_available_options(db, current_filter, 's_college')
-        majors = CourseScoreRepository.get_available_options(db, current_filter, 's_major')
-        classes = CourseScoreRepository.get_available_options(db, current_filter, 's_class')
-        
+        options = CourseScoreRepository.get_filter_options(db, current_filter)
+
         return CourseInfoFilterDTO(
             courseName=current_filter.courseName,
-            terms=terms,
-            colleges=colleges,
-            majors=majors,
-            classes=classes
+            terms=options["terms"],
+            colleges=options["colleges"],
+            majors=options["majors"],
+            classes=options["classes"]
         )
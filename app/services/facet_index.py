@@ -0,0 +1,89 @@
+"""
+课程筛选项分面索引（/cs/filter 与 /cs/filter/dynamic）
+
+以某门课程全部去重的 (学期, 学院, 专业, 班级) 组合为基础，为每个分面的每个取值建立位图
+（Python 大整数，第 i 位表示第 i 个组合含有该取值）。一次筛选：
+- 每个分面按已选值求位图并集得到掩码（未选则为全集）
+- 某分面的可选项 = 与其余三个分面掩码之交有重叠的取值（即每个分面忽略自身的选择）
+
+索引按课程缓存，同一课程的任意筛选组合都复用同一个索引。
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+from app.db.local_cache import LocalCache, MISS
+from app.schemas.dtos import CourseInfoFilterDTO
+
+# 分面顺序与组合中各列一致
+FACETS = ("terms", "colleges", "majors", "classes")
+
+_INDEX_TTL = 3600
+_cache = LocalCache(max_entries=512, max_bytes=256 * 1024 * 1024)
+
+
+def _bitmap(indices: List[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class CourseFacetIndex:
+    def __init__(self, rows: Sequence[Sequence[Optional[str]]]):
+        self.size = len(rows)
+        self.all = (1 << self.size) - 1
+        self.bitmaps: List[Dict[str, int]] = []
+        self.values: List[List[str]] = []
+        for col in range(len(FACETS)):
+            positions: Dict[str, List[int]] = {}
+            for i, row in enumerate(rows):
+                positions.setdefault(row[col], []).append(i)
+            self.bitmaps.append({v: _bitmap(p, self.size) for v, p in positions.items()})
+            # 学生侧字段排除空值（学期为主键列，不会为空）
+            self.values.append(sorted(v for v in positions if v is not None and v != ""))
+
+    def nbytes(self) -> int:
+        return sum((bm.bit_length() + 7) // 8 for d in self.bitmaps for bm in d.values())
+
+    def options(self, f: CourseInfoFilterDTO) -> Dict[str, List[str]]:
+        masks = []
+        for col, facet in enumerate(FACETS):
+            selected = getattr(f, facet)
+            if not selected:
+                masks.append(self.all)
+                continue
+            mask = 0
+            for v in selected:
+                mask |= self.bitmaps[col].get(v, 0)
+            masks.append(mask)
+
+        result = {}
+        for col, facet in enumerate(FACETS):
+            combined = self.all
+            for other, mask in enumerate(masks):
+                if other != col:
+                    combined &= mask
+            bitmaps = self.bitmaps[col]
+            result[facet] = [v for v in self.values[col] if bitmaps[v] & combined] if combined else []
+        return result
+
+
+def _key(course_name: Optional[str]) -> str:
+    return f"course_facets:{course_name or ''}"
+
+
+def get_cached(course_name: Optional[str]) -> Optional[CourseFacetIndex]:
+    index = _cache.get(_key(course_name))
+    return None if index is MISS else index
+
+
+def put(course_name: Optional[str], index: CourseFacetIndex):
+    _cache.set(_key(course_name), index, _INDEX_TTL, index.nbytes())
+
+
+def clear():
+    _cache.clear()
+
+
+def discard(keys: Iterable[str]):
+    """丢弃指定 key 的进程内副本（定向失效时调用）。"""
+    for key in keys:
+        _cache.delete(key)
@@ -0,0 +1,334 @@
+"""
+成绩 / 学生数据批量导入（命令行入口见 app/cli/ingest.py）
+
+- 流式读取 CSV / XLSX（XLSX 需安装 openpyxl，以只读模式逐行读取），每 chunk_rows 行为一批
+- 每批按主键去重（同键取最后一行）后 upsert：成绩以 (学号, 学期, 课程名) 为键，学生以学号为键；
+  MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 使用 INSERT ... ON CONFLICT DO UPDATE，
+  只更新文件中出现的列，每批单独提交
+- 内存占用由批大小决定，与文件总行数无关；跨批只保留受影响的学号 / 班级 / 专业代码 / 课程集合
+- 导入完成后按受影响集合失效对应的缓存标签（见 invalidate），不递增缓存代际，其余缓存不受影响
+
+表头可用模型属性名（studentId）、数据库列名（s_id）或中文列名（学号），见 HEADER_ALIASES。
+"""
+import csv
+import time
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pypinyin import lazy_pinyin
+from sqlalchemy import Float, Integer, distinct, inspect, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.redis import invalidate as invalidate_tags
+from app.db.session import SessionLocal
+from app.models.models import CourseScore, Student
+from app.services import cache_tags
+from app.utils.class_utils import get_major_code
+
+logger = logging.getLogger(__name__)
+
+HEADER_ALIASES = {
+    "学号": "studentId", "学期": "cTerm", "课程名称": "courseName", "课程名": "courseName", "成绩": "score",
+    "课程性质": "cType", "学时": "cHours", "学分": "cCredit", "考试性质": "cPass",
+    "姓名": "sName", "拼音": "sPy", "学院": "sCollege", "专业": "sMajor", "年级": "sGrade", "班级": "sClass",
+    "均分": "sAvg", "绩点": "sGpa",
+}
+
+# c_pass 文字取值（0-正常 1-补考 2-重修 3-刷分）
+PASS_LABELS = {"正常": 0, "补考": 1, "重修": 2, "刷分": 3}
+
+MAX_ERROR_SAMPLES = 20
+_IN_BATCH = 1000
+
+
+class IngestError(Exception):
+    pass
+
+
+class _Target:
+    """导入目标表：属性名 -> 列、主键属性。"""
+
+    def __init__(self, model):
+        self.model = model
+        self.table = model.__table__
+        self.columns = {attr.key: attr.columns[0] for attr in inspect(model).column_attrs}
+        self.key = [attr for attr, column in self.columns.items() if column.primary_key]
+        self.aliases = dict(HEADER_ALIASES)
+        for attr, column in self.columns.items():
+            self.aliases[attr] = attr
+            self.aliases[column.name] = attr
+
+
+TARGETS = {"scores": _Target(CourseScore), "students": _Target(Student)}
+
+
+class Touched:
+    """一次导入影响到的实体集合。"""
+
+    def __init__(self):
+        self.sids: Set[str] = set()
+        self.classes: Set[str] = set()
+        self.majors: Set[str] = set()
+        self.courses: Set[str] = set()
+        # 导入前库中不存在的课程名（影响课程名搜索）
+        self.new_courses: Set[str] = set()
+        # 学生表有变更（影响群体统计、姓名索引与筛选项）
+        self.students_changed = False
+        # 均分 / 绩点 / 排名已重算（影响群体统计）
+        self.aggregates_changed = False
+
+    def add_class(self, s_class: Optional[str]):
+        if s_class:
+            self.classes.add(s_class)
+            major = get_major_code(s_class)
+            if major:
+                self.majors.add(major)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sids": sorted(self.sids), "classes": sorted(self.classes), "majors": sorted(self.majors),
+            "courses": sorted(self.courses), "new_courses": sorted(self.new_courses),
+            "students_changed": self.students_changed, "aggregates_changed": self.aggregates_changed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Touched":
+        touched = cls()
+        for name in ("sids", "classes", "majors", "courses", "new_courses"):
+            getattr(touched, name).update(data.get(name, ()))
+        touched.students_changed = bool(data.get("students_changed"))
+        touched.aggregates_changed = bool(data.get("aggregates_changed"))
+        return touched
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "sids": len(self.sids), "classes": len(self.classes), "majors": len(self.majors),
+            "courses": len(self.courses), "new_courses": len(self.new_courses),
+        }
+
+
+# ---------- 读取 ----------
+
+def _read_csv(path: str, encoding: str) -> Iterator[list]:
+    with open(path, newline="", encoding=encoding) as f:
+        yield from csv.reader(f)
+
+
+def _read_xlsx(path: str, sheet: Optional[str]) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise IngestError("读取 XLSX 需要安装 openpyxl（pip install openpyxl），或先另存为 CSV")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(path: str, encoding: str = "utf-8-sig", sheet: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """逐行产出 (行号, {表头: 原始值})，跳过空行。"""
+    rows = _read_xlsx(path, sheet) if path.lower().endswith((".xlsx", ".xlsm")) else _read_csv(path, encoding)
+    header = None
+    for line, values in enumerate(rows, start=1):
+        if header is None:
+            header = [str(h).strip() if h is not None else "" for h in values]
+            continue
+        if not any(v not in (None, "") for v in values):
+            continue
+        yield line, dict(zip(header, values))
+
+
+# ---------- 转换 ----------
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    # XLSX 中的学号、班级号等常被存为数字
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _convert(attr: str, column, value: Any) -> Any:
+    text = _text(value)
+    if text is None:
+        return None
+    if attr == "cPass" and text in PASS_LABELS:
+        return PASS_LABELS[text]
+    if isinstance(column.type, Integer):
+        return int(float(text))
+    if isinstance(column.type, Float):
+        return float(text)
+    return text
+
+
+def _upsert_statement(dialect: str, table, key_columns: List[str], update_columns: List[str]):
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        if not update_columns:
+            return stmt.prefix_with("IGNORE")
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=key_columns)
+        return stmt.on_conflict_do_update(index_elements=key_columns,
+                                          set_={c: stmt.excluded[c] for c in update_columns})
+    raise IngestError(f"不支持的数据库: {dialect}")
+
+
+def _chunks(values: Iterable, size: int = _IN_BATCH) -> Iterator[list]:
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class IngestService:
+    @staticmethod
+    def ingest(path: str, table: str = "scores", chunk_rows: Optional[int] = None,
+               encoding: str = "utf-8-sig", sheet: Optional[str] = None,
+               invalidate: bool = True, touched: Optional[Touched] = None) -> Dict[str, Any]:
+        """导入文件并返回报告（行数、耗时、每秒行数、受影响集合计数、失效 key 数）。
+        受影响集合记录在 touched 中（可由调用方传入以便后续使用）。"""
+        target = TARGETS[table]
+        chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+        touched = touched if touched is not None else Touched()
+        touched.students_changed = table == "students"
+        report: Dict[str, Any] = {"file": path, "table": table, "read": 0, "upserted": 0, "rejected": 0,
+                                  "chunks": 0, "errors": []}
+        start = time.perf_counter()
+
+        db = SessionLocal()
+        try:
+            attrs, stmt, batch = None, None, {}
+            for line, raw in read_rows(path, encoding, sheet):
+                if attrs is None:
+                    attrs = IngestService._resolve_header(target, list(raw))
+                    if table == "students" and "sName" in attrs and "sPy" not in attrs:
+                        attrs["sPy"] = None
+                    update = [target.columns[a].name for a in attrs if a not in target.key]
+                    stmt = _upsert_statement(db.bind.dialect.name, target.table,
+                                             [target.columns[a].name for a in target.key], update)
+                report["read"] += 1
+                try:
+                    row = IngestService._convert_row(target, attrs, raw)
+                except (TypeError, ValueError) as e:
+                    IngestService._reject(report, line, str(e))
+                    continue
+                batch[tuple(row[target.columns[a].name] for a in target.key)] = row
+                if len(batch) >= chunk_rows:
+                    IngestService._flush(db, target, stmt, batch, touched, report)
+                    batch = {}
+            if batch:
+                IngestService._flush(db, target, stmt, batch, touched, report)
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - start
+        report["seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["upserted"] / elapsed, 1) if elapsed > 0 else 0.0
+        report["touched"] = touched.summary()
+        if invalidate and report["upserted"]:
+            report["invalidation"] = IngestService.invalidate(touched)
+        return report
+
+    @staticmethod
+    def _resolve_header(target: _Target, header: List[str]) -> Dict[str, Optional[str]]:
+        """属性名 -> 文件中的表头。"""
+        attrs: Dict[str, Optional[str]] = {}
+        for name in header:
+            attr = target.aliases.get(name)
+            if attr in target.columns and attr not in attrs:
+                attrs[attr] = name
+        missing = [a for a in target.key if a not in attrs]
+        if missing:
+            raise IngestError(f"缺少主键列: {', '.join(missing)}（表头: {', '.join(header)}）")
+        return attrs
+
+    @staticmethod
+    def _convert_row(target: _Target, attrs: Dict[str, Optional[str]], raw: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for attr, name in attrs.items():
+            if name is None:
+                continue
+            row[target.columns[attr].name] = _convert(attr, target.columns[attr], raw.get(name))
+        for attr in target.key:
+            if row[target.columns[attr].name] is None:
+                raise ValueError(f"主键 {attr} 为空")
+        if "sPy" in attrs and attrs["sPy"] is None:
+            name = row.get("s_name")
+            row["s_py"] = "".join(lazy_pinyin(name)) if name else None
+        return row
+
+    @staticmethod
+    def _reject(report: Dict[str, Any], line: int, reason: str):
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_ERROR_SAMPLES:
+            report["errors"].append({"line": line, "error": reason})
+
+    @staticmethod
+    def _flush(db: Session, target: _Target, stmt, batch: Dict[tuple, Dict[str, Any]],
+               touched: Touched, report: Dict[str, Any]):
+        rows = list(batch.values())
+        sids = {r["s_id"] for r in rows}
+
+        # 导入前的班级（学生换班时新旧班级都受影响）
+        for part in _chunks(sids - touched.sids):
+            for _, s_class in db.execute(select(Student.studentId, Student.sClass)
+                                         .where(Student.studentId.in_(part))):
+                touched.add_class(s_class)
+        if target.model is CourseScore:
+            candidates = {r["c_name"] for r in rows} - touched.courses
+            existing = set()
+            for part in _chunks(candidates):
+                existing.update(db.execute(select(distinct(CourseScore.courseName))
+                                           .where(CourseScore.courseName.in_(part))).scalars())
+            touched.new_courses |= candidates - existing
+            touched.courses |= candidates
+        else:
+            for r in rows:
+                touched.add_class(r.get("s_class"))
+
+        db.execute(stmt, rows)
+        db.commit()
+        touched.sids |= sids
+        report["upserted"] += len(rows)
+        report["chunks"] += 1
+        if report["chunks"] % 10 == 0:
+            logger.info(f"已导入 {report['upserted']} 行（{report['chunks']} 批）")
+
+    @staticmethod
+    def invalidate(touched: Touched) -> Dict[str, int]:
+        """按受影响集合失效缓存标签（见 cache_tags）：
+        - sid / class / major：学生记录、成绩、排名、专业排名，以及含这些专业学生的推免视图
+          （专业内任一学生变化，同专业同学的名次都可能变化，专业标签覆盖全部相关 key）
+        - course：受影响课程及不限课程的挂科率、筛选项；出现新课程时另失效 course_catalog
+        - 学生表有变更时另失效 roster，并失效这些学生所修全部课程的统计（学院 / 专业 / 班级可能变化）
+        - 学生表有变更或均分 / 绩点已重算时另失效 cohort
+        """
+        courses = set(touched.courses)
+        if touched.students_changed:
+            db = SessionLocal()
+            try:
+                for part in _chunks(touched.sids):
+                    courses.update(db.execute(select(distinct(CourseScore.courseName))
+                                              .where(CourseScore.studentId.in_(part))).scalars())
+            finally:
+                db.close()
+
+        tags = [cache_tags.sid(s) for s in sorted(touched.sids)]
+        tags += [cache_tags.klass(c) for c in sorted(touched.classes)]
+        tags += [cache_tags.major(m) for m in sorted(touched.majors)]
+        tags += cache_tags.courses(sorted(courses))
+        if touched.new_courses:
+            tags.append(cache_tags.COURSE_CATALOG)
+        if touched.students_changed:
+            tags.append(cache_tags.ROSTER)
+        if touched.students_changed or touched.aggregates_changed:
+            tags.append(cache_tags.COHORT)
+        deleted = invalidate_tags(*tags)
+        logger.info(f"定向失效: {len(tags)} 个标签，删除 {deleted} 个 key")
+        return {"tags": len(tags), "deleted": deleted}
@@ -0,0 +1,82 @@
+"""
+专业排名结构（/stu/rank/major）
+
+每个专业只保存一份列数据 (学号, 绩点, 均分)，并为每个指标预先排好一个升序数组：
+- 排名（并列取最小名次，如 1,1,3）由 bisect 在有序数组上直接算出，升序和降序共用
+- 分页只取对应位置的切片，仅为当页构造 DTO
+- 学号 -> 下标索引用于 O(log n) 计算当前学生排名
+
+空值按 0.0 参与排序与并列判断，与原逐条计算的规则一致。
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.db.local_cache import LocalCache, MISS
+
+_cache = LocalCache(max_entries=1024, max_bytes=128 * 1024 * 1024)
+
+
+class MajorRanking:
+    def __init__(self, sids: Sequence[str], gpa: Sequence[Optional[float]], avg: Sequence[Optional[float]]):
+        self.sids = list(sids)
+        self.gpa = array("d", (v or 0.0 for v in gpa))
+        self.avg = array("d", (v or 0.0 for v in avg))
+        self.index: Dict[str, int] = {sid: i for i, sid in enumerate(self.sids)}
+        # 每个指标：升序排列的值，以及对应的原始下标
+        self.sorted: Dict[str, Tuple[array, array]] = {}
+        for metric, values in (("gpa", self.gpa), ("avg", self.avg)):
+            order = sorted(range(len(values)), key=lambda i: (values[i], self.sids[i]))
+            self.sorted[metric] = (array("d", (values[i] for i in order)), array("i", order))
+
+    @property
+    def total(self) -> int:
+        return len(self.sids)
+
+    def nbytes(self) -> int:
+        size = sum(len(s) for s in self.sids) + 16 * len(self.sids)
+        return size + sum(v.itemsize * len(v) + o.itemsize * len(o) for v, o in self.sorted.values())
+
+    def _rank(self, metric: str, value: float, order: str) -> int:
+        values = self.sorted[metric][0]
+        if order == "desc":
+            return len(values) - bisect_right(values, value) + 1
+        return bisect_left(values, value) + 1
+
+    def rank_of(self, sid: str, metric: str, order: str) -> int:
+        i = self.index.get(sid)
+        if i is None:
+            return 0
+        value = self.gpa[i] if metric == "gpa" else self.avg[i]
+        return self._rank(metric, value, order)
+
+    def page(self, metric: str, order: str, page: int, page_size: int) -> List[Tuple[int, float, float]]:
+        """返回当页的 (排名, 绩点, 均分)。"""
+        values, positions = self.sorted[metric]
+        n = len(values)
+        start = min((page - 1) * page_size, n)
+        end = min(start + page_size, n)
+        result = []
+        for p in range(start, end):
+            q = n - 1 - p if order == "desc" else p
+            i = positions[q]
+            result.append((self._rank(metric, values[q], order), self.gpa[i], self.avg[i]))
+        return result
+
+
+def get_cached(major_code: str) -> Optional[MajorRanking]:
+    ranking = _cache.get(f"major_ranking:{major_code}")
+    return None if ranking is MISS else ranking
+
+
+def put(major_code: str, ranking: MajorRanking, ttl: int):
+    _cache.set(f"major_ranking:{major_code}", ranking, ttl, ranking.nbytes())
+
+
+def clear():
+    _cache.clear()
+
+
+def discard(keys: Iterable[str]):
+    """丢弃指定 key 的进程内副本（定向失效时调用）。"""
+    for key in keys:
+        _cache.delete(key)
@@ -1,9 +1,11 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.models import Notice
-from app.db.redis import cache_get, cache_set
+from app.db.redis import cache_get_or_load, cache_peek_local
+from app.services import cache_tags
 from app.core.config import settings
 
-NOTICE_TTL = 300  # 5分钟，短 TTL 保证直接改 DB 也能很快生效
+NOTICE_TTL = 300  # 5分钟，短 TTL 保证直接改 DB 也能很快生效（也可 python -m app.cli.cache invalidate notice:<key> 立即生效）
 
 # 数据库无记录时的默认值（来自 env 配置）
 DEFAULTS = {
@@ -21,12 +23,24 @@ def _cache_key(key: str) -> str:
 class NoticeService:
     @staticmethod
     def get(db: Session, key: str) -> str:
-        cached = cache_get(_cache_key(key))
-        if cached is not None:
-            return cached
-
-        row = db.query(Notice).filter(Notice.key == key).first()
-        content = row.content if row else DEFAULTS.get(key, "")
-        cache_set(_cache_key(key), content, NOTICE_TTL)
-        return content
+        return NoticeService.get_entry(db, key)["content"]
+
+    @staticmethod
+    def peek_entry(key: str) -> Optional[dict]:
+        """进程内 L1 中的公告副本（不访问 Redis 与数据库），没有时返回 None。"""
+        return cache_peek_local(_cache_key(key))
+
+    @staticmethod
+    def get_entry(db: Session, key: str) -> dict:
+        """公告内容及更新时间：{"content": str, "updatedAt": ISO 格式字符串或 None（默认值）}。"""
+        def load():
+            row = db.query(Notice).filter(Notice.key == key).first()
+            if not row:
+                return {"content": DEFAULTS.get(key, ""), "updatedAt": None}
+            return {
+                "content": row.content,
+                "updatedAt": row.updatedAt.isoformat() if row.updatedAt else None,
+            }
+
+        return cache_get_or_load(_cache_key(key), load, NOTICE_TTL, [cache_tags.notice(key)])
 
@@ -0,0 +1,141 @@
+"""
+推免名单视图（/rec/list）
+
+每个年份一份：推免记录与学生最新绩点 / 专业绩点排名预先合并为列表项，并预先排好两种顺序：
+- 按 (学院, 专业, 综合排名)：未指定专业时使用；指定学院、学院+专业的结果都是其中连续的一段
+- 按专业分组、组内按综合排名：只指定专业（未指定学院）时使用
+
+每种筛选组合的汇总（推免人数、专业人数、比例）在构建时算好，分页只取切片。
+另支持游标分页：游标记录上一页最后一行的排序键，在有序键数组上二分定位，深页与首页代价相同。
+同名次时以行在该年份名单中的位置区分先后，游标中不含学号或由学号派生的值。
+
+空值按 MySQL 升序规则排在最前，与原 ORDER BY 一致。
+"""
+import base64
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import orjson
+from app.db.local_cache import LocalCache, MISS
+
+_cache = LocalCache(max_entries=64, max_bytes=256 * 1024 * 1024)
+
+# 列表项字段（与 RecItemDTO 一致）
+ITEM_FIELDS = ("college", "major", "recGpa", "latestGpa", "perfScore", "compScore", "compRank", "latestGpaRank", "remark")
+
+Filter = Tuple[Optional[str], Optional[str]]
+
+
+def _nk(value) -> tuple:
+    return (0, "") if value is None else (1, value)
+
+
+def _grouped_key(row: dict) -> tuple:
+    return _nk(row["college"]), _nk(row["major"]), _nk(row["compRank"]), row["tie"]
+
+
+def _major_key(row: dict) -> tuple:
+    return _nk(row["compRank"]), _nk(row["college"]), row["tie"]
+
+
+def encode_cursor(row: dict) -> str:
+    raw = orjson.dumps([row["college"], row["major"], row["compRank"], row["tie"]])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """解析游标；格式错误时抛出 ValueError。"""
+    try:
+        college, major, comp_rank, tie = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+    if not (isinstance(college, (str, type(None))) and isinstance(major, (str, type(None)))
+            and isinstance(comp_rank, (int, type(None))) and isinstance(tie, int)):
+        raise ValueError(f"无效的游标: {cursor}")
+    return {"college": college, "major": major, "compRank": comp_rank, "tie": tie}
+
+
+class RecYearView:
+    def __init__(self, rows: Sequence[dict], summarize: Callable[[Filter, List[dict]], dict]):
+        """rows 为合并后的行（列表项字段 + 学生班级 / 年级），各进程共用同一份有序列表；
+        summarize(筛选条件, 该条件下按展示顺序排列的行) 返回汇总 dict。"""
+        # tie：行的位置，同名次时的排序依据（也写入游标）
+        self.rows = [dict(r, tie=i) for i, r in enumerate(rows)]
+        self.items = [{k: r[k] for k in ITEM_FIELDS} for r in self.rows]
+
+        self.grouped = sorted(range(len(self.rows)), key=lambda i: _grouped_key(self.rows[i]))
+        self.grouped_keys = [_grouped_key(self.rows[i]) for i in self.grouped]
+        self.college_ranges: Dict[Optional[str], Tuple[int, int]] = {}
+        self.group_ranges: Dict[Filter, Tuple[int, int]] = {}
+        for p, i in enumerate(self.grouped):
+            row = self.rows[i]
+            for ranges, key in ((self.college_ranges, row["college"]),
+                                (self.group_ranges, (row["college"], row["major"]))):
+                start = ranges.get(key, (p, p))[0]
+                ranges[key] = (start, p + 1)
+
+        by_major: Dict[Optional[str], List[int]] = {}
+        for i, row in enumerate(self.rows):
+            by_major.setdefault(row["major"], []).append(i)
+        self.by_major = {m: sorted(idx, key=lambda i: _major_key(self.rows[i])) for m, idx in by_major.items()}
+        self.by_major_keys = {m: [_major_key(self.rows[i]) for i in idx] for m, idx in self.by_major.items()}
+
+        filters: List[Filter] = [(None, None)]
+        filters += [(c, None) for c in self.college_ranges]
+        filters += [(None, m) for m in self.by_major]
+        filters += list(self.group_ranges)
+        self.summaries: Dict[Filter, dict] = {}
+        for f in filters:
+            positions, _, key_fn, lo, hi = self._select(*f)
+            self.summaries[f] = summarize(f, [self.rows[positions[p]] for p in range(lo, hi)])
+        self._empty_summary = summarize((None, None), [])
+
+    def nbytes(self) -> int:
+        return 400 * len(self.rows) + 64 * len(self.summaries)
+
+    def _select(self, college: Optional[str], major: Optional[str]):
+        """返回 (展示顺序的行下标, 对应排序键, 排序键函数, 起, 止)。"""
+        if major and not college:
+            positions = self.by_major.get(major, [])
+            return positions, self.by_major_keys.get(major, []), _major_key, 0, len(positions)
+        if major:
+            lo, hi = self.group_ranges.get((college, major), (0, 0))
+        elif college:
+            lo, hi = self.college_ranges.get(college, (0, 0))
+        else:
+            lo, hi = 0, len(self.grouped)
+        return self.grouped, self.grouped_keys, _grouped_key, lo, hi
+
+    def summary(self, college: Optional[str], major: Optional[str]) -> dict:
+        return self.summaries.get((college or None, major or None), self._empty_summary)
+
+    def page(self, college: Optional[str], major: Optional[str], page: int, page_size: int,
+             cursor: Optional[str] = None) -> Tuple[List[dict], int, Optional[str]]:
+        """返回 (当页列表项, 总数, 下一页游标)。给出 cursor 时忽略 page。"""
+        positions, keys, key_fn, lo, hi = self._select(college or None, major or None)
+        if cursor:
+            start = bisect_right(keys, key_fn(decode_cursor(cursor)), lo, hi)
+        else:
+            start = min(lo + (page - 1) * page_size, hi)
+        end = min(start + page_size, hi)
+        items = [self.items[positions[p]] for p in range(start, end)]
+        next_cursor = encode_cursor(self.rows[positions[end - 1]]) if start < end < hi else None
+        return items, hi - lo, next_cursor
+
+
+def get_cached(year: int) -> Optional[RecYearView]:
+    view = _cache.get(f"rec_view:{year}")
+    return None if view is MISS else view
+
+
+def put(year: int, view: RecYearView, ttl: int):
+    _cache.set(f"rec_view:{year}", view, ttl, view.nbytes())
+
+
+def clear():
+    _cache.clear()
+
+
+def discard(keys: Iterable[str]):
+    """丢弃指定 key 的进程内副本（定向失效时调用）。"""
+    for key in keys:
+        _cache.delete(key)
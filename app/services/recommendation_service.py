@@ -1,26 +1,34 @@
-from typing import List, Optional, Dict
+from collections import Counter
+from typing import List, Optional
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
-from app.models.models import Recommendation, Student
+from sqlalchemy import distinct
+from app.models.models import Recommendation
 from app.utils.class_utils import get_major_code
-from app.db.redis import cache_get, cache_set, make_hash_key
+from app.db.redis import cache_get_or_load, make_hash_key
+from app.services import cache_tags, cohort_stats, rec_view
+from app.services.rec_view import Filter, RecYearView
+from app.services.repositories import StudentRepository
 from app.schemas.dtos import (
-    RecFilterDTO, RecOptionsDTO, RecItemDTO,
+    RecFilterDTO, RecOptionsDTO,
     RecSummaryDTO, RecListResponseDTO,
 )
 
-REC_OPTIONS_TTL = 21600  # 6小时
-REC_LIST_TTL = 21600     # 6小时
+# 导入推免名单后按 rec_year 标签、重算绩点后按 major 标签失效，TTL 只作兜底
+REC_OPTIONS_TTL = 3 * 86400
+REC_LIST_TTL = 3 * 86400
 
 
 class RecommendationService:
     @staticmethod
     def get_options(db: Session, year: Optional[int], college: Optional[str]) -> RecOptionsDTO:
         key = make_hash_key("rec_opts", year=year, college=college)
-        cached = cache_get(key)
-        if cached is not None:
-            return RecOptionsDTO(**cached)
+        cached = cache_get_or_load(key, lambda: RecommendationService._query_options(db, year, college), REC_OPTIONS_TTL,
+                                   [cache_tags.rec_year(year)])
+        return RecOptionsDTO(**cached)
 
+    @staticmethod
+    def _query_options(db: Session, year: Optional[int], college: Optional[str]) -> dict:
         years = [r[0] for r in db.query(distinct(Recommendation.year)).order_by(Recommendation.year.desc()).all()]
 
         q = db.query(distinct(Recommendation.college)).order_by(Recommendation.college)
@@ -35,123 +43,117 @@ class RecommendationService:
             q = q.filter(Recommendation.college == college)
         majors = [r[0] for r in q.all()]
 
-        result = RecOptionsDTO(years=years, colleges=colleges, majors=majors)
-        cache_set(key, result.model_dump(), REC_OPTIONS_TTL)
-        return result
+        return RecOptionsDTO(years=years, colleges=colleges, majors=majors).model_dump()
+
+    @staticmethod
+    def get_view(db: Session, year: int) -> RecYearView:
+        """某年份的推免名单视图。Redis 中每年只存一份合并后的行，进程内缓存构建好的视图。"""
+        view = rec_view.get_cached(year)
+        if view is not None:
+            return view
+        rows = cache_get_or_load(f"rec_view:{year}", lambda: RecommendationService._load_view_rows(db, year), REC_LIST_TTL,
+                                 RecommendationService._view_tags(year))
+        view = RecYearView(rows, lambda f, group: RecommendationService._summarize(db, f, group))
+        rec_view.put(year, view, REC_LIST_TTL)
+        return view
+
+    @staticmethod
+    def _view_tags(year: int):
+        """年份，以及名单中学生所在的专业（最新绩点与排名随重算变化）。"""
+        def tags(rows: List[dict]) -> List[str]:
+            majors = {get_major_code(r["sClass"]) for r in rows if r["sClass"]}
+            return [cache_tags.rec_year(year)] + [cache_tags.major(m) for m in sorted(majors) if m]
+        return tags
 
     @staticmethod
     def query_list(db: Session, f: RecFilterDTO) -> RecListResponseDTO:
-        key = make_hash_key("rec_list",
-            year=f.year, college=f.college, major=f.major,
-            page=f.page, pageSize=f.pageSize)
-        cached = cache_get(key)
-        if cached is not None:
-            return RecListResponseDTO(**cached)
-
-        q = db.query(Recommendation).filter(Recommendation.year == f.year)
-        if f.college:
-            q = q.filter(Recommendation.college == f.college)
-        if f.major:
-            q = q.filter(Recommendation.major == f.major)
-
-        total = q.count()
+        return RecListResponseDTO(**RecommendationService._page(db, f))
+
+    @staticmethod
+    def query_list_json(db: Session, f: RecFilterDTO) -> bytes:
+        """同 query_list，返回序列化好的 JSON 字节。游标无效时抛出 ValueError。"""
+        return orjson.dumps(RecommendationService._page(db, f))
+
+    @staticmethod
+    def _page(db: Session, f: RecFilterDTO) -> dict:
+        view = RecommendationService.get_view(db, f.year)
+        items, total, next_cursor = view.page(f.college, f.major, f.page, f.pageSize, f.cursor)
+        return {
+            "summary": view.summary(f.college, f.major),
+            "list": items,
+            "total": total,
+            "page": f.page,
+            "pageSize": f.pageSize,
+            "nextCursor": next_cursor,
+        }
+
+    @staticmethod
+    def _load_view_rows(db: Session, year: int) -> List[dict]:
+        """推免记录与学生最新绩点、专业绩点排名合并（学生不存在时对应字段为空），按展示顺序排列，
+        行的位置即同名次时的排序依据（见 RecYearView），行中不含学号。
+        学生记录经 get_many_by_ids 批量读取，已缓存的学生不再查询数据库。"""
+        rows = db.query(
+            Recommendation.studentId, Recommendation.college, Recommendation.major,
+            Recommendation.courseGpa, Recommendation.perfScore, Recommendation.compScore,
+            Recommendation.compRank, Recommendation.majorTotal, Recommendation.remark,
+        ).filter(Recommendation.year == year) \
+            .order_by(Recommendation.college, Recommendation.major, Recommendation.compRank,
+                      Recommendation.studentId).all()
+        students = StudentRepository.get_many_by_ids(db, (r.studentId for r in rows))
+        result = []
+        for r in rows:
+            s = students.get(r.studentId)
+            result.append({
+                "college": r.college,
+                "major": r.major,
+                "recGpa": r.courseGpa,
+                "latestGpa": round(s.sGpa, 2) if s is not None and s.sGpa is not None else None,
+                "perfScore": r.perfScore,
+                "compScore": r.compScore,
+                "compRank": r.compRank,
+                "latestGpaRank": s.majorGpaRank if s is not None else None,
+                "remark": r.remark or '',
+                "majorTotal": r.majorTotal,
+                "sClass": s.sClass if s is not None else None,
+                "sGrade": s.sGrade if s is not None else None,
+            })
+        return result
+
+    @staticmethod
+    def _summarize(db: Session, f: Filter, rows: List[dict]) -> dict:
+        """某筛选条件（学院, 专业）的汇总；rows 为该条件下按展示顺序排列的行。"""
+        total = len(rows)
         if total == 0:
-            empty = RecListResponseDTO(
-                summary=RecSummaryDTO(recommended=0),
-                list=[], total=0, page=f.page, pageSize=f.pageSize,
-            )
-            cache_set(key, empty.model_dump(), REC_LIST_TTL)
-            return empty
-
-        if f.major:
-            q = q.order_by(Recommendation.compRank)
-        else:
-            q = q.order_by(Recommendation.college, Recommendation.major, Recommendation.compRank)
-
-        # 分页
-        offset = (f.page - 1) * f.pageSize
-        recs: List[Recommendation] = q.offset(offset).limit(f.pageSize).all()
-
-        # 批量获取学生信息（绩点和排名）
-        sids = [r.studentId for r in recs]
-        stu_map: Dict[str, Student] = {}
-        for i in range(0, len(sids), 500):
-            batch = sids[i:i + 500]
-            students = db.query(Student).filter(Student.studentId.in_(batch)).all()
-            for s in students:
-                stu_map[s.studentId] = s
-
-        # 构建列表项
-        items: List[RecItemDTO] = []
-        for r in recs:
-            stu = stu_map.get(r.studentId)
-            items.append(RecItemDTO(
-                college=r.college,
-                major=r.major,
-                recGpa=r.courseGpa,
-                latestGpa=round(stu.sGpa, 2) if stu and stu.sGpa is not None else None,
-                perfScore=r.perfScore,
-                compScore=r.compScore,
-                compRank=r.compRank,
-                latestGpaRank=stu.majorGpaRank if stu else None,
-                remark=r.remark or '',
-            ))
-
-        # 汇总统计（基于总数，非当前页）
-        major_total = RecommendationService._calc_major_total(db, f, recs, stu_map)
+            return RecSummaryDTO(recommended=0).model_dump()
+
+        major_total = RecommendationService._calc_major_total(db, f, rows)
         rate = None
         if major_total is not None and major_total > 0:
             rate = f"{(total / major_total * 100):.1f}%"
-
-        result = RecListResponseDTO(
-            summary=RecSummaryDTO(
-                recommended=total,
-                majorTotal=major_total,
-                rate=rate,
-            ),
-            list=items,
-            total=total,
-            page=f.page,
-            pageSize=f.pageSize,
-        )
-        cache_set(key, result.model_dump(), REC_LIST_TTL)
-        return result
+        return RecSummaryDTO(recommended=total, majorTotal=major_total, rate=rate).model_dump()
 
     @staticmethod
-    def _calc_major_total(db: Session, f: RecFilterDTO, recs: List[Recommendation],
-                          stu_map: Dict[str, Student]) -> Optional[int]:
+    def _calc_major_total(db: Session, f: Filter, rows: List[dict]) -> Optional[int]:
         """计算筛选条件下的专业总人数。
-        通过 s_class 前缀（专业代码）识别专业，与项目约定一致。"""
+        通过 s_class 前缀（专业代码）识别专业，与项目约定一致；人数取自群体统计。"""
+        college, major = f
         # 指定了专业且 major_total 可用时，直接使用
-        if f.major:
-            mt = recs[0].majorTotal if recs and recs[0].majorTotal is not None else None
+        if major:
+            mt = rows[0]["majorTotal"]
             if mt is not None:
                 return mt
             # 回退：从学生信息中提取专业代码，按 s_class 前缀统计
-            major_code = None
-            for r in recs:
-                stu = stu_map.get(r.studentId)
-                if stu and stu.sClass:
-                    major_code = get_major_code(stu.sClass)
-                    break
+            major_code = next((get_major_code(r["sClass"]) for r in rows if r["sClass"]), None)
             if major_code:
-                count = db.query(func.count(Student.studentId)).filter(
-                    Student.sClass.like(f"{major_code}%")
-                ).scalar()
+                count = cohort_stats.get(db).major(major_code)["count"]
                 return count if count else None
             return None
 
-        # 仅选了学院或年份时：按年级从 student 表统计
-        grade = None
-        for stu in stu_map.values():
-            if stu.sGrade:
-                grade = stu.sGrade
-                break
+        # 仅选了学院或年份时：按年级从 student 表统计（取推免学生中人数最多的年级）
+        grades = Counter(r["sGrade"] for r in rows if r["sGrade"])
+        grade = grades.most_common(1)[0][0] if grades else None
         if grade:
-            q = db.query(func.count(Student.studentId)).filter(Student.sGrade == grade)
-            if f.college:
-                q = q.filter(Student.sCollege == f.college)
-            count = q.scalar()
+            count = cohort_stats.get(db).grade(grade, college)["count"]
             return count if count else None
 
         return None
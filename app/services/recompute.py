@@ -0,0 +1,225 @@
+"""
+学生均分 / 绩点与班级、专业排名重算（命令行入口见 app/cli/recompute.py）
+
+计算规则：
+- 每门课程（学号 + 课程名）取各次考试中最高的有效成绩，学分随该次考试；空成绩（缺考）不计
+- 有效成绩：补考（c_pass=1）及格按 MAKEUP_PASS_SCORE 计，正常（0）、重修（2）、刷分（3）按实际成绩
+- 均分按学分加权；单门绩点 = (成绩 - 50) / 10（不及格为 0），同样按学分加权；均四舍五入保留两位，无有效成绩为 NULL
+- 成绩、学分、绩点以 0.01 为单位的定点整数计算，加权和精确、与求和顺序无关：全量与增量（课程编码顺序不同）
+  结果一致，重复执行不会因舍入抖动改写数据
+- 排名：班级内与专业（get_major_code，班级号前 8 位）内降序，并列取最小名次（1,1,3），空值按 0 计，
+  与 MajorRanking 一致；班级号为空（或不足 8 位）的学生对应排名为 NULL
+
+成绩与学生加载为 NumPy 列（字典编码）后，用排序 + 分组归约（lexsort / bincount / maximum.accumulate）计算，
+不逐行执行 Python。增量模式只加载给定专业的学生与成绩：专业排名需要专业内全部学生，
+班级（属于某个专业）排名随之得到。只写回数值有变化的学生，按主键批量 UPDATE，每批单独提交。
+"""
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import or_, select, update
+from app.core.config import settings
+from app.db.redis import bump_cache_generation
+from app.db.session import SessionLocal
+from app.models.models import CourseScore, Student
+from app.services.course_columns import CHUNK_ROWS, Dictionary
+from app.services.ingest_service import IngestService, Touched
+from app.utils.class_utils import get_major_code
+
+logger = logging.getLogger(__name__)
+
+MAKEUP_PASS_SCORE = 60.0
+SCALE = 100  # 定点：成绩 / 学分 / 绩点以 0.01 为单位
+
+# 写回的列（模型属性名），顺序与 Aggregates.values 的行一致
+FIELDS = ("sAvg", "sGpa", "classAvgRank", "classGpaRank", "majorAvgRank", "majorGpaRank")
+
+
+def effective_scores(score: np.ndarray, cpass: np.ndarray) -> np.ndarray:
+    """补考及格按 MAKEUP_PASS_SCORE 计，其余按实际成绩（NaN 保持不变）。"""
+    return np.where(cpass == 1, np.minimum(score, MAKEUP_PASS_SCORE), score)
+
+
+def to_fixed(values: np.ndarray) -> np.ndarray:
+    return np.rint(values * SCALE).astype(np.int64)
+
+
+def course_gpa(score: np.ndarray) -> np.ndarray:
+    """单门绩点（定点）：(成绩 - 50) / 10 四舍五入到 0.01，不及格为 0。"""
+    return np.where(score >= 60 * SCALE, (score - 50 * SCALE + 5) // 10, 0)
+
+
+def weighted_mean(total: np.ndarray, credits: np.ndarray) -> np.ndarray:
+    """定点加权和（单位 0.0001）/ 学分和（单位 0.01），四舍五入到两位；学分和不为正时为 NaN。"""
+    valid = credits > 0
+    safe = np.where(valid, credits, 1)
+    return np.where(valid, (2 * total + safe) // (2 * safe) / SCALE, np.nan)
+
+
+def competition_rank(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """组内降序排名，并列取最小名次（1,1,3）。NaN 按 0 计；groups 为 -1 的行不参与（结果为 0）。"""
+    n = values.size
+    values = np.nan_to_num(values, nan=0.0)
+    order = np.lexsort((-values, groups))
+    g, v = groups[order], values[order]
+    idx = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = g[1:] != g[:-1]
+    new_value = new_group.copy()
+    new_value[1:] |= v[1:] != v[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, idx, 0))
+    value_start = np.maximum.accumulate(np.where(new_value, idx, 0))
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = value_start - group_start + 1
+    ranks[groups < 0] = 0
+    return ranks
+
+
+def _major_filter(majors: Iterable[str]):
+    return or_(*(Student.sClass.like(f"{m}%") for m in majors))
+
+
+class Aggregates:
+    """一批学生的重算结果：values 每行依次为 FIELDS（排名 0 表示 NULL），old 为库中原值。"""
+
+    def __init__(self, sids: List[str], values: np.ndarray, old: np.ndarray, score_rows: int):
+        self.sids = sids
+        self.values = values
+        self.old = old
+        self.score_rows = score_rows
+
+    def changed(self) -> np.ndarray:
+        """数值有变化的学生下标。库中 FLOAT 为单精度，比较时容许微小误差；NaN 与 NaN 视为相同。"""
+        same = np.isclose(self.values, self.old, rtol=0, atol=1e-4, equal_nan=True)
+        return np.flatnonzero(~same.all(axis=0))
+
+    def row(self, i: int) -> Dict[str, Any]:
+        avg, gpa = (None if np.isnan(v) else float(v) for v in self.values[:2, i])
+        ranks = [int(r) or None for r in self.values[2:, i]]
+        return dict(zip(("studentId",) + FIELDS, [self.sids[i], avg, gpa] + ranks))
+
+
+def compute(majors: Optional[Iterable[str]] = None) -> Aggregates:
+    """加载并计算；majors 为空时为全量。"""
+    majors = sorted(set(majors)) if majors is not None else None
+    sids, classes = Dictionary(), Dictionary()
+    klass, old = [], []
+    student_stmt = select(Student.studentId, Student.sClass, *(getattr(Student, f) for f in FIELDS))
+    score_stmt = select(CourseScore.studentId, CourseScore.courseName, CourseScore.score,
+                        CourseScore.cCredit, CourseScore.cPass)
+    if majors is not None:
+        student_stmt = student_stmt.where(_major_filter(majors))
+        score_stmt = score_stmt.join(Student, CourseScore.studentId == Student.studentId) \
+            .where(_major_filter(majors))
+    courses = Dictionary()
+    sid, course, score, credit, cpass = ([] for _ in range(5))
+
+    db = SessionLocal()
+    try:
+        for s_id, s_class, *values in db.execute(student_stmt):
+            sids.encode(s_id)
+            klass.append(-1 if s_class is None else classes.encode(s_class))
+            # 与 values 的表示一致：均分 / 绩点空值为 NaN，排名空值为 0
+            old.append([np.nan if v is None else v for v in values[:2]] + [v or 0 for v in values[2:]])
+        if majors is None or majors:
+            stmt = score_stmt.execution_options(yield_per=CHUNK_ROWS)
+            for chunk in db.execute(stmt).partitions():
+                sid.append(np.fromiter((sids.codes.get(r[0], -1) for r in chunk), np.int64, len(chunk)))
+                course.append(np.fromiter((courses.encode(r[1]) for r in chunk), np.int64, len(chunk)))
+                score.append(np.fromiter((np.nan if r[2] is None else r[2] for r in chunk), np.float64, len(chunk)))
+                credit.append(np.fromiter((0.0 if r[3] is None else r[3] for r in chunk), np.float64, len(chunk)))
+                cpass.append(np.fromiter((-1 if r[4] is None else r[4] for r in chunk), np.int8, len(chunk)))
+    finally:
+        db.close()
+
+    def concat(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+    n = len(sids.values)
+    sid, course = concat(sid, np.int64), concat(course, np.int64)
+    score = effective_scores(concat(score, np.float64), concat(cpass, np.int8))
+    credit = concat(credit, np.float64)
+    score_rows = int(sid.size)
+
+    # 每个 (学号, 课程) 取最高有效成绩：按 (键, 成绩) 排序后取各组最后一行
+    keep = (sid >= 0) & ~np.isnan(score)
+    sid, course, score, credit = sid[keep], course[keep], score[keep], credit[keep]
+    key = sid * max(1, len(courses.values)) + course
+    order = np.lexsort((score, key))
+    key = key[order]
+    last = np.ones(key.size, dtype=bool)
+    last[:-1] = key[1:] != key[:-1]
+    best = order[last]
+    score, credit = to_fixed(score[best]), to_fixed(credit[best])
+    sid = sid[best]
+
+    # 以整数累加（bincount 的 float64 结果在 2^53 以内精确）
+    def total(weights):
+        return np.rint(np.bincount(sid, weights=weights, minlength=n)).astype(np.int64)
+
+    credits = total(credit)
+    avg = weighted_mean(total(score * credit), credits)
+    gpa = weighted_mean(total(course_gpa(score) * credit), credits)
+
+    # 班级码 -> 专业码（班级号不足 8 位为 -1）；末位的 -1 供班级号为空（班级码 -1）的学生取用
+    major_codes = Dictionary()
+    class_major = np.array([major_codes.encode(get_major_code(c)) if get_major_code(c) else -1
+                            for c in classes.values] + [-1], dtype=np.int64)
+    klass = np.array(klass, dtype=np.int64)
+    major = class_major[klass]
+    values = np.vstack([
+        avg, gpa,
+        competition_rank(klass, avg), competition_rank(klass, gpa),
+        competition_rank(major, avg), competition_rank(major, gpa),
+    ]).astype(np.float64)
+    old = np.array(old, dtype=np.float64).T if n else np.empty((len(FIELDS), 0))
+    return Aggregates(sids.values, values, old, score_rows)
+
+
+def write(aggregates: Aggregates, batch: Optional[int] = None) -> List[str]:
+    """写回有变化的学生，返回其学号。"""
+    batch = batch or settings.RECOMPUTE_BATCH_ROWS
+    changed = aggregates.changed()
+    db = SessionLocal()
+    try:
+        for i in range(0, changed.size, batch):
+            db.execute(update(Student), [aggregates.row(int(j)) for j in changed[i:i + batch]])
+            db.commit()
+    finally:
+        db.close()
+    return [aggregates.sids[int(j)] for j in changed]
+
+
+def recompute(majors: Optional[Iterable[str]] = None, invalidate: bool = True) -> Dict[str, Any]:
+    """重算并写回；majors 为空时为全量。返回报告（含有变化的学号）。
+    有变化时失效缓存：全量递增缓存代际，增量按专业定向失效（同数据导入）。"""
+    majors = None if majors is None else sorted(set(majors))
+    start = time.perf_counter()
+    aggregates = compute(majors)
+    computed = time.perf_counter()
+    changed = write(aggregates)
+    done = time.perf_counter()
+    report = {
+        "mode": "full" if majors is None else "incremental",
+        "majors": None if majors is None else len(majors),
+        "students": len(aggregates.sids),
+        "score_rows": aggregates.score_rows,
+        "changed": len(changed),
+        "compute_seconds": round(computed - start, 3),
+        "write_seconds": round(done - computed, 3),
+        "rows_per_second": round(aggregates.score_rows / (computed - start), 1) if computed > start else 0.0,
+    }
+    logger.info(f"重算完成: {report['students']} 名学生, {report['score_rows']} 行成绩, "
+                f"{report['changed']} 名学生有变化, 计算 {report['compute_seconds']}s, 写回 {report['write_seconds']}s")
+    if invalidate and changed:
+        if majors is None:
+            report["generation"] = bump_cache_generation()
+        else:
+            touched = Touched()
+            touched.sids.update(changed)
+            touched.majors.update(majors)
+            touched.aggregates_changed = True
+            report["invalidation"] = IngestService.invalidate(touched)
+    report["changed_sids"] = changed
+    return report
@@ -1,19 +1,39 @@
 from types import SimpleNamespace
+from collections import namedtuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, and_
 from app.models.models import Student, CourseScore
 from app.schemas.dtos import CourseInfoFilterDTO
 from app.utils.class_utils import get_major_code
-from app.db.redis import cache_get, cache_set, make_hash_key
-from typing import List, Dict, Any, Optional
+from app.db import codecs
+from app.db.redis import cache_get_many, cache_get_or_load, cache_set_many, fetch_data_version, make_hash_key
+from app.services import (
+    cache_tags, cohort_stats, course_columns, course_name_index, facet_index, major_ranking, student_name_index,
+)
+from app.services.major_ranking import MajorRanking
+from app.core import metrics
+from app.core.config import settings
+from typing import Iterable, List, Dict, Any, Optional
 
-STUDENT_TTL = 3600
-SCORES_TTL = 3600
-RANKING_TTL = 3600
-MAJOR_RANKING_TTL = 3600
-COURSE_NAMES_TTL = 21600
-FAIL_RATE_TTL = 3600
-FILTER_OPTIONS_TTL = 3600
+# 均由导入数据派生，导入 / 重算后按标签失效（见 cache_tags），TTL 只作兜底
+STUDENT_TTL = 3 * 86400
+SCORES_TTL = 3 * 86400
+RANKING_TTL = 3 * 86400
+MAJOR_RANKING_TTL = 3 * 86400
+COURSE_NAMES_TTL = 3 * 86400
+FAIL_RATE_TTL = 3 * 86400
+FILTER_OPTIONS_TTL = 3 * 86400
+
+# 批量按学号查询时每条 IN 语句的学号数上限
+_IN_BATCH = 1000
+
+STUDENT_BATCH_ROWS = metrics.Counter("student_batch_rows_total",
+                                     "get_many_by_ids 返回的学生记录数（source: cache / db）", ("source",))
+
+_EMPTY_FAIL_RATE = {
+    "totalStudents": 0, "failStudents": 0,
+    "0-59": 0, "60-69": 0, "70-79": 0, "80-89": 0, "90-100": 0
+}
 
 def _student_to_dict(s: Student) -> dict:
     return {
@@ -27,123 +47,183 @@ def _student_to_dict(s: Student) -> dict:
 def _dict_to_student_ns(d: dict) -> SimpleNamespace:
     return SimpleNamespace(**d)
 
-def _course_to_dict(c: CourseScore) -> dict:
-    return {
-        "studentId": c.studentId, "cTerm": c.cTerm, "courseName": c.courseName,
-        "score": c.score, "cType": c.cType, "cHours": c.cHours,
-        "cCredit": c.cCredit, "cPass": c.cPass,
-    }
+# 成绩行：缓存 scores:<学号> 按列式编码存储，命中时直接解码为 ScoreRow（见 codecs.Rows）
+ScoreRow = namedtuple("ScoreRow", ["studentId", "cTerm", "courseName", "score", "cType", "cHours", "cCredit", "cPass"])
+codecs.register("scores", codecs.Rows(ScoreRow))
+
+def _course_to_row(c: CourseScore) -> ScoreRow:
+    return ScoreRow(c.studentId, c.cTerm, c.courseName, c.score, c.cType, c.cHours, c.cCredit, c.cPass)
 
 class StudentRepository:
     @staticmethod
     def get_by_id(db: Session, student_id: str) -> Optional[Any]:
-        key = f"student:{student_id}"
-        cached = cache_get(key)
-        if cached is not None:
-            return _dict_to_student_ns(cached)
-        student = db.query(Student).filter(Student.studentId == student_id).first()
-        if student:
-            cache_set(key, _student_to_dict(student), STUDENT_TTL)
-        return student
+        def load():
+            student = db.query(Student).filter(Student.studentId == student_id).first()
+            return _student_to_dict(student) if student else None
+
+        cached = cache_get_or_load(f"student:{student_id}", load, STUDENT_TTL,
+                                   lambda d: cache_tags.of_student(student_id, d["sClass"]))
+        return _dict_to_student_ns(cached) if cached is not None else None
 
     @staticmethod
-    def get_ranking(db: Session, student_id: str, scope: str = 'class') -> Dict[str, int]:
-        """从数据库获取预计算的排名和总人数。"""
-        key = f"rank:{student_id}:{scope}"
-        cached = cache_get(key)
-        if cached is not None:
-            return cached
-
-        student = db.query(Student).filter(Student.studentId == student_id).first()
-        if not student:
-            return {"avg_rank": 0, "gpa_rank": 0, "total": 0}
-            
-        if scope == 'class':
-            total = db.query(func.count(Student.studentId)).filter(Student.sClass == student.sClass).scalar()
-            result = {
-                "avg_rank": student.classAvgRank or 0, 
-                "gpa_rank": student.classGpaRank or 0,
-                "total": total or 0
-            }
-        else:
-            major_code = get_major_code(student.sClass)
-            total = db.query(func.count(Student.studentId)).filter(Student.sClass.like(f"{major_code}%")).scalar()
-            result = {
-                "avg_rank": student.majorAvgRank or 0, 
-                "gpa_rank": student.majorGpaRank or 0,
-                "total": total or 0
+    def get_many_by_ids(db: Session, student_ids: Iterable[str]) -> Dict[str, Any]:
+        """批量获取学生记录（学号 -> 记录，不存在的学号不在结果中），与 get_by_id 共用 student:<学号> 缓存：
+        一次 MGET 取已缓存的，未命中的以 IN 查询一次取回（每 _IN_BATCH 个学号一条语句），再以一个 pipeline 回填。"""
+        student_ids = list(dict.fromkeys(student_ids))
+        cached = cache_get_many([f"student:{sid}" for sid in student_ids])
+        found = {sid: d for sid, d in zip(student_ids, cached) if d is not None}
+        missing = [sid for sid in student_ids if sid not in found]
+        version = fetch_data_version() if missing else None
+        loaded = {}
+        for i in range(0, len(missing), _IN_BATCH):
+            for student in db.query(Student).filter(Student.studentId.in_(missing[i:i + _IN_BATCH])):
+                loaded[student.studentId] = _student_to_dict(student)
+        cache_set_many({f"student:{sid}": d for sid, d in loaded.items()}, STUDENT_TTL,
+                       lambda d: cache_tags.of_student(d["studentId"], d["sClass"]), version)
+        if metrics.enabled():
+            STUDENT_BATCH_ROWS.inc("cache", amount=len(found))
+            STUDENT_BATCH_ROWS.inc("db", amount=len(loaded))
+        found.update(loaded)
+        return {sid: _dict_to_student_ns(d) for sid, d in found.items()}
+
+    @staticmethod
+    def get_ranking(db: Session, student_id: str, scope: str = 'class', student: Optional[Any] = None) -> Dict[str, int]:
+        """获取预计算的排名，总人数取自群体统计。已取得学生记录时可通过 student 传入，避免重复查询。"""
+        tags = []  # 加载时填入，写缓存时读取
+
+        def load():
+            s = student if student is not None else db.query(Student).filter(Student.studentId == student_id).first()
+            if not s:
+                return None
+            tags.extend(cache_tags.of_student(student_id, s.sClass))
+
+            stats = cohort_stats.get(db)
+            if scope == 'class':
+                return {
+                    "avg_rank": s.classAvgRank or 0,
+                    "gpa_rank": s.classGpaRank or 0,
+                    "total": stats.klass(s.sClass)["count"]
+                }
+            return {
+                "avg_rank": s.majorAvgRank or 0,
+                "gpa_rank": s.majorGpaRank or 0,
+                "total": stats.major(get_major_code(s.sClass))["count"]
             }
-        cache_set(key, result, RANKING_TTL)
-        return result
+
+        result = cache_get_or_load(f"rank:{student_id}:{scope}", load, RANKING_TTL, tags)
+        return result if result is not None else {"avg_rank": 0, "gpa_rank": 0, "total": 0}
 
     @staticmethod
-    def get_by_pinyin(db: Session, pinyin: str) -> List[Student]:
+    def get_by_pinyin(db: Session, pinyin: str) -> List[Any]:
+        entries = student_name_index.exact("py", pinyin)
+        if entries is not None:
+            return [SimpleNamespace(studentId=sid, sMajor=major) for sid, major in entries]
         return db.query(Student).filter(Student.sPy == pinyin).order_by(Student.studentId).all()
     
     @staticmethod
-    def get_by_name(db: Session, name: str) -> List[Student]:
+    def get_by_name(db: Session, name: str) -> List[Any]:
+        entries = student_name_index.exact("name", name)
+        if entries is not None:
+            return [SimpleNamespace(studentId=sid, sMajor=major) for sid, major in entries]
         return db.query(Student).filter(Student.sName == name).order_by(Student.studentId).all()
+
+    @staticmethod
+    def suggest(db: Session, query: str, limit: int) -> List[Any]:
+        """按姓名 / 全拼 / 拼音首字母前缀补全。索引未加载时回退为姓名或全拼的 LIKE 前缀查询（不含首字母）。"""
+        entries = student_name_index.suggest(query, limit)
+        if entries is not None:
+            return [SimpleNamespace(studentId=sid, sMajor=major) for sid, major in entries]
+        column = Student.sName if not query.isascii() else Student.sPy
+        safe = query.replace('%', '\\%').replace('_', '\\_')
+        return db.query(Student).filter(column.like(f"{safe}%")) \
+            .order_by(column, Student.studentId).limit(limit).all()
     
     @staticmethod
-    def get_major_ranking(db: Session, major_code: str, sort_by: str = 'gpa', order: str = 'desc') -> List[Any]:
-        """获取专业内所有学生，按绩点或均分排序。
-        major_code 为 s_class 前 8 位。"""
-        key = f"major_ranking:{major_code}:{sort_by}:{order}"
-        cached = cache_get(key)
-        if cached is not None:
-            return [_dict_to_student_ns(d) for d in cached]
-
-        query = db.query(Student).filter(Student.sClass.like(f"{major_code}%"))
-        
-        if sort_by == 'gpa':
-            sort_column = Student.sGpa
-        else:
-            sort_column = Student.sAvg
-            
-        if order == 'desc':
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-        
-        students = query.all()
-        cache_set(key, [_student_to_dict(s) for s in students], MAJOR_RANKING_TTL)
-        return students
+    def get_major_ranking(db: Session, major_code: str) -> MajorRanking:
+        """获取专业排名结构（major_code 为 s_class 前 8 位）。
+        Redis 中每个专业只存一份 (学号, 绩点, 均分) 列数据，进程内缓存构建好的排名结构。"""
+        ranking = major_ranking.get_cached(major_code)
+        if ranking is not None:
+            return ranking
+
+        def load():
+            rows = db.query(Student.studentId, Student.sGpa, Student.sAvg) \
+                .filter(Student.sClass.like(f"{major_code}%")).all()
+            return {
+                "sid": [r[0] for r in rows],
+                "gpa": [r[1] for r in rows],
+                "avg": [r[2] for r in rows],
+            }
+
+        cached = cache_get_or_load(f"major_ranking:{major_code}", load, MAJOR_RANKING_TTL,
+                                   [cache_tags.major(major_code)])
+        return StudentRepository._put_major_ranking(major_code, cached)
+
+    @staticmethod
+    def _put_major_ranking(major_code: str, cached: dict) -> MajorRanking:
+        ranking = MajorRanking(cached["sid"], cached["gpa"], cached["avg"])
+        major_ranking.put(major_code, ranking, MAJOR_RANKING_TTL)
+        return ranking
+
+    @staticmethod
+    def get_dashboard_cached(student: Any) -> Dict[str, Any]:
+        """学生首页各部分的缓存（成绩、班级 / 专业排名、专业排名结构）以一次 MGET 读取，
+        返回命中的部分（scores / class_rank / major_rank），未命中的由调用方按原接口加载。
+        命中的专业排名直接放入进程内缓存，随后的 get_major_ranking 不再访问 Redis。"""
+        sid = student.studentId
+        keys = {"scores": f"scores:{sid}", "class_rank": f"rank:{sid}:class", "major_rank": f"rank:{sid}:major"}
+        major_code = get_major_code(student.sClass)
+        if major_code and major_ranking.get_cached(major_code) is None:
+            keys["major_ranking"] = f"major_ranking:{major_code}"
+        found = {name: value for name, value in zip(keys, cache_get_many(list(keys.values())))
+                 if value is not None}
+        if "major_ranking" in found:
+            StudentRepository._put_major_ranking(major_code, found.pop("major_ranking"))
+        return found
 
 class CourseScoreRepository:
     @staticmethod
     def get_by_student_id(db: Session, student_id: str) -> List[Any]:
-        key = f"scores:{student_id}"
-        cached = cache_get(key)
-        if cached is not None:
-            return [SimpleNamespace(**d) for d in cached]
-        scores = db.query(CourseScore).filter(CourseScore.studentId == student_id).all()
-        if scores:
-            cache_set(key, [_course_to_dict(c) for c in scores], SCORES_TTL)
-        return scores
+        def load():
+            scores = db.query(CourseScore).filter(CourseScore.studentId == student_id).all()
+            return [_course_to_row(c) for c in scores] or None
+
+        return cache_get_or_load(f"scores:{student_id}", load, SCORES_TTL, [cache_tags.sid(student_id)]) or []
     
     @staticmethod
     def get_course_names(db: Session, course_name: str) -> List[str]:
-        key = f"course_names:{course_name}"
-        cached = cache_get(key)
-        if cached is not None:
-            return cached
-        query = db.query(CourseScore.courseName).distinct()
-        if course_name:
-            safe_name = course_name.replace('%', '\\%').replace('_', '\\_')
-            query = query.filter(CourseScore.courseName.like(f"%{safe_name}%"))
-        names = [row[0] for row in query.order_by(CourseScore.courseName).all()]
-        cache_set(key, names, COURSE_NAMES_TTL)
-        return names
+        names = course_name_index.search(course_name)
+        if names is not None:
+            return names
+
+        def load():
+            query = db.query(CourseScore.courseName).distinct()
+            if course_name:
+                safe_name = course_name.replace('%', '\\%').replace('_', '\\_')
+                query = query.filter(CourseScore.courseName.like(f"%{safe_name}%"))
+            names = [row[0] for row in query.order_by(CourseScore.courseName).all()]
+            if course_name:
+                names = course_name_index.rank_names(names, course_name, settings.COURSE_NAME_TOP_K)
+            return names
+
+        return cache_get_or_load(f"course_names:{course_name}", load, COURSE_NAMES_TTL, [cache_tags.COURSE_CATALOG])
 
     @staticmethod
     def get_fail_rate_statis(db: Session, filter_dto: CourseInfoFilterDTO) -> Dict[str, Any]:
+        # 列式数据集已加载时直接内存计算，无需 SQL 与缓存
+        columns = course_columns.get()
+        if columns is not None:
+            return columns.fail_rate(filter_dto)
+
         key = make_hash_key("fail_rate",
             courseName=filter_dto.courseName, terms=filter_dto.terms,
             colleges=filter_dto.colleges, majors=filter_dto.majors, classes=filter_dto.classes)
-        cached = cache_get(key)
-        if cached is not None:
-            return cached
+        result = cache_get_or_load(key, lambda: CourseScoreRepository._query_fail_rate(db, filter_dto), FAIL_RATE_TTL,
+                                   [cache_tags.course(filter_dto.courseName)])
+        return result if result is not None else dict(_EMPTY_FAIL_RATE)
 
+    @staticmethod
+    def _query_fail_rate(db: Session, filter_dto: CourseInfoFilterDTO) -> Optional[Dict[str, int]]:
         subq = db.query(
             CourseScore.studentId,
             CourseScore.courseName,
@@ -176,57 +256,32 @@ class CourseScoreRepository:
         ).first()
         
         if not stats or stats.totalStudents == 0:
-            return {
-                "totalStudents": 0, "failStudents": 0,
-                "0-59": 0, "60-69": 0, "70-79": 0, "80-89": 0, "90-100": 0
-            }
-            
-        result = {k: int(v) for k, v in zip(stats._fields, stats)}
-        cache_set(key, result, FAIL_RATE_TTL)
-        return result
+            return None
+
+        return {k: int(v) for k, v in zip(stats._fields, stats)}
 
     @staticmethod
-    def get_available_options(db: Session, filter_dto: CourseInfoFilterDTO, field: str) -> List[str]:
-        """动态获取可用的筛选选项。
-        field 可选值: 'c_term', 's_college', 's_major', 's_class'。"""
-        key = make_hash_key(f"filter_opts:{field}",
-            courseName=filter_dto.courseName, terms=filter_dto.terms,
-            colleges=filter_dto.colleges, majors=filter_dto.majors, classes=filter_dto.classes)
-        cached = cache_get(key)
-        if cached is not None:
-            return cached
-        field_mapping = {
-            'c_term': (CourseScore, 'cTerm'),
-            's_college': (Student, 'sCollege'),
-            's_major': (Student, 'sMajor'),
-            's_class': (Student, 'sClass'),
-        }
-        
-        if field not in field_mapping:
-            return []
-        
-        model_class, attr_name = field_mapping[field]
-        model_attr = getattr(model_class, attr_name)
-        
-        query = db.query(model_attr).distinct()
-        query = query.join(CourseScore, CourseScore.studentId == Student.studentId) if model_class == Student else query.join(Student, CourseScore.studentId == Student.studentId)
-        
-        if filter_dto.courseName:
-            query = query.filter(CourseScore.courseName == filter_dto.courseName)
-        if field != 'c_term' and filter_dto.terms:
-            query = query.filter(CourseScore.cTerm.in_(filter_dto.terms))
-        if field != 's_college' and filter_dto.colleges:
-            query = query.filter(Student.sCollege.in_(filter_dto.colleges))
-        if field != 's_major' and filter_dto.majors:
-            query = query.filter(Student.sMajor.in_(filter_dto.majors))
-        if field != 's_class' and filter_dto.classes:
-            query = query.filter(Student.sClass.in_(filter_dto.classes))
-            
-        query = query.filter(Student.studentId.isnot(None))
-        if model_class == Student:
-            query = query.filter(model_attr.isnot(None), model_attr != '')
-            
-        options = [row[0] for row in query.order_by(model_attr).all()]
-        cache_set(key, options, FILTER_OPTIONS_TTL)
-        return options
+    def get_facet_rows(db: Session, course_name: Optional[str]) -> List[list]:
+        """某门课程（为空则全部课程）去重后的 (学期, 学院, 专业, 班级) 组合，按课程缓存。"""
+        columns = course_columns.get()
+        if columns is not None:
+            return columns.facet_rows(course_name)
 
+        def load():
+            query = db.query(CourseScore.cTerm, Student.sCollege, Student.sMajor, Student.sClass).distinct() \
+                .join(Student, CourseScore.studentId == Student.studentId)
+            if course_name:
+                query = query.filter(CourseScore.courseName == course_name)
+            return [list(row) for row in query.all()]
+
+        return cache_get_or_load(f"course_facets:{course_name or ''}", load, FILTER_OPTIONS_TTL,
+                                 [cache_tags.course(course_name)])
+
+    @staticmethod
+    def get_filter_options(db: Session, filter_dto: CourseInfoFilterDTO) -> Dict[str, List[str]]:
+        """一次计算学期、学院、专业、班级四个分面的可选项（每个分面忽略自身的已选值）。"""
+        index = facet_index.get_cached(filter_dto.courseName)
+        if index is None:
+            index = facet_index.CourseFacetIndex(CourseScoreRepository.get_facet_rows(db, filter_dto.courseName))
+            facet_index.put(filter_dto.courseName, index)
+        return index.options(filter_dto)
@@ -0,0 +1,143 @@
+"""
+学生姓名索引（/stu/query/py、/stu/query/name 与 /stu/query/suggest）
+
+对全部学生按三种键建立有序倒排表，键 -> 学生下标列表（学生按学号排序，下标顺序即学号顺序）：
+- name：姓名
+- py：全拼（取自 student.s_py）
+- initials：拼音首字母（由姓名经 pypinyin 转换；多音字取各读音组合，最多 MAX_INITIAL_VARIANTS 种）
+
+键统一去掉尾部空格并转小写（与 MySQL 默认排序规则下的等值比较一致）。
+精确查找直接取倒排表；前缀查找在有序键数组上二分定位，按键的字典序依次取出，凑够上限即停止，
+单次查询只与返回条数有关。数据导入后随缓存代际变化重建。
+"""
+import time
+import logging
+from bisect import bisect_left
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from pypinyin import Style, pinyin
+from sqlalchemy import select
+from app.db.session import read_session
+from app.models.models import Student
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_INITIAL_VARIANTS = 8
+
+Entry = Tuple[str, Optional[str]]
+
+
+def normalize(key: Optional[str]) -> str:
+    return (key or "").rstrip().lower()
+
+
+def initials_of(name: Optional[str]) -> List[str]:
+    """姓名的拼音首字母；非汉字原样保留，多音字展开为各读音组合。"""
+    name = normalize(name)
+    if not name:
+        return []
+    letters = pinyin(name, style=Style.FIRST_LETTER, heteronym=True, errors="default")
+    variants = []
+    for combo in product(*(dict.fromkeys(c.lower() for c in choices) for choices in letters)):
+        variants.append("".join(combo))
+        if len(variants) >= MAX_INITIAL_VARIANTS:
+            break
+    return variants
+
+
+class _KeyIndex:
+    def __init__(self, pairs: Iterable[Tuple[str, int]]):
+        postings: Dict[str, List[int]] = {}
+        for key, i in pairs:
+            if key:
+                ids = postings.setdefault(key, [])
+                if not ids or ids[-1] != i:
+                    ids.append(i)
+        self.postings = postings
+        self.keys = sorted(postings)
+
+    def exact(self, key: str) -> List[int]:
+        return self.postings.get(key, [])
+
+    def prefix(self, prefix: str, limit: int) -> List[int]:
+        # 多音字的多个首字母组合可能同时匹配同一前缀，需去重
+        result: Dict[int, None] = {}
+        for p in range(bisect_left(self.keys, prefix), len(self.keys)):
+            key = self.keys[p]
+            if not key.startswith(prefix):
+                break
+            for i in self.postings[key]:
+                result[i] = None
+                if len(result) >= limit:
+                    return list(result)
+        return list(result)
+
+
+class StudentNameIndex:
+    def __init__(self, rows: Sequence[Tuple[str, Optional[str], Optional[str], Optional[str]]]):
+        """rows 为 (学号, 姓名, 全拼, 专业)。"""
+        start = time.perf_counter()
+        rows = sorted(rows, key=lambda r: r[0])
+        majors: Dict[Optional[str], Optional[str]] = {}
+        self.entries: List[Entry] = [(sid, majors.setdefault(major, major)) for sid, _, _, major in rows]
+        self.indexes: Dict[str, _KeyIndex] = {
+            "name": _KeyIndex((normalize(name), i) for i, (_, name, _, _) in enumerate(rows)),
+            "py": _KeyIndex((normalize(py), i) for i, (_, _, py, _) in enumerate(rows)),
+            "initials": _KeyIndex((key, i) for i, (_, name, _, _) in enumerate(rows) for key in initials_of(name)),
+        }
+        self.build_seconds = time.perf_counter() - start
+
+    def exact(self, kind: str, key: str) -> List[Entry]:
+        return [self.entries[i] for i in self.indexes[kind].exact(normalize(key))]
+
+    def suggest(self, query: str, limit: int) -> List[Entry]:
+        """自动补全：含非 ASCII 字符时按姓名前缀；否则依次取全拼前缀、首字母前缀的结果，去重后截断。"""
+        query = normalize(query)
+        if not query:
+            return []
+        kinds = ("name",) if not query.isascii() else ("py", "initials")
+        seen = set()
+        result: List[Entry] = []
+        for kind in kinds:
+            for i in self.indexes[kind].prefix(query, limit):
+                if i not in seen:
+                    seen.add(i)
+                    result.append(self.entries[i])
+                    if len(result) >= limit:
+                        return result
+        return result
+
+
+_current: Optional[StudentNameIndex] = None
+
+
+def get() -> Optional[StudentNameIndex]:
+    return _current
+
+
+def refresh():
+    global _current
+    db = read_session()
+    try:
+        rows = db.execute(select(Student.studentId, Student.sName, Student.sPy, Student.sMajor)).all()
+    finally:
+        db.close()
+    index = StudentNameIndex([tuple(r) for r in rows])
+    _current = index
+    logger.info(f"学生姓名索引已加载: {len(index.entries)} 名学生, 耗时 {index.build_seconds:.3f}s")
+
+
+def exact(kind: str, key: str) -> Optional[List[Entry]]:
+    """索引可用时返回匹配的 (学号, 专业)，否则返回 None。"""
+    index = _current
+    if index is None:
+        return None
+    return index.exact(kind, key)
+
+
+def suggest(query: str, limit: Optional[int] = None) -> Optional[List[Entry]]:
+    index = _current
+    if index is None:
+        return None
+    return index.suggest(query, limit or settings.STUDENT_SUGGEST_TOP_K)
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
-from app.services.repositories import StudentRepository
+import time
+from app.services.repositories import StudentRepository, CourseScoreRepository
 from app.models.models import Student
 from app.schemas.dtos import RankDTO, SameNameDTO, MajorRankItemDTO
+from app.schemas.schemas import ScoreQueryDTO, CourseScoreBase
 from app.utils.class_utils import get_major_code
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple
 
 class StudentService:
     @staticmethod
@@ -11,10 +13,13 @@ class StudentService:
         return StudentRepository.get_by_id(db, student_id)
 
     @staticmethod
-    def get_student_rank(db: Session, student_id: str) -> RankDTO:
-        class_rank = StudentRepository.get_ranking(db, student_id, scope='class')
-        major_rank = StudentRepository.get_ranking(db, student_id, scope='major')
-        
+    def get_student_rank(db: Session, student_id: str, student: Optional['Student'] = None) -> RankDTO:
+        class_rank = StudentRepository.get_ranking(db, student_id, scope='class', student=student)
+        major_rank = StudentRepository.get_ranking(db, student_id, scope='major', student=student)
+        return StudentService._rank_dto(class_rank, major_rank)
+
+    @staticmethod
+    def _rank_dto(class_rank: Dict[str, int], major_rank: Dict[str, int]) -> RankDTO:
         return RankDTO(
             classAvgRank=class_rank['avg_rank'],
             classGpaRank=class_rank['gpa_rank'],
@@ -34,50 +39,76 @@ class StudentService:
         students = StudentRepository.get_by_name(db, name)
         return [SameNameDTO(sId=s.studentId, sMajor=s.sMajor) for s in students]
 
+    @staticmethod
+    def suggest_students(db: Session, query: str, limit: int) -> List[SameNameDTO]:
+        students = StudentRepository.suggest(db, query, limit)
+        return [SameNameDTO(sId=s.studentId, sMajor=s.sMajor) for s in students]
+
     @staticmethod
     def get_major_ranking_list(db: Session, student: 'Student', sort_by: str = 'gpa', order: str = 'desc',
                                page: int = 1, page_size: int = 35):
         """获取学生所在专业的排名列表（分页）。
-        专业由班级号前 8 位确定，返回总数、当前排名和分页数据。"""
+        专业由班级号前 8 位确定，返回总数、当前排名和分页数据；只为当页构造 DTO。"""
         from app.schemas.dtos import MajorRankingResponseDTO
         
         major_code = get_major_code(student.sClass)
         if not major_code:
             return MajorRankingResponseDTO(total=0, currentRank=0, list=[])
         
-        students = StudentRepository.get_major_ranking(db, major_code, sort_by, order)
-        
-        sort_key = (lambda s: s.sGpa or 0.0) if sort_by == 'gpa' else (lambda s: s.sAvg or 0.0)
-        
-        # 计算全部排名（处理并列）
-        ranking_list = []
-        current_rank = 0
-        prev_value = None
-        for idx, s in enumerate(students):
-            value = sort_key(s)
-            if value != prev_value:
-                rank = idx + 1
-                prev_value = value
-            ranking_list.append(MajorRankItemDTO(
-                rank=rank,
-                gpa=s.sGpa or 0.0,
-                avg=s.sAvg or 0.0
-            ))
-            if s.studentId == student.studentId:
-                current_rank = rank
-        
-        # 分页
-        total = len(ranking_list)
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_list = ranking_list[start:end]
-        
+        ranking = StudentRepository.get_major_ranking(db, major_code)
+        page_list = [
+            MajorRankItemDTO(rank=rank, gpa=gpa, avg=avg)
+            for rank, gpa, avg in ranking.page(sort_by, order, page, page_size)
+        ]
+
         return MajorRankingResponseDTO(
-            total=total,
-            currentRank=current_rank,
+            total=ranking.total,
+            currentRank=ranking.rank_of(student.studentId, sort_by, order),
             grade=student.sGrade or '',
             major=student.sMajor or '',
             list=page_list,
             page=page,
             pageSize=page_size,
         )
+
+    @staticmethod
+    def get_dashboard(db: Session, student: 'Student', sort_by: str = 'gpa', order: str = 'desc',
+                      page_size: int = 35) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """学生首页聚合数据：成绩、排名、专业排名第 1 页，复用同一份学生记录。
+        各部分的缓存先以一次 MGET 批量读取（cache），未命中的部分再各自加载；
+        返回 (数据, 各部分耗时秒数)。"""
+        timings = {}
+
+        start = time.perf_counter()
+        cached = StudentRepository.get_dashboard_cached(student)
+        timings["cache"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if "scores" in cached:
+            course_scores = cached["scores"]
+        else:
+            course_scores = CourseScoreRepository.get_by_student_id(db, student.studentId)
+        query_dto = ScoreQueryDTO(
+            avg=student.sAvg,
+            gpa=student.sGpa,
+            dataList=[CourseScoreBase.model_validate(cs) for cs in course_scores]
+        )
+        timings["scores"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rank_dto = StudentService._rank_dto(
+            cached.get("class_rank") or StudentRepository.get_ranking(db, student.studentId, 'class', student),
+            cached.get("major_rank") or StudentRepository.get_ranking(db, student.studentId, 'major', student),
+        )
+        timings["rank"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        major_ranking = StudentService.get_major_ranking_list(db, student, sort_by, order, 1, page_size)
+        timings["majorRanking"] = time.perf_counter() - start
+
+        data = {
+            "queryData": query_dto.model_dump(),
+            "rankData": rank_dto.model_dump(),
+            "majorRanking": major_ranking.model_dump(),
+        }
+        return data, timings
@@ -5,7 +5,8 @@ import logging
 from typing import List
 from sqlalchemy.orm import Session
 from app.services.repositories import CourseScoreRepository
-from app.db.redis import get_redis
+from app.db.redis import current_redis, Script
+from app.core.concurrency import wait
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,101 @@ CHALLENGE_RATE_LIMIT = settings.CHALLENGE_RATE_LIMIT
 CHALLENGE_RATE_WINDOW = 300  # 5分钟
 BAN_COUNT_TTL = 172800  # 48小时
 
+# 以下脚本在 Redis 端原子执行，每个验证步骤只需一次往返
+
+# 出题前检查：封禁中返回 {1, 剩余秒数}；超频返回 {2, 次数}；否则计数并返回 {0, 次数}
+# KEYS: ban_active, challenge_rate  ARGV: 频率窗口, 频率上限
+_CHALLENGE_GATE_SCRIPT = Script("""
+local ban_ttl = redis.call('TTL', KEYS[1])
+if ban_ttl > 0 then
+    return {1, ban_ttl}
+end
+local rate = redis.call('INCR', KEYS[2])
+if rate == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+if rate > tonumber(ARGV[2]) then
+    return {2, rate}
+end
+return {0, rate}
+""")
+
+# 取出题目并结算：检查封禁、比对答案，答错时累计失败次数（达到上限后封禁次数 +1，
+# 冷却时间按 2^(n-1) 倍增长），答对时清除失败计数和封禁记录；验证成功（4 / 6）时同时写入会话。
+# 调用方按预期的 rid 传入 rid 相关的 key；题目记录的 rid 与之不同时不取出题目，返回题目的 rid 供重试
+# KEYS: challenge, ban_active, verify_fail, ban_count, session
+# ARGV: rid, sid, 答案 JSON, 失败上限, 失败计数 TTL, 基础冷却, 封禁次数 TTL, 会话 TTL
+# 返回 {状态, ...}：
+#   0 题目不存在 / 1 rid 不符 {1, 题目 rid} / 2 已封禁 / 3 sid 不符 {3, 题目 sid} / 4 无需答题
+#   5 答错 {5, 课程名, 是否未答, 失败次数, 封禁次数, 冷却秒数} / 6 答对
+_CONSUME_SCRIPT = Script("""
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return {0}
+end
+local ok, challenge = pcall(cjson.decode, raw)
+if not ok or type(challenge) ~= 'table' then
+    redis.call('DEL', KEYS[1])
+    return {0}
+end
+local rid = ARGV[1]
+if type(challenge['rid']) == 'string' and challenge['rid'] ~= '' and challenge['rid'] ~= rid then
+    return {1, challenge['rid']}
+end
+redis.call('DEL', KEYS[1])
+if rid ~= '' and redis.call('EXISTS', KEYS[2]) == 1 then
+    return {2}
+end
+if challenge['sid'] ~= ARGV[2] then
+    return {3, tostring(challenge['sid'])}
+end
+if challenge['verified'] then
+    redis.call('SET', KEYS[5], ARGV[2], 'EX', ARGV[8])
+    return {4}
+end
+
+local function trunc(x)
+    x = tonumber(x)
+    if x == nil then
+        return nil
+    end
+    return x >= 0 and math.floor(x) or math.ceil(x)
+end
+
+local answers = cjson.decode(ARGV[3])
+for _, q in ipairs(challenge['questions']) do
+    local match = nil
+    for _, a in ipairs(answers) do
+        if a['courseName'] == q['courseName'] then
+            match = a
+            break
+        end
+    end
+    if match == nil or trunc(match['score']) ~= trunc(q['score']) then
+        local missing = match == nil and 1 or 0
+        if rid == '' then
+            return {5, q['courseName'], missing, 0, 0, 0}
+        end
+        local count = redis.call('INCR', KEYS[3])
+        redis.call('EXPIRE', KEYS[3], ARGV[5])
+        if count < tonumber(ARGV[4]) then
+            return {5, q['courseName'], missing, count, 0, 0}
+        end
+        local ban_count = redis.call('INCR', KEYS[4])
+        local cooldown = tonumber(ARGV[6]) * 2 ^ (ban_count - 1)
+        redis.call('EXPIRE', KEYS[4], string.format('%d', math.max(tonumber(ARGV[7]), cooldown)))
+        redis.call('SET', KEYS[2], 1, 'EX', string.format('%d', cooldown))
+        redis.call('DEL', KEYS[3])
+        return {5, q['courseName'], missing, count, ban_count, cooldown}
+    end
+end
+if rid ~= '' then
+    redis.call('DEL', KEYS[3], KEYS[4])
+end
+redis.call('SET', KEYS[5], ARGV[2], 'EX', ARGV[8])
+return {6}
+""")
+
 
 class VerifyService:
     @staticmethod
@@ -27,22 +123,17 @@ class VerifyService:
 
     @staticmethod
     def create_challenge(db: Session, sid: str, client_ip: str = "", openid: str = "") -> dict:
-        r = get_redis()
+        r = current_redis()
         rid = VerifyService._rate_id(openid, client_ip)
 
         if rid:
-            ban_key = f"ban_active:{rid}"
-            ban_ttl = r.ttl(ban_key)
-            if ban_ttl and ban_ttl > 0:
-                logger.warning(f"频率限制(封禁): rid={rid} sid={sid} ttl={ban_ttl}")
-                return {"cooldown": True, "ttl": ban_ttl}
-
-            rate_key = f"challenge_rate:{rid}"
-            rate = r.incr(rate_key)
-            if rate == 1:
-                r.expire(rate_key, CHALLENGE_RATE_WINDOW)
-            if rate > CHALLENGE_RATE_LIMIT:
-                logger.warning(f"频率限制(频繁): rid={rid} sid={sid} rate={rate}")
+            status, value = _CHALLENGE_GATE_SCRIPT(r, [f"ban_active:{rid}", f"challenge_rate:{rid}"],
+                                                   [CHALLENGE_RATE_WINDOW, CHALLENGE_RATE_LIMIT])
+            if status == 1:
+                logger.warning(f"频率限制(封禁): rid={rid} sid={sid} ttl={value}")
+                return {"cooldown": True, "ttl": value}
+            if status == 2:
+                logger.warning(f"频率限制(频繁): rid={rid} sid={sid} rate={value}")
                 return {"cooldown": True, "ttl": CHALLENGE_RATE_WINDOW}
 
         courses = CourseScoreRepository.get_by_student_id(db, sid)
@@ -56,21 +147,21 @@ class VerifyService:
             latest_courses = []
 
         if len(latest_courses) < 1:
-            r.set(f"challenge:{token}", json.dumps({
+            wait(r.set(f"challenge:{token}", json.dumps({
                 "sid": sid,
                 "rid": rid,
                 "questions": [],
                 "verified": True
-            }), ex=CHALLENGE_TTL)
+            }), ex=CHALLENGE_TTL))
             return {"token": token, "questions": []}
 
         selected = random.sample(latest_courses, 1)
-        r.set(f"challenge:{token}", json.dumps({
+        wait(r.set(f"challenge:{token}", json.dumps({
             "sid": sid,
             "rid": rid,
             "questions": [{"courseName": c.courseName, "score": c.score} for c in selected],
             "verified": False
-        }), ex=CHALLENGE_TTL)
+        }), ex=CHALLENGE_TTL))
 
         return {
             "token": token,
@@ -78,81 +169,61 @@ class VerifyService:
         }
 
     @staticmethod
-    def _incr_fail(r, rid: str):
-        key = f"verify_fail:{rid}"
-        count = r.incr(key)
-        r.expire(key, FAIL_COUNT_TTL)
-        if int(count) >= FAIL_LIMIT:
-            ban_count_key = f"ban_count:{rid}"
-            ban_count = r.incr(ban_count_key)
-            cooldown = FAIL_BASE_COOLDOWN * (2 ** (int(ban_count) - 1))
-            r.expire(ban_count_key, max(BAN_COUNT_TTL, cooldown))
-            r.set(f"ban_active:{rid}", 1, ex=cooldown)
-            r.delete(key)
-            logger.warning(f"封禁升级: rid={rid} ban_count={ban_count} cooldown={cooldown}s")
+    def _consume(r, token: str, rid: str, sid: str, answers: List[dict], session_token: str) -> list:
+        return _CONSUME_SCRIPT(
+            r,
+            [f"challenge:{token}", f"ban_active:{rid}", f"verify_fail:{rid}", f"ban_count:{rid}",
+             f"session:{session_token}"],
+            [rid, sid, json.dumps(answers), FAIL_LIMIT, FAIL_COUNT_TTL, FAIL_BASE_COOLDOWN, BAN_COUNT_TTL,
+             SESSION_TTL])
 
     @staticmethod
     def verify_and_consume(token: str, sid: str, answers: List[dict], client_ip: str = "", openid: str = ""):
-        r = get_redis()
-        raw = r.get(f"challenge:{token}")
-        if not raw:
+        r = current_redis()
+        # 题目一经取出即删除（无论验证结果），封禁检查、答案比对、失败计数与写入会话在同一次往返中完成。
+        # 失败计数记在出题时的 rid 上：先按请求方 rid 执行，题目属于其他 rid 时（如出题后 IP 变化）
+        # 脚本不取出题目而返回题目的 rid，再按该 rid 执行一次
+        rid = VerifyService._rate_id(openid, client_ip)
+        session_token = str(uuid.uuid4())
+        result = VerifyService._consume(r, token, rid, sid, answers, session_token)
+        if result[0] == 1:
+            rid = result[1]
+            result = VerifyService._consume(r, token, rid, sid, answers, session_token)
+        status = result[0]
+
+        if status in (0, 1):
             logger.info(f"验证失败: token 不存在, sid={sid}")
             return False
-
-        challenge = json.loads(raw)
-        rid = challenge.get("rid") or VerifyService._rate_id(openid, client_ip)
-
-        if rid:
-            if r.exists(f"ban_active:{rid}"):
-                r.delete(f"challenge:{token}")
-                logger.warning(f"验证拒绝(已封禁): rid={rid} sid={sid}")
-                return False
-
-        if challenge["sid"] != sid:
-            r.delete(f"challenge:{token}")
-            logger.warning(f"验证失败: sid 不匹配, 期望={challenge['sid']} 实际={sid} rid={rid}")
+        if status == 2:
+            logger.warning(f"验证拒绝(已封禁): rid={rid} sid={sid}")
             return False
-
-        if challenge["verified"]:
-            r.delete(f"challenge:{token}")
-            session_token = str(uuid.uuid4())
-            r.set(f"session:{session_token}", sid, ex=SESSION_TTL)
+        if status == 3:
+            logger.warning(f"验证失败: sid 不匹配, 期望={result[1]} 实际={sid} rid={rid}")
+            return False
+        if status == 4:
             logger.info(f"验证成功(自动): sid={sid} rid={rid}")
             return session_token
+        if status == 5:
+            course, missing, _, ban_count, cooldown = result[1:]
+            if ban_count:
+                logger.warning(f"封禁升级: rid={rid} ban_count={ban_count} cooldown={cooldown}s")
+            if missing:
+                logger.info(f"验证失败: 未答'{course}', sid={sid} rid={rid}")
+            else:
+                logger.info(f"验证失败: '{course}'成绩错误, sid={sid} rid={rid}")
+            return False
 
-        for q in challenge["questions"]:
-            match = next((a for a in answers if a["courseName"] == q["courseName"]), None)
-            if not match:
-                r.delete(f"challenge:{token}")
-                if rid:
-                    VerifyService._incr_fail(r, rid)
-                logger.info(f"验证失败: 未答'{q['courseName']}', sid={sid} rid={rid}")
-                return False
-            if int(float(match["score"])) != int(q["score"]):
-                r.delete(f"challenge:{token}")
-                if rid:
-                    VerifyService._incr_fail(r, rid)
-                logger.info(f"验证失败: '{q['courseName']}'成绩错误, sid={sid} rid={rid}")
-                return False
-
-        r.delete(f"challenge:{token}")
-
-        # 验证成功，清除失败计数和封禁记录
-        if rid:
-            r.delete(f"verify_fail:{rid}")
-            r.delete(f"ban_count:{rid}")
-        session_token = str(uuid.uuid4())
-        r.set(f"session:{session_token}", sid, ex=SESSION_TTL)
+        # 验证成功（脚本已清除失败计数和封禁记录并写入会话）
         logger.info(f"验证成功: sid={sid} rid={rid}")
         return session_token
 
     @staticmethod
     def validate_session(session_token: str, sid: str) -> bool:
-        r = get_redis()
-        stored_sid = r.get(f"session:{session_token}")
+        r = current_redis()
+        stored_sid = wait(r.get(f"session:{session_token}"))
         if not stored_sid:
             return False
         if stored_sid != sid:
-            r.delete(f"session:{session_token}")
+            wait(r.delete(f"session:{session_token}"))
             return False
         return True
@@ -0,0 +1,146 @@
+"""
+缓存预热：冷启动或数据导入后，在后台按请求路径相同的 key 预先填充热点缓存
+
+预热内容：
+- 群体统计（班级 / 专业 / 年级人数等）
+- 各专业排名（专业代码取自 student.s_class 前 8 位）
+- 推免筛选项（年份 / 学院 / 专业三级）与各年份的推免名单视图
+- 全部课程名，以及选课人数最多的若干课程的筛选项（未启用列式数据集时还包括挂科率）
+
+并发数受 WARMUP_CONCURRENCY 限制（且不超过连接池的一半），每个任务独立占用一个连接，
+不会挤占线上请求的数据库连接。多进程部署时通过 Redis 锁保证同一时间只有一个进程在预热。
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from sqlalchemy import func
+from app.core.config import settings
+from app.db.session import read_session
+from app.db.redis import get_redis, lock_key, acquire_lock, release_lock
+from app.models.models import Student, CourseScore
+from app.schemas.dtos import CourseInfoFilterDTO
+from app.services import cohort_stats
+from app.services.repositories import StudentRepository, CourseScoreRepository
+from app.services.recommendation_service import RecommendationService
+from app.utils.class_utils import get_major_code
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LOCK_NAME = "warmup"
+WARMUP_LOCK_TTL = 1800
+
+Task = Tuple[str, Callable[..., Any], tuple]
+
+
+class WarmupService:
+    _lock = threading.Lock()
+    _thread: threading.Thread = None
+    _status: Dict[str, Any] = {"state": "idle"}
+
+    @staticmethod
+    def status() -> Dict[str, Any]:
+        with WarmupService._lock:
+            return dict(WarmupService._status, timings=dict(WarmupService._status.get("timings", {})))
+
+    @staticmethod
+    def start():
+        """在后台线程启动一次预热；已有预热在运行时忽略。"""
+        if not settings.WARMUP_ENABLED:
+            return
+        with WarmupService._lock:
+            if WarmupService._thread is not None and WarmupService._thread.is_alive():
+                return
+            WarmupService._thread = threading.Thread(target=WarmupService.run, name="cache-warmup", daemon=True)
+            WarmupService._thread.start()
+
+    @staticmethod
+    def _update(**kwargs):
+        with WarmupService._lock:
+            WarmupService._status.update(kwargs)
+
+    @staticmethod
+    def _collect_tasks(db) -> List[Task]:
+        tasks: List[Task] = [("cohort_stats", cohort_stats.get, ())]
+
+        classes = [r[0] for r in db.query(Student.sClass).distinct().all()]
+        for code in sorted({get_major_code(c) for c in classes} - {""}):
+            tasks.append(("major_ranking", StudentRepository.get_major_ranking, (code,)))
+
+        options = RecommendationService.get_options(db, None, None)
+        tasks.append(("rec_options", RecommendationService.get_options, (None, None)))
+        for year in options.years:
+            tasks.append(("rec_options", RecommendationService.get_options, (year, None)))
+            tasks.append(("rec_view", RecommendationService.get_view, (year,)))
+            for college in RecommendationService.get_options(db, year, None).colleges:
+                tasks.append(("rec_options", RecommendationService.get_options, (year, college)))
+
+        tasks.append(("course_names", CourseScoreRepository.get_course_names, ("",)))
+        top_courses = db.query(CourseScore.courseName) \
+            .group_by(CourseScore.courseName) \
+            .order_by(func.count(CourseScore.studentId).desc()) \
+            .limit(settings.WARMUP_TOP_COURSES).all()
+        for (name,) in top_courses:
+            course_filter = CourseInfoFilterDTO(courseName=name)
+            tasks.append(("course_filter", CourseScoreRepository.get_filter_options, (course_filter,)))
+            if not settings.FAIL_RATE_ENGINE_ENABLED:
+                # 列式数据集开启时挂科率在内存中计算，无需预热
+                tasks.append(("fail_rate", CourseScoreRepository.get_fail_rate_statis, (course_filter,)))
+        return tasks
+
+    @staticmethod
+    def _run_task(task: Task) -> Tuple[str, float, bool]:
+        kind, fn, args = task
+        start = time.perf_counter()
+        db = read_session()
+        try:
+            fn(db, *args)
+            ok = True
+        except Exception as e:
+            logger.warning(f"预热任务失败 {kind}{args}: {e}")
+            ok = False
+        finally:
+            db.close()
+        return kind, time.perf_counter() - start, ok
+
+    @staticmethod
+    def run():
+        r = get_redis()
+        # 锁按缓存代际区分：代际更新后旧代际的预热不再阻止新一轮预热
+        key = lock_key(WARMUP_LOCK_NAME)
+        token = acquire_lock(r, key, WARMUP_LOCK_TTL)
+        if token is None:
+            logger.info("其他进程正在预热缓存，跳过")
+            return
+        started = time.time()
+        WarmupService._update(state="collecting", started_at=started, finished_at=None,
+                              total=0, done=0, failed=0, seconds=None, timings={}, error=None)
+        try:
+            db = read_session()
+            try:
+                tasks = WarmupService._collect_tasks(db)
+            finally:
+                db.close()
+            WarmupService._update(state="running", total=len(tasks))
+
+            timings: Dict[str, Dict[str, float]] = {}
+            workers = max(1, min(settings.WARMUP_CONCURRENCY, settings.DB_POOL_SIZE // 2))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+                for kind, seconds, ok in pool.map(WarmupService._run_task, tasks):
+                    t = timings.setdefault(kind, {"count": 0, "seconds": 0.0})
+                    t["count"] += 1
+                    t["seconds"] = round(t["seconds"] + seconds, 3)
+                    with WarmupService._lock:
+                        WarmupService._status["done"] += 1
+                        WarmupService._status["failed"] += 0 if ok else 1
+                        WarmupService._status["timings"] = timings
+
+            WarmupService._update(state="finished", finished_at=time.time(), seconds=round(time.time() - started, 3))
+            logger.info(f"缓存预热完成: {WarmupService.status()}")
+        except Exception as e:
+            WarmupService._update(state="failed", finished_at=time.time(), error=str(e))
+            logger.error(f"缓存预热失败: {e}", exc_info=True)
+        finally:
+            # 预热超过锁的 TTL 时锁可能已被其他进程取得，只释放自己持有的锁
+            release_lock(r, key, token)
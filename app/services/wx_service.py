@@ -1,18 +1,32 @@
 import uuid
 import logging
 import httpx
-from app.db.redis import get_redis
+from app.db.redis import current_redis
+from app.core.concurrency import in_async_context, wait
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 WX_SESSION_TTL = 7200  # 2小时
 
+_async_http: httpx.AsyncClient | None = None
+
+
+def _http_get(url: str, params: dict) -> httpx.Response:
+    """异步模式下复用 AsyncClient，同步模式下使用 httpx.get。"""
+    global _async_http
+    if in_async_context():
+        if _async_http is None:
+            _async_http = httpx.AsyncClient(timeout=5)
+        return wait(_async_http.get(url, params=params))
+    return httpx.get(url, params=params, timeout=5)
+
+
 class WxService:
     @staticmethod
     def login(code: str) -> dict:
         """用 wx.login code 换取 openid，返回 wxToken。"""
-        r = get_redis()
+        r = current_redis()
 
         url = "https://api.weixin.qq.com/sns/jscode2session"
         params = {
@@ -23,7 +37,7 @@ class WxService:
         }
 
         try:
-            resp = httpx.get(url, params=params, timeout=5)
+            resp = _http_get(url, params)
             data = resp.json()
         except Exception as e:
             logger.error(f"微信 API 请求失败: {e}")
@@ -39,7 +53,7 @@ class WxService:
             return {"error": "微信登录失败"}
 
         wx_token = str(uuid.uuid4())
-        r.set(f"wx_session:{wx_token}", openid, ex=WX_SESSION_TTL)
+        wait(r.set(f"wx_session:{wx_token}", openid, ex=WX_SESSION_TTL))
         logger.info(f"微信登录成功: openid={openid[:8]}***")
         return {"wxToken": wx_token}
 
@@ -48,6 +62,6 @@ class WxService:
         """验证 wxToken，返回 openid，无效则返回 None。"""
         if not wx_token:
             return None
-        r = get_redis()
-        openid = r.get(f"wx_session:{wx_token}")
+        r = current_redis()
+        openid = wait(r.get(f"wx_session:{wx_token}"))
         return openid
@@ -0,0 +1,10 @@
+"""
+性能基准脚本（默认使用 .env 中配置的 Redis / 数据库）
+
+- datagen：生成合成数据集（可写入 SQLite 文件）
+- endpoints：全接口冷 / 热缓存基准，可通过 --db-url 与 --redis fake 在本地 SQLite + fakeredis 上运行
+- 其余脚本针对单项优化（验证流程 RTT、缓存击穿、响应构造、指标开销）
+- recompute_check：重算一致性检查（全量 / 增量结果一致、重复执行无变化），失败时退出码为 1
+
+用法: python -m bench.<脚本名> [参数]
+"""
@@ -0,0 +1,160 @@
+"""
+缓存值编码基准：各类大缓存值在 Redis 中的字节数与读取时的解码耗时，对比原先的纯 JSON 存储
+
+- 通过仓库层正常读取一遍（cache_get_or_load 按当前编码 / 压缩配置写入 Redis），再逐个取回存储的字节
+- json：值的 JSON 表示（即原先存储的内容），解码为 orjson.loads，成绩另含原先逐行构造 SimpleNamespace 的开销
+- stored：当前编码（见 app.db.codecs，CACHE_COMPRESSION / CACHE_COMPRESS_MIN_BYTES 可用环境变量覆盖）
+- Redis 支持 MEMORY USAGE 时（--redis local）另外给出两种存储方式的实际内存占用
+
+用法:
+  python -m bench.datagen --db-url sqlite:///bench.db --students 3000 --scores 300000
+  python -m bench.cache_codec --db-url sqlite:///bench.db --students 500
+  CACHE_COMPRESSION=none python -m bench.cache_codec --db-url sqlite:///bench.db
+"""
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+import orjson
+from bench.endpoints import _configure
+
+BENCH_KEY = "bench:cache_codec"
+
+
+def _populate(db, students: int, courses: int, seed: int) -> Dict[str, List[str]]:
+    """经仓库层读取各类数据以写入缓存，返回各类的 key。"""
+    from sqlalchemy import func
+    from app.models.models import CourseScore, Recommendation, Student
+    from app.services import cohort_stats
+    from app.services.recommendation_service import RecommendationService
+    from app.services.repositories import CourseScoreRepository, StudentRepository
+    from app.utils.class_utils import get_major_code
+
+    rnd = random.Random(seed)
+    sids = [r[0] for r in db.query(Student.studentId).all()]
+    sids = rnd.sample(sids, min(students, len(sids)))
+    majors = sorted({get_major_code(r[0]) for r in db.query(Student.sClass).distinct().all()} - {None, ""})
+    years = [r[0] for r in db.query(Recommendation.year).distinct().all()]
+    names = [r[0] for r in db.query(CourseScore.courseName).group_by(CourseScore.courseName)
+             .order_by(func.count(CourseScore.studentId).desc()).limit(courses).all()]
+
+    for sid in sids:
+        StudentRepository.get_by_id(db, sid)
+        CourseScoreRepository.get_by_student_id(db, sid)
+    for code in majors:
+        StudentRepository.get_major_ranking(db, code)
+    for year in years:
+        RecommendationService.get_view(db, year)
+    for name in names + [None]:
+        CourseScoreRepository.get_facet_rows(db, name)
+    cohort_stats.get(db)
+    return {
+        "student": [f"student:{s}" for s in sids],
+        "scores": [f"scores:{s}" for s in sids],
+        "major_ranking": [f"major_ranking:{m}" for m in majors],
+        "rec_view": [f"rec_view:{y}" for y in years],
+        "course_facets": [f"course_facets:{n or ''}" for n in names + [None]],
+        "cohort_stats": [cohort_stats.COHORT_STATS_KEY],
+    }
+
+
+def _memory_usage(r, key: str, value: bytes) -> Optional[int]:
+    try:
+        r.set(key, value)
+        return int(r.execute_command("MEMORY", "USAGE", key))
+    except Exception:
+        return None
+    finally:
+        r.delete(key)
+
+
+def _per_call_us(fn: Callable, items: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return round((time.perf_counter() - start) / (repeat * len(items)) * 1e6, 2)
+
+
+def _measure(r, family: str, keys: List[str], repeat: int) -> Optional[dict]:
+    from app.db import codecs
+    from app.db.redis import NEVER_DECODE, _ns
+
+    stored = []
+    for key in keys:
+        raw = r.execute_command("GET", _ns(key), **{NEVER_DECODE: True})
+        if raw is not None:
+            stored.append((key, raw))
+    if not stored:
+        return None
+    plain = [codecs.to_json(key, raw) for key, raw in stored]
+    if family == "scores":
+        def legacy(data):
+            return [SimpleNamespace(**d) for d in orjson.loads(data)]
+    else:
+        legacy = orjson.loads
+
+    json_bytes = sum(map(len, plain))
+    stored_bytes = sum(len(raw) for _, raw in stored)
+    result = {
+        "keys": len(stored),
+        "json_bytes": json_bytes,
+        "stored_bytes": stored_bytes,
+        "bytes_reduction": round(1 - stored_bytes / json_bytes, 3),
+        "json_decode_us": _per_call_us(legacy, plain, repeat),
+        "stored_decode_us": _per_call_us(lambda item: codecs.decode(*item), stored, repeat),
+    }
+    memory = [(_memory_usage(r, BENCH_KEY, p), _memory_usage(r, BENCH_KEY, raw)) for p, (_, raw) in zip(plain, stored)]
+    if all(a is not None and b is not None for a, b in memory):
+        result["json_memory"] = sum(a for a, _ in memory)
+        result["stored_memory"] = sum(b for _, b in memory)
+    return result
+
+
+def run(args) -> dict:
+    from app.core.config import settings
+    from app.db.redis import get_redis
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        families = _populate(db, args.students, args.courses, args.seed)
+        populate_seconds = time.perf_counter() - start
+    finally:
+        db.close()
+    r = get_redis()
+    results = {family: _measure(r, family, keys, args.repeat) for family, keys in families.items()}
+    totals = [v for v in results.values() if v]
+    return {
+        "compression": settings.CACHE_COMPRESSION,
+        "compress_min_bytes": settings.CACHE_COMPRESS_MIN_BYTES,
+        "compress_level": settings.CACHE_COMPRESS_LEVEL,
+        "populate_seconds": round(populate_seconds, 3),
+        "families": results,
+        "total": {
+            "json_bytes": sum(v["json_bytes"] for v in totals),
+            "stored_bytes": sum(v["stored_bytes"] for v in totals),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="", help="数据库连接串（默认取 .env 中的配置）")
+    parser.add_argument("--redis", choices=("fake", "local"), default="fake")
+    parser.add_argument("--students", type=int, default=500, help="抽样学生数（student / scores）")
+    parser.add_argument("--courses", type=int, default=50, help="选课人数最多的课程数（course_facets）")
+    parser.add_argument("--repeat", type=int, default=20, help="解码计时的重复轮数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.async_mode = False
+
+    _configure(args)
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+合成基准数据集生成：student / course_score / recommendation / notice 四张表
+
+- 学院 / 专业 / 班级：班级号 10 位（年级 4 位 + 学院 2 位 + 专业 2 位 + 班号 2 位，见 class_utils），
+  学号为班级号后接 2 位序号
+- 姓名：常见姓氏 + 1~2 字名，全拼由 pypinyin 生成（与 s_py 的连写格式一致）
+- 课程：公共课、各专业课与公选课，按培养方案分配到入学后的各学期（不晚于 --current-term）；
+  成绩由学生水平 + 课程难度 + 随机扰动生成，少量缺考（空成绩）
+- 重修规则（c_pass）：不及格后下一学期补考（1），补考仍不及格再重修（2），部分及格成绩刷分（3）
+- 学生均分 / 绩点按学分加权（每门课取最高有效成绩，补考及格按 60 计，绩点 = (成绩 - 50) / 10，不及格为 0），
+  班级 / 专业排名按并列取最小名次（1,1,3），空值按 0 计
+- 推免：每年取大四年级各专业综合成绩前 --rec-rate 的学生；最早一年没有表现成绩和专业人数
+
+用法:
+  python -m bench.datagen --db-url sqlite:///bench.db --students 50000 --scores 5000000
+  python -m bench.datagen --db-url mysql+mysqlconnector://u:p@localhost/bench --students 5000 --reset
+
+--reset 会删除并重建目标库中的上述四张表，只应指向基准专用的数据库。
+"""
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华玉萍红娥玲芬燕彩春菊兰凤洁梅琳素云莲真环雪荣爱妹香月莺媛瑞凡佳嘉琼勤珍贞莉桂娣叶璧璐娅琦晶妍茜秋珊莎锦黛青倩婷姣婉娴瑾颖露瑶怡婵雁蓓纨仪荷丹蓉眉君琴蕊薇菁梦岚苑婕馨瑗琰韵融园艺咏卿聪澜纯毓悦昭冰爽琬茗羽希宁欣飘育滢馥筠柔竹霭凝晓欢霄枫芸菲寒伊亚宜可姬舒影荔枝丽阳妮宝贝初程梵罡恒鸿桦骅剑娇纪宽苛灵玛媚琪晴容睿烁堂唯威韦雯苇萱阅彦宇雨洋忠宗曼紫逸贤蝶菡绿蓝儿翠烟"
+
+COLLEGES: List[Tuple[str, List[str]]] = [
+    ("计算机学院", ["计算机科学与技术", "软件工程", "网络工程", "数据科学与大数据技术", "人工智能"]),
+    ("电子信息学院", ["电子信息工程", "通信工程", "微电子科学与工程"]),
+    ("自动化学院", ["自动化", "电气工程及其自动化", "机器人工程"]),
+    ("机械工程学院", ["机械设计制造及其自动化", "车辆工程", "工业设计"]),
+    ("理学院", ["数学与应用数学", "信息与计算科学", "应用物理学", "统计学"]),
+    ("经济管理学院", ["工商管理", "会计学", "金融学", "国际经济与贸易"]),
+    ("外国语学院", ["英语", "日语", "翻译"]),
+    ("材料学院", ["材料科学与工程", "高分子材料与工程"]),
+    ("化学化工学院", ["化学工程与工艺", "应用化学", "制药工程"]),
+    ("土木工程学院", ["土木工程", "建筑环境与能源应用工程", "工程管理"]),
+    ("生命科学学院", ["生物技术", "生物工程"]),
+    ("人文学院", ["汉语言文学", "新闻学", "法学"]),
+]
+
+# (课程名, 学分, 类型, 培养方案中的学期序号 0~7)
+COMMON_COURSES = [
+    ("高等数学A(上)", 5.0, 0), ("高等数学A(下)", 5.0, 1), ("线性代数", 3.0, 1), ("概率论与数理统计", 3.0, 2),
+    ("大学物理(上)", 4.0, 1), ("大学物理(下)", 4.0, 2), ("大学物理实验", 1.5, 2),
+    ("大学英语(1)", 3.0, 0), ("大学英语(2)", 3.0, 1), ("大学英语(3)", 2.0, 2), ("大学英语(4)", 2.0, 3),
+    ("思想道德与法治", 3.0, 0), ("中国近现代史纲要", 3.0, 1), ("马克思主义基本原理", 3.0, 2),
+    ("毛泽东思想和中国特色社会主义理论体系概论", 5.0, 3), ("形势与政策", 2.0, 4),
+    ("体育(1)", 1.0, 0), ("体育(2)", 1.0, 1), ("体育(3)", 1.0, 2), ("体育(4)", 1.0, 3),
+    ("军事理论", 2.0, 0), ("程序设计基础", 3.0, 0), ("大学计算机基础", 2.0, 0), ("创新创业基础", 1.0, 4),
+]
+MAJOR_SUFFIXES = ["导论", "原理", "基础", "实验", "课程设计", "综合实践", "专题", "前沿讲座", "方法", "分析",
+                  "建模", "设计", "应用", "技术", "工程实践", "案例研究"]
+ELECTIVE_TOPICS = ["音乐鉴赏", "电影艺术", "中国古代文学", "西方哲学", "心理健康", "健康教育", "书法", "摄影",
+                   "国际关系", "创业管理", "数据可视化", "人工智能通识", "中国传统文化", "美术鉴赏", "演讲与口才",
+                   "科技写作", "环境保护", "营养与健康", "法律基础", "世界历史", "天文学", "围棋", "茶文化", "经济学原理"]
+ELECTIVE_SUFFIXES = ["", "概论", "赏析", "与生活", "入门", "专题"]
+# 补考及格按此分数计入均分 / 绩点（与 app.services.recompute.MAKEUP_PASS_SCORE 一致）
+MAKEUP_PASS_SCORE = 60
+POLITICAL = ["共青团员"] * 12 + ["中共党员"] * 2 + ["中共预备党员", "群众"]
+
+
+def _fixed(value: float) -> int:
+    """以 0.01 为单位的定点整数（与 app.services.recompute 的计算方式一致，结果与求和顺序无关）。"""
+    return round(value * 100)
+
+
+def _gpa(score: int) -> int:
+    """单门绩点（定点）：(成绩 - 50) / 10 四舍五入到 0.01，不及格为 0。"""
+    return (score - 5000 + 5) // 10 if score >= 6000 else 0
+
+
+def _mean(total: int, credits: int) -> float:
+    """定点加权和 / 学分和，四舍五入保留两位。"""
+    return (2 * total + credits) // (2 * credits) / 100
+
+
+def _competition_rank(values: List[Tuple[str, float]]) -> Dict[str, int]:
+    """降序、并列取最小名次（1,1,3）。"""
+    ordered = sorted(values, key=lambda kv: -kv[1])
+    ranks, prev, rank = {}, None, 0
+    for i, (sid, value) in enumerate(ordered):
+        if value != prev:
+            rank, prev = i + 1, value
+        ranks[sid] = rank
+    return ranks
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        year, sem = (int(x) for x in args.current_term.split("-"))
+        self.current = (year, sem)
+        self.grades = list(range(args.latest_grade - args.grades + 1, args.latest_grade + 1))
+
+    # ---------- 培养方案 ----------
+
+    def _curriculum(self, major: str) -> List[Tuple[str, float, str, int]]:
+        rnd = self.rnd
+        courses = [(name, credit, "必修", term) for name, credit, term in COMMON_COURSES]
+        stem = major[:4] if len(major) > 4 else major
+        for i, suffix in enumerate(rnd.sample(MAJOR_SUFFIXES, len(MAJOR_SUFFIXES))):
+            courses.append((f"{stem}{suffix}", rnd.choice([2.0, 2.5, 3.0, 3.5, 4.0]),
+                            "必修" if i % 3 else "选修", 2 + i % 6))
+        return courses
+
+    @staticmethod
+    def _electives() -> List[Tuple[str, float, str, int]]:
+        """公选课不固定学期，选课时随机分配。"""
+        return [(f"{topic}{suffix}", 1.0 + 0.5 * (i % 3), "公选", -1)
+                for topic in ELECTIVE_TOPICS for i, suffix in enumerate(ELECTIVE_SUFFIXES)]
+
+    def _terms(self, grade: int) -> List[str]:
+        terms = []
+        for t in range(8):
+            year, sem = grade + t // 2, t % 2 + 1
+            if (year, sem) <= self.current:
+                terms.append(f"{year}-{sem}")
+        return terms
+
+    # ---------- 生成 ----------
+
+    def students(self):
+        """按 学院 / 专业 / 年级 / 班级 依次生成学生，人数按 --students 均摊。"""
+        args, rnd = self.args, self.rnd
+        groups = [(ci, college, mi, major, grade)
+                  for ci, (college, majors) in enumerate(COLLEGES, start=1)
+                  for mi, major in enumerate(majors, start=1)
+                  for grade in self.grades]
+        per_group = max(1, args.students // len(groups))
+        extra = args.students - per_group * len(groups)
+        from pypinyin import lazy_pinyin
+
+        for g, (ci, college, mi, major, grade) in enumerate(groups):
+            n = per_group + (1 if g < extra else 0)
+            n_classes = max(1, min(99, round(n / args.class_size)))
+            for k in range(n):
+                klass = f"{grade}{ci:02d}{mi:02d}{k % n_classes + 1:02d}"
+                seq = k // n_classes + 1
+                name = rnd.choice(SURNAMES) + "".join(rnd.choice(GIVEN) for _ in range(rnd.choice((1, 2, 2))))
+                yield {
+                    "studentId": f"{klass}{seq:02d}" if seq < 100 else f"{klass}{seq:04d}",
+                    "sName": name, "sPy": "".join(lazy_pinyin(name)),
+                    "sCollege": college, "sMajor": major, "sGrade": str(grade), "sClass": klass,
+                    "ability": rnd.gauss(78, 8),
+                }
+
+    def scores(self, student: dict, curriculum, electives, per_student: int):
+        """一名学生的全部成绩行（含补考 / 重修 / 刷分）。"""
+        rnd = self.rnd
+        terms = self._terms(int(student["sGrade"]))
+        if not terms:
+            return []
+        plan = [c for c in curriculum if c[3] < len(terms)][:per_student]
+        n_electives = max(0, min(len(electives), per_student - len(plan)))
+        plan += [(n, c, t, rnd.randrange(len(terms))) for n, c, t, _ in rnd.sample(electives, n_electives)]
+
+        rows = []
+        for name, credit, ctype, term_index in plan:
+            difficulty = self.difficulty.setdefault(name, rnd.gauss(0, 5))
+            score = None if rnd.random() < 0.005 else max(0, min(100, round(student["ability"] + difficulty + rnd.gauss(0, 9))))
+            attempts = [(term_index, score, 0)]
+            # 不及格：补考，仍不及格则重修；及格但偏低时部分学生刷分
+            t = term_index
+            while (score is None or score < 60) and t + 1 < len(terms) and len(attempts) < 3:
+                t += 1
+                score = max(0, min(100, round(student["ability"] + difficulty + 8 + rnd.gauss(0, 8))))
+                attempts.append((t, score, 1 if len(attempts) == 1 else 2))
+            if score is not None and 60 <= score < 75 and t + 1 < len(terms) and rnd.random() < 0.03:
+                attempts.append((t + 1, min(100, score + rnd.randint(0, 15)), 3))
+            for ti, s, c_pass in attempts:
+                rows.append({
+                    "studentId": student["studentId"], "cTerm": terms[ti], "courseName": name,
+                    "score": s, "cType": ctype, "cHours": str(int(credit * 16)), "cCredit": credit, "cPass": c_pass,
+                })
+        return rows
+
+    @staticmethod
+    def aggregate(rows: List[dict]) -> Tuple[Optional[float], Optional[float]]:
+        """学分加权均分与绩点，每门课取最高有效成绩（补考及格按 60 计，同 app/services/recompute.py）。"""
+        best: Dict[str, Tuple[int, int]] = {}
+        for r in rows:
+            if r["score"] is None:
+                continue
+            score = _fixed(min(r["score"], MAKEUP_PASS_SCORE) if r["cPass"] == 1 else r["score"])
+            prev = best.get(r["courseName"])
+            if prev is None or score > prev[0]:
+                best[r["courseName"]] = (score, _fixed(r["cCredit"]))
+        credits = sum(c for _, c in best.values())
+        if credits <= 0:
+            return None, None
+        avg = _mean(sum(s * c for s, c in best.values()), credits)
+        gpa = _mean(sum(_gpa(s) * c for s, c in best.values()), credits)
+        return avg, gpa
+
+    def recommendations(self, students: List[dict]) -> List[dict]:
+        args, rnd = self.args, self.rnd
+        rows = []
+        # 推免在大四上学期公示，对应年级 = 年份 - 3
+        rec_years = [g + 3 for g in self.grades if g + 3 <= self.current[0]]
+        for y_index, year in enumerate(rec_years):
+            cohort = defaultdict(list)
+            for s in students:
+                if int(s["sGrade"]) == year - 3:
+                    cohort[(s["sCollege"], s["sMajor"])].append(s)
+            for (college, major), members in cohort.items():
+                scored = sorted(((s, (s["sGpa"] or 0) * 20 * 0.9 + rnd.uniform(0, 10)) for s in members),
+                                key=lambda x: -x[1])
+                n = max(1, round(len(members) * args.rec_rate))
+                for rank, (s, comp) in enumerate(scored[:n], start=1):
+                    has_perf = y_index > 0
+                    rows.append({
+                        "studentId": s["studentId"], "year": year, "name": s["sName"],
+                        "gender": rnd.choice(["男", "女"]), "political": rnd.choice(POLITICAL),
+                        "college": college, "major": major,
+                        "courseGpa": round(max(0.0, (s["sGpa"] or 0) - rnd.uniform(0, 0.1)), 2),
+                        "courseAvg": s["sAvg"],
+                        "perfScore": round(rnd.uniform(0, 10), 2) if has_perf else None,
+                        "compScore": round(comp, 2), "compRank": rank,
+                        "majorTotal": len(members) if has_perf else None,
+                        "remark": "" if rnd.random() > 0.05 else "支教保研",
+                    })
+        return rows
+
+    def run(self, engine):
+        from sqlalchemy import insert
+        from sqlalchemy.orm import Session
+        from app.core.config import settings
+        from app.models.models import Student, CourseScore, Recommendation, Notice
+
+        args = self.args
+        self.difficulty: Dict[str, float] = {}
+        electives = self._electives()
+        curricula: Dict[str, list] = {}
+        per_student = max(1, round(args.scores / max(1, args.students) / 1.06))
+        counts = defaultdict(int)
+        students: List[dict] = []
+        start = time.perf_counter()
+
+        with Session(engine) as session:
+            def write(model, rows: List[dict]):
+                # ORM 批量插入（按属性名），每批单独提交以限制事务大小
+                for i in range(0, len(rows), args.batch):
+                    session.execute(insert(model), rows[i:i + args.batch])
+                    session.commit()
+                counts[model.__tablename__] += len(rows)
+
+            batch: List[dict] = []
+            for s in self.students():
+                curriculum = curricula.setdefault(s["sMajor"], self._curriculum(s["sMajor"]))
+                rows = self.scores(s, curriculum, electives, per_student)
+                s["sAvg"], s["sGpa"] = self.aggregate(rows)
+                students.append(s)
+                batch.extend(rows)
+                if len(batch) >= args.batch:
+                    write(CourseScore, batch)
+                    batch = []
+            write(CourseScore, batch)
+
+            for scope, key_fn in (("class", lambda s: s["sClass"]), ("major", lambda s: s["sClass"][:8])):
+                groups = defaultdict(list)
+                for s in students:
+                    groups[key_fn(s)].append(s)
+                for members in groups.values():
+                    for metric, field in (("Avg", "sAvg"), ("Gpa", "sGpa")):
+                        ranks = _competition_rank([(s["studentId"], s[field] or 0.0) for s in members])
+                        for s in members:
+                            s[f"{scope}{metric}Rank"] = ranks[s["studentId"]]
+
+            attrs = [c.key for c in Student.__mapper__.column_attrs]
+            write(Student, [{k: s[k] for k in attrs} for s in students])
+            write(Recommendation, self.recommendations(students))
+            notices = {"index": settings.NOTICE_INDEX, "rec": settings.NOTICE_REC,
+                       "gpa": settings.NOTICE_GPA, "fail": settings.NOTICE_FAIL}
+            write(Notice, [{"key": k, "content": v} for k, v in notices.items()])
+
+        counts["courses"] = len(self.difficulty)
+        counts["seconds"] = round(time.perf_counter() - start, 1)
+        return dict(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="", help="目标数据库（默认取 .env 中的配置）")
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--scores", type=int, default=5000000, help="成绩行数（近似）")
+    parser.add_argument("--grades", type=int, default=6, help="年级数")
+    parser.add_argument("--latest-grade", type=int, default=2024)
+    parser.add_argument("--current-term", default="2025-1", help="最新学期，之后的学期不生成成绩")
+    parser.add_argument("--class-size", type=int, default=32)
+    parser.add_argument("--rec-rate", type=float, default=0.12, help="各专业推免比例")
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=20240901)
+    parser.add_argument("--reset", action="store_true", help="先删除并重建四张表")
+    args = parser.parse_args()
+
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+    from sqlalchemy import create_engine, event
+    from app.db.session import Base
+    from app.core.config import settings
+    from app.models import models
+
+    engine = create_engine(settings.DATABASE_URL)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _fast_sqlite(dbapi_conn, _):
+            dbapi_conn.execute("PRAGMA journal_mode=OFF")
+            dbapi_conn.execute("PRAGMA synchronous=OFF")
+
+    tables = [models.Student.__table__, models.CourseScore.__table__,
+              models.Recommendation.__table__, models.Notice.__table__]
+    if args.reset:
+        Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+
+    import json
+    print(json.dumps(Generator(args).run(engine), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
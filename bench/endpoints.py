@@ -0,0 +1,339 @@
+"""
+全接口基准：在进程内通过 ASGI 依次请求 api_router 中的每个接口，输出冷 / 热缓存两组延迟分位数与吞吐（JSON）
+
+- 数据库：--db-url 指定（如 bench.datagen 生成的 SQLite 文件），异步模式下自动换用对应的异步驱动
+- Redis：--redis fake 使用进程内 fakeredis（需安装 fakeredis 与 lupa），--redis local 使用 .env 中的 Redis
+- 冷缓存：每轮先递增缓存代际（与数据导入后相同：Redis / L1 / 进程内派生结构全部失效，内存索引重建），
+  等后台任务完成后，每个参数组合各请求一次；共 --cold-rounds 轮
+- 热缓存：冷缓存测量之后，每个接口按参数组合轮流请求 --warm-requests 次
+
+每个接口从数据集中抽取 --variants 组参数（学号、课程、年份等）。需要身份验证的接口先走一遍
+出题 -> 答题流程取得 sessionToken（不计入结果）。没有定义参数的接口列入 skipped，
+新增接口时需在 CASES 中补充。结果中附带当前提交号，--baseline 给出与另一次结果的热缓存 p50 对比。
+
+用法:
+  python -m bench.datagen --db-url sqlite:///bench.db --students 50000 --scores 5000000
+  python -m bench.endpoints --db-url sqlite:///bench.db --redis fake --out bench-result.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (方法, 完整路径, 查询参数, JSON 请求体)
+Request = Tuple[str, str, Optional[dict], Optional[dict]]
+Variant = Tuple[str, Optional[dict], Optional[dict]]
+
+SKIPPED = {
+    ("POST", "/auth/wxlogin"): "依赖微信接口",
+}
+
+
+def _async_url(url: str) -> str:
+    for sync, async_ in (("sqlite://", "sqlite+aiosqlite://"),
+                         ("mysql+mysqlconnector://", "mysql+aiomysql://"),
+                         ("mysql://", "mysql+aiomysql://")):
+        if url.startswith(sync):
+            return async_ + url[len(sync):]
+    return url
+
+
+def _configure(args):
+    """在导入 app 之前写入配置（settings 在导入时读取环境变量）。"""
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+        os.environ["ASYNC_DB_URL"] = _async_url(args.db_url)
+    os.environ["ASYNC_MODE"] = "true" if args.async_mode else "false"
+    # 预热会与测量争用 CPU；冷缓存即不预热时的首次请求
+    os.environ["WARMUP_ENABLED"] = "false"
+    # 同一微信身份会在短时间内大量出题
+    os.environ["CHALLENGE_RATE_LIMIT"] = str(10 ** 9)
+
+    if args.redis == "fake":
+        try:
+            import fakeredis
+        except ImportError:
+            sys.exit("--redis fake 需要安装 fakeredis 与 lupa：pip install fakeredis lupa")
+        import redis
+        import redis.asyncio
+        import app.db.redis as app_redis
+        server = fakeredis.FakeServer()
+        app_redis._redis_pool = redis.ConnectionPool(
+            connection_class=fakeredis.FakeConnection, server=server, decode_responses=True)
+        app_redis._async_redis_pool = redis.asyncio.ConnectionPool(
+            connection_class=fakeredis.FakeAsyncRedisConnection, server=server, decode_responses=True)
+
+
+# ---------- 参数 ----------
+
+class Dataset:
+    """从数据库中抽取各接口的参数取值。"""
+
+    def __init__(self, variants: int, seed: int):
+        from sqlalchemy import func
+        from app.db.session import SessionLocal
+        from app.models.models import Student, CourseScore, Recommendation
+
+        rnd = random.Random(seed)
+        db = SessionLocal()
+        try:
+            self.counts = {
+                "student": db.query(func.count(Student.studentId)).scalar(),
+                "course_score": db.query(func.count(CourseScore.studentId)).scalar(),
+                "recommendation": db.query(func.count(Recommendation.studentId)).scalar(),
+            }
+            sids = [r[0] for r in db.query(Student.studentId).all()]
+            sample = rnd.sample(sids, min(variants, len(sids)))
+            rows = db.query(Student.studentId, Student.sName, Student.sPy) \
+                .filter(Student.studentId.in_(sample)).order_by(Student.studentId).all()
+            self.students = [(r[0], r[1], r[2]) for r in rows]
+            courses = db.query(CourseScore.courseName, func.count(CourseScore.studentId)) \
+                .group_by(CourseScore.courseName).all()
+            courses.sort(key=lambda c: -c[1])
+            # 一半取选课人数最多的课程（热点），一半随机
+            head = [c[0] for c in courses[:max(1, variants // 2)]]
+            tail = [c[0] for c in rnd.sample(courses, min(len(courses), variants - len(head)))]
+            self.courses = list(dict.fromkeys(head + tail))
+            self.terms = [r[0] for r in db.query(CourseScore.cTerm).distinct().all()]
+            self.majors = [r[0] for r in db.query(Student.sMajor).distinct().all() if r[0]]
+            self.rec = db.query(Recommendation.year, Recommendation.college, Recommendation.major) \
+                .distinct().all()
+        finally:
+            db.close()
+        self.years = sorted({r[0] for r in self.rec})
+        self.rnd = rnd
+        self.sessions: Dict[str, str] = {}
+
+    def pick(self, values: list, n: int) -> list:
+        return [values[i % len(values)] for i in range(n)] if values else []
+
+
+def _verified(ds: Dataset, path: str) -> List[Variant]:
+    return [(path, None, {"sid": sid, "sessionToken": ds.sessions[sid]})
+            for sid, _, _ in ds.students if sid in ds.sessions]
+
+
+def _rec_list(ds: Dataset) -> List[Variant]:
+    n = len(ds.students)
+    bodies = [{"year": y, "pageSize": 35} for y in ds.years]
+    bodies += [{"year": y, "college": c, "pageSize": 35} for y, c, _ in ds.rec[:n]]
+    bodies += [{"year": y, "college": c, "major": m, "pageSize": 35, "page": 2} for y, c, m in ds.rec[:n]]
+    return [("/rec/list", None, b) for b in bodies]
+
+
+# (方法, 路由路径) -> 参数组合：每项为 (请求路径, 查询参数, JSON 请求体)，路径不含 API 前缀
+CASES: Dict[Tuple[str, str], Callable[[Dataset], List[Variant]]] = {
+    ("GET", "/notice/{key}"): lambda ds: [(f"/notice/{k}", None, None) for k in ("index", "rec", "gpa", "fail")],
+    ("GET", "/health/warmup"): lambda ds: [("/health/warmup", None, None)],
+    ("GET", "/health/ready"): lambda ds: [("/health/ready", None, None)],
+    ("GET", "/cs/name"): lambda ds: [("/cs/name", {"cname": c[:n]}, None) for c in ds.courses for n in (1, 2)],
+    ("GET", "/cs/filter"): lambda ds: [("/cs/filter", {"courseName": c}, None) for c in ds.courses],
+    ("POST", "/cs/filter/dynamic"): lambda ds: [
+        ("/cs/filter/dynamic", None, {"courseName": c, "terms": [t]})
+        for c, t in zip(ds.courses, ds.pick(ds.terms, len(ds.courses)))],
+    ("POST", "/cs/fail-rate"): lambda ds: [("/cs/fail-rate", None, {"courseName": c}) for c in ds.courses] + [
+        ("/cs/fail-rate", None, {"courseName": c, "majors": [m]})
+        for c, m in zip(ds.courses, ds.pick(ds.majors, len(ds.courses)))],
+    ("POST", "/cs/query/id"): lambda ds: _verified(ds, "/cs/query/id"),
+    ("POST", "/stu/rank/id"): lambda ds: _verified(ds, "/stu/rank/id"),
+    ("POST", "/stu/dashboard"): lambda ds: _verified(ds, "/stu/dashboard"),
+    ("GET", "/stu/query/py"): lambda ds: [("/stu/query/py", {"spy": py}, None) for _, _, py in ds.students if py],
+    ("GET", "/stu/query/name"): lambda ds: [("/stu/query/name", {"sname": n}, None) for _, n, _ in ds.students if n],
+    ("GET", "/stu/query/suggest"): lambda ds: [
+        ("/stu/query/suggest", {"q": py[:n]}, None) for _, _, py in ds.students if py for n in (2, 4)],
+    ("GET", "/stu/rank/major"): lambda ds: [("/stu/rank/major", {"sid": sid}, None) for sid, _, _ in ds.students],
+    ("GET", "/verify/challenge"): lambda ds: [("/verify/challenge", {"sid": sid}, None) for sid, _, _ in ds.students],
+    ("GET", "/rec/options"): lambda ds: [("/rec/options", None, None)] + [
+        ("/rec/options", {"year": y}, None) for y in ds.years] + [
+        ("/rec/options", {"year": y, "college": c}, None) for y, c, _ in ds.rec[:len(ds.students)]],
+    ("POST", "/rec/list"): _rec_list,
+}
+
+
+def _requests(ds: Dataset, method: str, route_path: str, prefix: str) -> List[Request]:
+    return [(method, prefix + path, params, body) for path, params, body in CASES[(method, route_path)](ds)]
+
+
+# ---------- 测量 ----------
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _summary(latencies: List[float], elapsed: float, errors: int) -> dict:
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+async def _send(client, req: Request) -> Tuple[float, bool]:
+    method, url, params, body = req
+    start = time.perf_counter()
+    resp = await client.request(method, url, params=params, json=body)
+    elapsed = time.perf_counter() - start
+    ok = resp.status_code == 200 and resp.json().get("code") == 200
+    return elapsed, ok
+
+
+async def _measure(client, requests: List[Request]) -> dict:
+    latencies, errors, elapsed = [], 0, 0.0
+    for req in requests:
+        seconds, ok = await _send(client, req)
+        latencies.append(seconds)
+        elapsed += seconds
+        errors += 0 if ok else 1
+    return {"latencies": latencies, "elapsed": elapsed, "errors": errors}
+
+
+async def _login_sessions(client, ds: Dataset, prefix: str):
+    """对抽样学生走一遍出题 -> 答题，取得 sessionToken。"""
+    from app.db.redis import get_redis
+    r = get_redis()
+    for sid, _, _ in ds.students:
+        resp = (await client.get(f"{prefix}/verify/challenge", params={"sid": sid})).json()
+        if resp.get("code") != 200:
+            continue
+        token = resp["data"]["token"]
+        challenge = json.loads(r.get(f"challenge:{token}"))
+        answers = [{"courseName": q["courseName"], "score": q["score"]} for q in challenge["questions"]]
+        resp = (await client.post(f"{prefix}/cs/query/id",
+                                  json={"sid": sid, "token": token, "answers": answers})).json()
+        if resp.get("code") == 200:
+            ds.sessions[sid] = resp["data"]["sessionToken"]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.api.api_v1.api import api_router
+    from app.core import scheduler
+    from app.core.config import settings
+    from app.db.redis import bump_cache_generation, get_redis
+    from app.main import app
+
+    prefix = settings.API_V1_STR
+    routes = sorted({(m, route.path) for route in api_router.routes for m in getattr(route, "methods", ()) or ()},
+                    key=lambda r: (r[1], r[0]))
+    ds = Dataset(args.variants, args.seed)
+    wx_token = f"bench-{uuid.uuid4().hex}"
+    get_redis().set(f"wx_session:{wx_token}", "bench-openid", ex=86400)
+
+    results, skipped = [], []
+    async with app.router.lifespan_context(app):
+        scheduler.wait_idle(args.index_timeout)
+        transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 0))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     headers={"X-Wx-Token": wx_token}, timeout=None) as client:
+            await _login_sessions(client, ds, prefix)
+            plans = {}
+            for method, path in routes:
+                if (method, path) in SKIPPED:
+                    skipped.append({"method": method, "path": path, "reason": SKIPPED[(method, path)]})
+                elif (method, path) not in CASES:
+                    skipped.append({"method": method, "path": path, "reason": "未定义基准参数"})
+                else:
+                    plans[(method, path)] = _requests(ds, method, path, prefix)
+
+            cold = {key: {"latencies": [], "elapsed": 0.0, "errors": 0} for key in plans}
+            for _ in range(args.cold_rounds):
+                bump_cache_generation()
+                scheduler.wait_idle(args.index_timeout)
+                for key, requests in plans.items():
+                    m = await _measure(client, requests)
+                    for k in ("latencies", "elapsed", "errors"):
+                        cold[key][k] += m[k]
+
+            for (method, path), requests in plans.items():
+                warm_requests = [requests[i % len(requests)] for i in range(args.warm_requests)]
+                warm = await _measure(client, warm_requests)
+                results.append({
+                    "method": method, "path": path, "variants": len(requests),
+                    "cold": _summary(cold[(method, path)]["latencies"], cold[(method, path)]["elapsed"],
+                                     cold[(method, path)]["errors"]),
+                    "warm": _summary(warm["latencies"], warm["elapsed"], warm["errors"]),
+                })
+    get_redis().delete(f"wx_session:{wx_token}")
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "async_mode": settings.ASYNC_MODE,
+            "db": settings.DATABASE_URL.split("://", 1)[0],
+            "redis": args.redis,
+            "dataset": ds.counts,
+            "params": {"variants": args.variants, "cold_rounds": args.cold_rounds,
+                       "warm_requests": args.warm_requests, "seed": args.seed},
+        },
+        "routes": results,
+        "skipped": skipped,
+    }
+
+
+def _compare(result: dict, baseline: dict) -> List[dict]:
+    base = {(r["method"], r["path"]): r for r in baseline.get("routes", [])}
+    rows = []
+    for r in result["routes"]:
+        b = base.get((r["method"], r["path"]))
+        if b is None or not b["warm"].get("p50_ms") or not r["warm"].get("p50_ms"):
+            continue
+        rows.append({"method": r["method"], "path": r["path"],
+                     "warm_p50_ms": r["warm"]["p50_ms"], "baseline_warm_p50_ms": b["warm"]["p50_ms"],
+                     "ratio": round(r["warm"]["p50_ms"] / b["warm"]["p50_ms"], 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="", help="数据库连接串（默认取 .env 中的配置）")
+    parser.add_argument("--redis", choices=("fake", "local"), default="fake")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="以异步模式运行应用")
+    parser.add_argument("--variants", type=int, default=20, help="每个接口的参数组合数")
+    parser.add_argument("--cold-rounds", type=int, default=3)
+    parser.add_argument("--warm-requests", type=int, default=500)
+    parser.add_argument("--index-timeout", type=float, default=600, help="等待内存索引构建的最长时间（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="", help="结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--baseline", default="", help="与之对比的另一次结果文件")
+    args = parser.parse_args()
+
+    _configure(args)
+    result = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["comparison"] = _compare(result, json.load(f))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+指标采集开销基准
+
+- record：各记录路径的单次开销（microseconds per call）——请求中间件（空应用）、SQL 事件、Redis 计时
+- route：缓存命中路径的端到端延迟，分别在 METRICS_ENABLED 开启 / 关闭时交替测量，
+  给出 p50 / p95 与每请求的额外耗时
+
+进程内通过 ASGI 直接调用应用（同 bench/response_path），不经过网络。
+
+用法: python -m bench.metrics_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import httpx
+from app.core import metrics
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.services import course_columns
+from bench.response_path import _percentile, _pick_params
+
+
+def _per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - start) / calls * 1e6, 3)
+
+
+async def _middleware_us(calls: int) -> dict:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/bench"}
+    result = {}
+    for name, handler in (("bare", app), ("middleware", metrics.MetricsMiddleware(app))):
+        start = time.perf_counter()
+        for _ in range(calls):
+            await handler(dict(scope), receive, send)
+        result[f"{name}_us"] = round((time.perf_counter() - start) / calls * 1e6, 3)
+    result["overhead_us"] = round(result["middleware_us"] - result["bare_us"], 3)
+    return result
+
+
+async def _record_costs(calls: int) -> dict:
+    return {
+        "request": await _middleware_us(calls),
+        "sql_event_us": _per_call_us(lambda: metrics.record_sql(0.001), calls),
+        "redis_call_us": _per_call_us(lambda: metrics.record_redis("GET", 0.0002), calls),
+    }
+
+
+async def _latencies(client: httpx.AsyncClient, path: str, body: dict, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        resp = await client.post(path, json=body)
+        latencies.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{path} -> {resp.status_code}")
+    return latencies
+
+
+async def _bench_route(client: httpx.AsyncClient, path: str, body: dict, requests: int, rounds: int) -> dict:
+    (await client.post(path, json=body)).raise_for_status()
+    samples = {True: [], False: []}
+    # 交替测量，抵消预热与系统负载波动的影响
+    for _ in range(rounds):
+        for enabled in (True, False):
+            settings.METRICS_ENABLED = enabled
+            samples[enabled] += await _latencies(client, path, body, requests // rounds)
+    settings.METRICS_ENABLED = True
+    result = {"route": path, "requests": requests}
+    for enabled, name in ((True, "on"), (False, "off")):
+        result[f"{name}_p50_ms"] = round(_percentile(samples[enabled], 50) * 1000, 3)
+        result[f"{name}_p95_ms"] = round(_percentile(samples[enabled], 95) * 1000, 3)
+    result["overhead_p50_us"] = round((result["on_p50_ms"] - result["off_p50_ms"]) * 1000, 1)
+    return result
+
+
+async def run(requests: int, rounds: int) -> dict:
+    from app.main import app
+
+    params = _pick_params()
+    token = f"bench-{uuid.uuid4().hex}"
+    r = get_redis()
+    r.set(f"wx_session:{token}", "bench-openid", ex=3600)
+    prefix = settings.API_V1_STR
+    settings.WARMUP_ENABLED = False
+    try:
+        async with app.router.lifespan_context(app):
+            while settings.FAIL_RATE_ENGINE_ENABLED and course_columns.get() is None:
+                await asyncio.sleep(0.1)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                         headers={"X-Wx-Token": token}) as client:
+                routes = [
+                    await _bench_route(client, f"{prefix}/rec/list",
+                                       {"year": params["year"], "pageSize": 35}, requests, rounds),
+                    await _bench_route(client, f"{prefix}/cs/fail-rate",
+                                       {"courseName": params["course"]}, requests, rounds),
+                ]
+            return {"record": await _record_costs(requests * 10), "routes": routes}
+    finally:
+        r.delete(f"wx_session:{token}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.requests, args.rounds))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
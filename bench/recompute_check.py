@@ -0,0 +1,139 @@
+"""
+重算一致性检查：在 bench.datagen 生成的小数据集上验证 app.services.recompute
+
+- datagen：生成数据集时写入的均分 / 绩点 / 排名与全量重算结果一致（两者按同一规则计算）
+- incremental：在部分学生上追加补考 / 重修 / 刷分 / 缺考成绩后，按受影响专业增量重算并写回，
+  再全量计算不应有任何变化
+- per_major：逐个专业增量计算的结果与全量计算完全相同
+- idempotent：全量重算写回后再次计算没有变化
+
+默认在临时 SQLite 文件上运行（--db-url 指定时会删除并重建该库的四张表，只应指向基准专用的数据库），
+不访问 Redis（不失效缓存）。任一检查失败时退出码为 1。
+
+用法:
+  python -m bench.recompute_check
+  python -m bench.recompute_check --students 3000 --edits 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from argparse import Namespace
+
+
+def _generate(args):
+    from sqlalchemy import create_engine
+    from app.core.config import settings
+    from app.db.session import Base
+    from app.models import models
+    from bench.datagen import Generator
+
+    engine = create_engine(settings.DATABASE_URL)
+    tables = [models.Student.__table__, models.CourseScore.__table__,
+              models.Recommendation.__table__, models.Notice.__table__]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    Generator(Namespace(students=args.students, scores=args.students * 40, grades=4, latest_grade=2024,
+                        current_term="2025-1", class_size=30, rec_rate=0.12, batch=10000,
+                        seed=args.seed)).run(engine)
+    engine.dispose()
+
+
+def _edit_scores(args) -> set:
+    """在随机学生的随机课程上追加一次考试（补考 / 重修 / 刷分，含缺考），返回受影响的专业代码。"""
+    from sqlalchemy import select
+    from app.db.session import SessionLocal
+    from app.models.models import CourseScore, Student
+    from app.utils.class_utils import get_major_code
+
+    rnd = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(CourseScore.studentId, CourseScore.courseName, CourseScore.cCredit,
+                                 Student.sClass).join(Student, CourseScore.studentId == Student.studentId)).all()
+        majors = set()
+        for sid, course, credit, s_class in rnd.sample(rows, min(args.edits, len(rows))):
+            score = None if rnd.random() < 0.1 else rnd.choice([rnd.randint(0, 100), round(rnd.uniform(0, 100), 1)])
+            db.add(CourseScore(studentId=sid, cTerm="2025-2", courseName=course, score=score, cType="必修",
+                               cHours="48", cCredit=credit, cPass=rnd.choice([1, 2, 3])))
+            majors.add(get_major_code(s_class))
+        db.commit()
+        return majors - {""}
+    finally:
+        db.close()
+
+
+def _majors():
+    from app.db.session import SessionLocal
+    from app.models.models import Student
+    from app.utils.class_utils import get_major_code
+
+    db = SessionLocal()
+    try:
+        return sorted({get_major_code(c) for (c,) in db.query(Student.sClass).distinct() if c} - {""})
+    finally:
+        db.close()
+
+
+def _per_major_mismatches(full) -> int:
+    import numpy as np
+    from app.services import recompute
+
+    index = {sid: i for i, sid in enumerate(full.sids)}
+    mismatched = 0
+    for major in _majors():
+        part = recompute.compute([major])
+        cols = np.array([index[sid] for sid in part.sids], dtype=np.int64)
+        same = np.isclose(part.values, full.values[:, cols], rtol=0, atol=0, equal_nan=True)
+        mismatched += int((~same.all(axis=0)).sum())
+    return mismatched
+
+
+def run(args) -> dict:
+    from app.services import recompute
+
+    _generate(args)
+    checks = {"datagen": len(recompute.compute().changed())}
+
+    majors = _edit_scores(args)
+    report = recompute.recompute(majors, invalidate=False)
+    checks["incremental"] = len(recompute.compute().changed())
+    checks["per_major"] = _per_major_mismatches(recompute.compute())
+
+    recompute.recompute(None, invalidate=False)
+    checks["idempotent"] = len(recompute.compute().changed())
+    return {
+        "ok": not any(checks.values()),
+        "mismatched_students": checks,
+        "edited_majors": len(majors),
+        "incremental_changed": report["changed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="", help="数据库连接串（默认为临时 SQLite 文件）")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=300, help="追加的成绩行数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.db_url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        args.db_url = f"sqlite:///{tmp.name}"
+    os.environ["DB_URL"] = args.db_url
+    try:
+        result = run(args)
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
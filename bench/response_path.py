@@ -0,0 +1,134 @@
+"""
+缓存命中路径基准：/rec/list 与 /cs/fail-rate 在结果已缓存时的端到端耗时。
+
+进程内通过 ASGI 直接调用应用（执行 lifespan，含列式数据集加载），不经过网络；
+每个接口先请求一次填充缓存，再重复请求同一参数并统计延迟分位数与吞吐。
+微信鉴权使用临时写入 Redis 的 wx_session。
+
+另对同一份缓存数据单独对比响应体的构造开销（microseconds per response）：
+- model：反序列化 -> 构造 DTO -> Result 响应模型校验 -> 序列化（原先的命中路径）
+- raw：缓存中的 JSON 原文直接拼入 Result 外壳
+
+用法: python -m bench.response_path --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import httpx
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import func
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.db.session import SessionLocal
+from app.models.models import CourseScore, Recommendation
+from app.schemas.dtos import FailRateStatisDTO, RecListResponseDTO
+from app.schemas.result import Result
+from app.services import course_columns
+
+
+def _pick_params() -> dict:
+    db = SessionLocal()
+    try:
+        year = db.query(func.max(Recommendation.year)).scalar()
+        course = db.query(CourseScore.courseName) \
+            .group_by(CourseScore.courseName) \
+            .order_by(func.count(CourseScore.studentId).desc()) \
+            .limit(1).scalar()
+    finally:
+        db.close()
+    return {"year": year, "course": course}
+
+
+def _percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _build_cost(data_json: bytes, dto_cls, requests: int) -> dict:
+    adapter = TypeAdapter(Result[dto_cls])
+
+    def model():
+        dto = dto_cls(**orjson.loads(data_json))
+        content = adapter.validate_python(Result.success(data=dto).model_dump())
+        return json.dumps(adapter.dump_python(content, mode="json"),
+                          ensure_ascii=False, separators=(",", ":")).encode()
+
+    def raw():
+        return Result.success_raw(data_json).body
+
+    result = {}
+    for name, fn in (("model", model), ("raw", raw)):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn()
+        result[f"{name}_us"] = round((time.perf_counter() - start) / requests * 1e6, 2)
+    return result
+
+
+async def _bench_route(client: httpx.AsyncClient, path: str, body: dict, dto_cls, requests: int) -> dict:
+    first = await client.post(path, json=body)
+    first.raise_for_status()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        resp = await client.post(path, json=body)
+        latencies.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{path} -> {resp.status_code}")
+    elapsed = time.perf_counter() - started
+    return {
+        "route": path,
+        "requests": requests,
+        "response_bytes": len(first.content),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "rps": round(requests / elapsed, 1),
+        "build": _build_cost(orjson.dumps(first.json()["data"]), dto_cls, requests),
+    }
+
+
+async def run(requests: int, page_size: int) -> list:
+    from app.main import app
+
+    params = _pick_params()
+    token = f"bench-{uuid.uuid4().hex}"
+    r = get_redis()
+    r.set(f"wx_session:{token}", "bench-openid", ex=3600)
+    prefix = settings.API_V1_STR
+    # 后台预热会与基准争用 CPU，这里只测命中路径，关闭预热
+    settings.WARMUP_ENABLED = False
+    try:
+        async with app.router.lifespan_context(app):
+            while settings.FAIL_RATE_ENGINE_ENABLED and course_columns.get() is None:
+                await asyncio.sleep(0.1)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                         headers={"X-Wx-Token": token}) as client:
+                return [
+                    await _bench_route(client, f"{prefix}/rec/list",
+                                       {"year": params["year"], "pageSize": page_size},
+                                       RecListResponseDTO, requests),
+                    await _bench_route(client, f"{prefix}/cs/fail-rate",
+                                       {"courseName": params["course"]},
+                                       FailRateStatisDTO, requests),
+                ]
+    finally:
+        r.delete(f"wx_session:{token}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=35)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.requests, args.page_size))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
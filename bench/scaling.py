@@ -0,0 +1,207 @@
+"""
+多进程扩展基准：以不同工作进程数启动 app.cli.serve，测量热缓存下的吞吐与延迟，给出相对单进程的扩展效率
+
+- 每个工作进程数（--workers 1,2,4）：启动服务并等待 /health/ready 就绪，按请求列表完整请求一轮
+  （预热，不计入结果），再由 --clients 个压测进程（各 --concurrency 个并发连接）持续请求 --duration 秒
+- 请求列表：MIX 中的只读接口，参数与 bench.endpoints 的取法相同（需要身份验证及会写入状态的接口不在其中）
+- 服务与压测进程须共享 Redis 与数据库：Redis 取 .env 中的配置（或 REDIS_HOST / REDIS_PORT 环境变量），
+  不支持进程内的 fakeredis
+- 压测进程与服务共用本机 CPU，工作进程数 + 压测进程数不宜超过 CPU 数，否则测得的主要是 CPU 争用；
+  结果中附带可用 CPU 数
+- efficiency = rps / (1 个工作进程的 rps × 工作进程数)，--workers 中不含 1 时以最小者为基准
+
+用法:
+  python -m bench.datagen --db-url sqlite:///bench.db --students 50000 --scores 5000000
+  python -m bench.scaling --db-url sqlite:///bench.db --workers 1,2,4 --clients 4 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import List, Tuple
+from bench.endpoints import CASES, Dataset, Request, _configure, _git_commit, _summary
+
+MIX = [
+    ("GET", "/notice/{key}"),
+    ("GET", "/cs/name"),
+    ("GET", "/cs/filter"),
+    ("POST", "/cs/fail-rate"),
+    ("GET", "/stu/query/suggest"),
+    ("GET", "/stu/rank/major"),
+    ("GET", "/rec/options"),
+    ("POST", "/rec/list"),
+]
+
+
+async def _drive(base_url: str, wx_token: str, requests: List[Request], duration: float, concurrency: int,
+                 offset: int) -> Tuple[List[float], int]:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers={"X-Wx-Token": wx_token},
+                                 limits=limits, timeout=30) as client:
+        async def loop(i: int):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                method, url, params, body = requests[i % len(requests)]
+                i += concurrency
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, params=params, json=body)
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += 0 if ok else 1
+
+        await asyncio.gather(*(loop(offset + i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def _load(job: tuple) -> Tuple[List[float], int]:
+    return asyncio.run(_drive(*job))
+
+
+def _wait_ready(proc: subprocess.Popen, url: str, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务启动失败（退出码 {proc.returncode}）")
+        try:
+            if httpx.get(url, timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"服务未能在 {timeout} 秒内就绪")
+
+
+def _stop(proc: subprocess.Popen):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(60)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _run_one(workers: int, args, requests: List[Request], wx_token: str) -> dict:
+    import httpx
+    from app.core.config import settings
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    cmd = [sys.executable, "-m", "app.cli.serve", "--workers", str(workers),
+           "--host", "127.0.0.1", "--port", str(args.port), "--no-access-log"]
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, stdout=log, stderr=log)
+    try:
+        started = time.perf_counter()
+        _wait_ready(proc, f"{base_url}{settings.API_V1_STR}/health/ready", args.ready_timeout)
+        ready_seconds = time.perf_counter() - started
+        with httpx.Client(base_url=base_url, headers={"X-Wx-Token": wx_token}, timeout=60) as client:
+            for method, url, params, body in requests:
+                client.request(method, url, params=params, json=body)
+
+        jobs = [(base_url, wx_token, requests, args.duration, args.concurrency, i * args.concurrency)
+                for i in range(args.clients)]
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            parts = pool.map(_load, jobs)
+    finally:
+        _stop(proc)
+        if args.server_log:
+            log.close()
+
+    latencies = [x for part, _ in parts for x in part]
+    errors = sum(e for _, e in parts)
+    result = {"workers": workers, "ready_seconds": round(ready_seconds, 1)}
+    result.update(_summary(latencies, args.duration, errors))
+    return result
+
+
+def run(args) -> dict:
+    from app.core.config import settings
+    from app.db.redis import get_redis
+
+    ds = Dataset(args.variants, args.seed)
+    prefix = settings.API_V1_STR
+    requests = [(method, prefix + path, params, body)
+                for method, route in MIX for path, params, body in CASES[(method, route)](ds)]
+    ds.rnd.shuffle(requests)
+    wx_token = f"bench-{uuid.uuid4().hex}"
+    r = get_redis()
+    r.set(f"wx_session:{wx_token}", "bench-openid", ex=86400)
+
+    runs = []
+    try:
+        for workers in args.workers:
+            runs.append(_run_one(workers, args, requests, wx_token))
+            print(json.dumps(runs[-1], ensure_ascii=False), file=sys.stderr)
+    finally:
+        r.delete(f"wx_session:{wx_token}")
+
+    base = min(runs, key=lambda x: x["workers"])
+    for x in runs:
+        if x.get("rps") and base.get("rps"):
+            x["efficiency"] = round(x["rps"] / (base["rps"] / base["workers"] * x["workers"]), 3)
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count()
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpus": cpus,
+            "async_mode": settings.ASYNC_MODE,
+            "db": settings.DATABASE_URL.split("://", 1)[0],
+            "dataset": ds.counts,
+            "params": {"variants": args.variants, "requests": len(requests), "clients": args.clients,
+                       "concurrency": args.concurrency, "duration": args.duration, "seed": args.seed},
+        },
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="", help="数据库连接串（默认取 .env 中的配置）")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="以异步模式运行应用")
+    parser.add_argument("--workers", default="1,2,4", help="依次测量的工作进程数，逗号分隔")
+    parser.add_argument("--clients", type=int, default=4, help="压测进程数")
+    parser.add_argument("--concurrency", type=int, default=16, help="每个压测进程的并发连接数")
+    parser.add_argument("--duration", type=float, default=20, help="每轮测量时长（秒）")
+    parser.add_argument("--variants", type=int, default=20, help="每个接口的参数组合数")
+    parser.add_argument("--port", type=int, default=3199)
+    parser.add_argument("--ready-timeout", type=float, default=600, help="等待服务就绪的最长时间（秒）")
+    parser.add_argument("--server-log", default="", help="服务输出追加写入的文件（默认丢弃）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="", help="结果写入文件（默认输出到标准输出）")
+    args = parser.parse_args()
+    args.workers = [int(w) for w in args.workers.split(",")]
+    args.redis = "local"
+
+    _configure(args)
+    text = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
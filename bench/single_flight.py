@@ -0,0 +1,100 @@
+"""
+缓存击穿基准：模拟热点 key 过期瞬间的并发请求，统计每次过期事件触发的 DB 查询次数。
+
+- baseline：原先的 cache_get -> 查询 -> cache_set 模式
+- single-flight：cache_get_or_load（进程内合并 + 跨进程 Redis 锁）
+
+“DB 查询”由带固定延迟的模拟加载函数代替，调用次数记录在 Redis 计数器中以便跨进程汇总。
+
+用法: python -m bench.single_flight --concurrency 200 --events 5 --processes 4
+"""
+import argparse
+import json
+import threading
+import time
+from multiprocessing import Process
+from app.db.redis import get_redis, cache_get, cache_set, cache_delete, cache_get_or_load
+
+KEY = "major_ranking:bench"
+COUNTER = "bench:single_flight:loads"
+
+
+def _loader(query_seconds: float):
+    get_redis().incr(COUNTER)
+    time.sleep(query_seconds)
+    return {"sid": ["0"], "gpa": [4.0], "avg": [90.0]}
+
+
+def _baseline(query_seconds: float):
+    value = cache_get(KEY)
+    if value is None:
+        value = _loader(query_seconds)
+        cache_set(KEY, value, 60)
+    return value
+
+
+def _single_flight(query_seconds: float):
+    return cache_get_or_load(KEY, lambda: _loader(query_seconds), 60)
+
+
+def _burst(mode: str, threads: int, query_seconds: float, start_at: float):
+    fn = _single_flight if mode == "single-flight" else _baseline
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        fn(query_seconds)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    time.sleep(max(0.0, start_at - time.time()))
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def run(mode: str, concurrency: int, events: int, processes: int, query_seconds: float) -> dict:
+    r = get_redis()
+    per_process = max(1, concurrency // processes)
+    loads = []
+    latencies = []
+    for _ in range(events):
+        cache_delete(KEY)  # 模拟过期
+        r.delete(COUNTER)
+        start_at = time.time() + 0.2
+        procs = [Process(target=_burst, args=(mode, per_process, query_seconds, start_at)) for _ in range(processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        latencies.append(time.time() - start_at)
+        loads.append(int(r.get(COUNTER) or 0))
+    r.delete(COUNTER)
+    cache_delete(KEY)
+    return {
+        "mode": mode,
+        "concurrency": per_process * processes,
+        "processes": processes,
+        "events": events,
+        "db_queries_per_event": loads,
+        "avg_db_queries_per_event": sum(loads) / len(loads),
+        "avg_burst_seconds": round(sum(latencies) / len(latencies), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--events", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--query-ms", type=float, default=200, help="模拟查询耗时（毫秒）")
+    args = parser.parse_args()
+    results = [
+        run(mode, args.concurrency, args.events, args.processes, args.query_ms / 1000)
+        for mode in ("baseline", "single-flight")
+    ]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
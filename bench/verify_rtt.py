@@ -0,0 +1,198 @@
+"""
+验证流程 Redis 往返次数基准：统计出题 / 验证各场景每个请求的 Redis 往返（RTT）次数与耗时。
+
+- legacy：改造前逐条命令的实现（ttl / incr / expire / get / exists / delete / set ...）
+- scripted：当前 VerifyService（Lua 脚本 + pipeline）
+
+往返次数通过包装 Redis 客户端计数：每条命令、每次 pipeline.execute 各计一次。
+出题所需的课程成绩由固定数据代替，不访问数据库。
+
+用法: python -m bench.verify_rtt --requests 200
+"""
+import argparse
+import json
+import time
+import uuid
+from types import SimpleNamespace
+from redis import Redis
+from redis.client import Pipeline
+from app.db.redis import get_redis
+from app.services import verify_service
+from app.services.verify_service import (
+    VerifyService, CHALLENGE_TTL, SESSION_TTL, FAIL_LIMIT, FAIL_BASE_COOLDOWN,
+    FAIL_COUNT_TTL, CHALLENGE_RATE_WINDOW, BAN_COUNT_TTL,
+)
+
+SID = "bench-sid"
+COURSE = SimpleNamespace(courseName="bench-course", cTerm="2024-2025-1", score=88.0)
+
+
+class _CountingPipeline(Pipeline):
+    def execute(self, raise_on_error=True):
+        self.rtt_counter[0] += 1
+        return super().execute(raise_on_error)
+
+
+class CountingRedis(Redis):
+    """每次 execute_command / pipeline.execute 计一次往返。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rtt = [0]
+
+    def execute_command(self, *args, **options):
+        self.rtt[0] += 1
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = _CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.rtt_counter = self.rtt
+        return pipe
+
+
+# ---- 改造前实现（逐条命令），仅用于对比 ----
+
+def _legacy_create(r, rid: str) -> dict:
+    ban_ttl = r.ttl(f"ban_active:{rid}")
+    if ban_ttl and ban_ttl > 0:
+        return {"cooldown": True, "ttl": ban_ttl}
+    rate_key = f"challenge_rate:{rid}"
+    rate = r.incr(rate_key)
+    if rate == 1:
+        r.expire(rate_key, CHALLENGE_RATE_WINDOW)
+    if rate > verify_service.CHALLENGE_RATE_LIMIT:
+        return {"cooldown": True, "ttl": CHALLENGE_RATE_WINDOW}
+    token = str(uuid.uuid4())
+    r.set(f"challenge:{token}", json.dumps({
+        "sid": SID, "rid": rid, "verified": False,
+        "questions": [{"courseName": COURSE.courseName, "score": COURSE.score}],
+    }), ex=CHALLENGE_TTL)
+    return {"token": token, "questions": [COURSE.courseName]}
+
+
+def _legacy_incr_fail(r, rid: str):
+    key = f"verify_fail:{rid}"
+    count = r.incr(key)
+    r.expire(key, FAIL_COUNT_TTL)
+    if int(count) >= FAIL_LIMIT:
+        ban_count_key = f"ban_count:{rid}"
+        ban_count = r.incr(ban_count_key)
+        cooldown = FAIL_BASE_COOLDOWN * (2 ** (int(ban_count) - 1))
+        r.expire(ban_count_key, max(BAN_COUNT_TTL, cooldown))
+        r.set(f"ban_active:{rid}", 1, ex=cooldown)
+        r.delete(key)
+
+
+def _legacy_verify(r, token: str, answers, rid: str):
+    raw = r.get(f"challenge:{token}")
+    if not raw:
+        return False
+    challenge = json.loads(raw)
+    rid = challenge.get("rid") or rid
+    if r.exists(f"ban_active:{rid}"):
+        r.delete(f"challenge:{token}")
+        return False
+    q = challenge["questions"][0]
+    match = next((a for a in answers if a["courseName"] == q["courseName"]), None)
+    if not match or int(float(match["score"])) != int(q["score"]):
+        r.delete(f"challenge:{token}")
+        _legacy_incr_fail(r, rid)
+        return False
+    r.delete(f"challenge:{token}")
+    r.delete(f"verify_fail:{rid}")
+    r.delete(f"ban_count:{rid}")
+    session_token = str(uuid.uuid4())
+    r.set(f"session:{session_token}", SID, ex=SESSION_TTL)
+    return session_token
+
+
+# ---- 当前实现 ----
+
+def _scripted_create(r, rid: str) -> dict:
+    return VerifyService.create_challenge(None, SID, openid=rid)
+
+
+def _scripted_verify(r, token: str, answers, rid: str):
+    return VerifyService.verify_and_consume(token, SID, answers, openid=rid)
+
+
+IMPLEMENTATIONS = {
+    "legacy": (_legacy_create, _legacy_verify),
+    "scripted": (_scripted_create, _scripted_verify),
+}
+
+RIGHT = [{"courseName": COURSE.courseName, "score": COURSE.score}]
+WRONG = [{"courseName": COURSE.courseName, "score": COURSE.score - 10}]
+
+
+def _measure(r: CountingRedis, fn, *args):
+    r.rtt[0] = 0
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, r.rtt[0], time.perf_counter() - start
+
+
+def _cleanup(r, rid: str):
+    r.delete(f"ban_active:{rid}", f"challenge_rate:{rid}", f"verify_fail:{rid}", f"ban_count:{rid}")
+
+
+def run(mode: str, r: CountingRedis, requests: int) -> dict:
+    create, verify = IMPLEMENTATIONS[mode]
+    scenarios = {}
+
+    def record(name, rtt, seconds):
+        s = scenarios.setdefault(name, {"requests": 0, "rtt": 0, "seconds": 0.0})
+        s["requests"] += 1
+        s["rtt"] += rtt
+        s["seconds"] += seconds
+
+    for i in range(requests):
+        rid = f"bench-rid:{mode}:{i}"
+        _cleanup(r, rid)
+
+        challenge, rtt, sec = _measure(r, create, r, rid)
+        record("create_challenge", rtt, sec)
+        _, rtt, sec = _measure(r, verify, r, challenge["token"], RIGHT, rid)
+        record("verify_success", rtt, sec)
+
+        # 连续答错直至触发封禁
+        for attempt in range(1, FAIL_LIMIT + 1):
+            challenge = create(r, rid)
+            _, rtt, sec = _measure(r, verify, r, challenge["token"], WRONG, rid)
+            record("verify_fail_ban" if attempt == FAIL_LIMIT else "verify_fail", rtt, sec)
+
+        _, rtt, sec = _measure(r, create, r, rid)
+        record("create_challenge_banned", rtt, sec)
+        _cleanup(r, rid)
+
+    return {
+        "mode": mode,
+        "scenarios": {
+            name: {
+                "requests": s["requests"],
+                "rtt_per_request": round(s["rtt"] / s["requests"], 2),
+                "avg_ms": round(s["seconds"] / s["requests"] * 1000, 3),
+            }
+            for name, s in scenarios.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    r = CountingRedis(connection_pool=get_redis().connection_pool)
+    # 出题不访问数据库，只测 Redis 部分
+    verify_service.current_redis = lambda: r
+    verify_service.CourseScoreRepository = SimpleNamespace(get_by_student_id=lambda db, sid: [COURSE])
+    # 基准会在短时间内大量出题，放开频率上限以免提前触发限流
+    verify_service.CHALLENGE_RATE_LIMIT = 10 ** 9
+
+    results = [run(mode, r, args.requests) for mode in IMPLEMENTATIONS]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
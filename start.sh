@@ -1,5 +1,10 @@
 #!/bin/bash
+# 用法: ./start.sh         生产模式（多进程，见 app/cli/serve.py；工作进程数取 WEB_WORKERS 或 CPU 数）
+#       ./start.sh dev     开发模式（单进程，代码变更后自动重载）
 cd "$(dirname "$0")"
 echo "Starting DinaHelper Backend Server..."
 source venv/bin/activate
-python -m uvicorn app.main:app --host 0.0.0.0 --port 3099 --reload
+if [ "$1" = "dev" ]; then
+    exec python -m uvicorn app.main:app --host 0.0.0.0 --port 3099 --reload
+fi
+exec python -m app.cli.serve --port 3099 "$@"